@@ -107,6 +107,8 @@ from axcl.ivps.axcl_ivps_type import AX_IVPS_ENGINE_VGP
 
 from axcl.ivps.axcl_ivps_type import AX_IVPS_PIPELINE_DEFAULT
 
+from axcl.ivps.axcl_ivps_type import AX_ERR_IVPS_FLOW_END
+
 from axcl.ivps.axcl_ivps_type import AX_IVPS_ASPECT_RATIO_HORIZONTAL_CENTER
 from axcl.ivps.axcl_ivps_type import AX_IVPS_ASPECT_RATIO_HORIZONTAL_LEFT
 from axcl.ivps.axcl_ivps_type import AX_IVPS_ASPECT_RATIO_HORIZONTAL_RIGHT
@@ -156,9 +158,15 @@ from axcl.vdec.axcl_vdec_type import VIDEO_DEC_MODE_I
 from axcl.vdec.axcl_vdec_type import VIDEO_DEC_MODE_GDR
 
 from axcl.vdec.axcl_vdec_type import AX_ERR_VDEC_BUSY
+from axcl.vdec.axcl_vdec_type import AX_ERR_VDEC_FLOW_END
+from axcl.vdec.axcl_vdec_type import AX_ERR_VDEC_TIMED_OUT
+from axcl.vdec.axcl_vdec_type import AX_ERR_VDEC_BUF_FULL
+from axcl.vdec.axcl_vdec_type import AX_ERR_VDEC_QUEUE_FULL
 
 # venc
 from axcl.venc.axcl_venc_comm import MAX_VENC_CHN_NUM
+from axcl.venc.axcl_venc_comm import MAX_VENC_GRP_NUM
+from axcl.venc.axcl_venc_comm import MAX_VENC_ROI_NUM
 
 from axcl.venc.axcl_venc_comm import MIN_VENC_PIC_WIDTH
 from axcl.venc.axcl_venc_comm import MAX_VENC_PIC_WIDTH
@@ -229,6 +237,11 @@ from axcl.venc.axcl_venc_comm import AX_VENC_SCHED_OTHER
 from axcl.venc.axcl_venc_comm import AX_VENC_SCHED_FIFO
 from axcl.venc.axcl_venc_comm import AX_VENC_SCHED_RR
 
+from axcl.venc.axcl_venc_comm import AX_VENC_INTRA_FRAME
+from axcl.venc.axcl_venc_comm import AX_VENC_PREDICTED_FRAME
+from axcl.venc.axcl_venc_comm import AX_VENC_BIDIR_PREDICTED_FRAME
+from axcl.venc.axcl_venc_comm import AX_VENC_VIRTUAL_INTRA_FRAME
+
 from axcl.venc.axcl_venc_comm import AX_VENC_GOPMODE_NORMALP
 from axcl.venc.axcl_venc_comm import AX_VENC_GOPMODE_ONELTR
 from axcl.venc.axcl_venc_comm import AX_VENC_GOPMODE_SVC_T
@@ -271,7 +284,11 @@ from axcl.venc.axcl_venc_comm import AX_VENC_QPMAP_BLOCK_UNIT_64x64
 from axcl.venc.axcl_venc_comm import AX_VENC_QPMAP_BLOCK_UNIT_32x32
 from axcl.venc.axcl_venc_comm import AX_VENC_QPMAP_BLOCK_UNIT_16x16
 
+from axcl.venc.axcl_venc_comm import AX_STREAM_BUF_NON_CACHE
+from axcl.venc.axcl_venc_comm import AX_STREAM_BUF_CACHE
+
 from axcl.venc.axcl_venc_comm import AX_ERR_VENC_FLOW_END
+from axcl.venc.axcl_venc_comm import AX_ERR_VENC_TIMEOUT
 
 # dmadim
 from axcl.dmadim.axcl_dmadim_type import AX_DMADIM_ENDIAN_DEF
@@ -25,6 +25,9 @@ from axcl.npu.axcl_npu import get_group_io_info_count
 from axcl.npu.axcl_npu import get_group_io_info
 from axcl.npu.axcl_npu import create_context
 from axcl.npu.axcl_npu import create_context_v2
+from axcl.npu.axcl_npu import prepare_io
+from axcl.npu.axcl_npu import set_prepared_input
+from axcl.npu.axcl_npu import set_prepared_output
 from axcl.npu.axcl_npu import run_sync
 from axcl.npu.axcl_npu import run_sync_v2
 from axcl.npu.axcl_npu import run_group_io_sync
@@ -590,6 +590,128 @@ def _io_dict2struct(io: dict) -> AX_ENGINE_IO_T:
     return c_io
 
 
+def _io_buffer_dict(meta: dict) -> dict:
+    if "physical_address" in meta:
+        return meta
+    # meta of get_io_info, only size is used and address is bound later
+    return {"physical_address": 0, "size": meta.get("size", 0)}
+
+
+def _to_c_io(io) -> AX_ENGINE_IO_T:
+    if isinstance(io, AX_ENGINE_IO_T):
+        return io
+    return _io_dict2struct(io)
+
+
+def prepare_io(io: dict) -> AX_ENGINE_IO_T:
+    """
+    Prepare a reusable IO structure for run_sync, run_sync_v2 and run_group_io_sync.
+
+    .. table::
+
+        ======================= =====================================================
+        **Language**            **Function Prototype**
+        ======================= =====================================================
+        **python**              `c_io = axcl.npu.prepare_io(io)`
+        ======================= =====================================================
+
+    The buffer arrays are built only once, so the prepared IO can be run repeatedly without
+    converting dict to structure on each call. Buffer addresses can be swapped in place
+    by :func:`set_prepared_input` and :func:`set_prepared_output`, e.g. for ping-pong buffers.
+
+    :param dict io: IO dict(see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`), or IO information dict returned
+                    by :func:`get_io_info` whose buffer addresses are bound later, io_setting may be a dict or
+                    :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_SETTING_T`
+    :returns: **c_io** (:class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`) - prepared IO, None is failure
+    """
+    try:
+        inputs = [_io_buffer_dict(meta) for meta in io.get("inputs", [])]
+        outputs = [_io_buffer_dict(meta) for meta in io.get("outputs", [])]
+        c_inputs = _meta_array_dict2struct(inputs)
+        c_outputs = _meta_array_dict2struct(outputs)
+
+        c_io = AX_ENGINE_IO_T()
+        c_io.dict2struct({
+            "inputs": c_inputs,
+            "input_size": len(inputs),
+            "outputs": c_outputs,
+            "output_size": len(outputs),
+            "batch_size": io.get("batch_size", 0),
+            "parallel_run": io.get("parallel_run", 0),
+        })
+
+        c_io_setting = io.get("io_setting")
+        if isinstance(c_io_setting, dict):
+            setting = c_io_setting
+            c_io_setting = AX_ENGINE_IO_SETTING_T()
+            c_io_setting.dict2struct(setting)
+        if c_io_setting is not None:
+            c_io.pIoSetting = pointer(c_io_setting)
+
+        # hold the buffer arrays and io setting as long as the prepared IO is alive
+        c_io.c_inputs = c_inputs
+        c_io.c_outputs = c_outputs
+        c_io.c_io_setting = c_io_setting
+        return c_io
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+        return None
+
+
+def _set_prepared_buffer(c_buffers, count: int, index: int, phy_addr: int, size: int) -> int:
+    if index < 0 or index >= count:
+        print(f"invalid io buffer index {index}, count {count}")
+        return -1
+
+    c_buffers[index].phyAddr = phy_addr
+    if size > 0:
+        c_buffers[index].nSize = size
+    return 0
+
+
+def set_prepared_input(c_io: AX_ENGINE_IO_T, index: int, phy_addr: int, size: int = 0) -> int:
+    """
+    Replace the input buffer address of a prepared IO in place.
+
+    .. table::
+
+        ======================= =====================================================
+        **Language**            **Function Prototype**
+        ======================= =====================================================
+        **python**              `ret = axcl.npu.set_prepared_input(c_io, index, phy_addr, size=0)`
+        ======================= =====================================================
+
+    :param c_io: IO prepared by :func:`prepare_io`
+    :param int index: input index
+    :param int phy_addr: physical address of the input buffer
+    :param int size: size of the input buffer, 0 keeps the prepared size
+    :returns: **ret** (*int*) - 0 indicates success, otherwise failure
+    """
+    return _set_prepared_buffer(c_io.pInputs, c_io.nInputSize, index, phy_addr, size)
+
+
+def set_prepared_output(c_io: AX_ENGINE_IO_T, index: int, phy_addr: int, size: int = 0) -> int:
+    """
+    Replace the output buffer address of a prepared IO in place.
+
+    .. table::
+
+        ======================= =====================================================
+        **Language**            **Function Prototype**
+        ======================= =====================================================
+        **python**              `ret = axcl.npu.set_prepared_output(c_io, index, phy_addr, size=0)`
+        ======================= =====================================================
+
+    :param c_io: IO prepared by :func:`prepare_io`
+    :param int index: output index
+    :param int phy_addr: physical address of the output buffer
+    :param int size: size of the output buffer, 0 keeps the prepared size
+    :returns: **ret** (*int*) - 0 indicates success, otherwise failure
+    """
+    return _set_prepared_buffer(c_io.pOutputs, c_io.nOutputSize, index, phy_addr, size)
+
+
 def run_sync(handle: int, io: dict) -> int:
     """
     Execute synchronous operation with the provided IO.
@@ -604,13 +726,13 @@ def run_sync(handle: int, io: dict) -> int:
         ======================= =====================================================
 
     :param int handle: The handle to execute the operation
-    :param dict io: Input and output data for the operation, see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`
+    :param io: Input and output data for the operation, dict(see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`) or IO prepared by :func:`prepare_io`
     :returns: **ret** (*int*) - 0 indicates success, otherwise failure
     """
     ret = -1
     try:
         c_handle = cast(c_void_p(handle), c_void_p)
-        c_io = _io_dict2struct(io)
+        c_io = _to_c_io(io)
 
         libaxcl_npu.AXCL_ENGINE_RunSync.restype = c_int32
         libaxcl_npu.AXCL_ENGINE_RunSync.argtypes = [
@@ -640,14 +762,14 @@ def run_sync_v2(handle: int, context: int, io: dict) -> int:
 
     :param int handle: The handle to execute the operation
     :param int context: The context for the operation
-    :param dict io: Input and output data for the operation, see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`
+    :param io: Input and output data for the operation, dict(see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`) or IO prepared by :func:`prepare_io`
     :returns: **ret** (*int*) - 0 indicates success, otherwise failure
     """
     ret = -1
     try:
         c_handle = cast(c_void_p(handle), c_void_p)
         c_context = cast(c_void_p(context), c_void_p)
-        c_io = _io_dict2struct(io)
+        c_io = _to_c_io(io)
 
         libaxcl_npu.AXCL_ENGINE_RunSyncV2.restype = c_int32
         libaxcl_npu.AXCL_ENGINE_RunSyncV2.argtypes = [
@@ -679,15 +801,14 @@ def run_group_io_sync(handle: int, context: int, index: int, io: dict) -> int:
     :param int handle: The handle to execute the operation
     :param int context: The context for the operation
     :param int index: The index of the group
-    :param dict io: Input and output data for the operation, see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`
+    :param io: Input and output data for the operation, dict(see :class:`axcl.npu.axcl_npu_type.AX_ENGINE_IO_T`) or IO prepared by :func:`prepare_io`
     :returns: **ret** (*int*) - 0 indicates success, otherwise failure
     """
     ret = -1
     try:
         c_handle = cast(c_void_p(handle), c_void_p)
         c_context = cast(c_void_p(context), c_void_p)
-        c_io = AX_ENGINE_IO_T()
-        c_io.dict2struct(io)
+        c_io = _to_c_io(io)
 
         libaxcl_npu.AXCL_ENGINE_RunGroupIOSync.restype = c_int32
         libaxcl_npu.AXCL_ENGINE_RunGroupIOSync.argtypes = [
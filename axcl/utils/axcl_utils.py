@@ -24,7 +24,7 @@ def bytes_to_ptr(data):
         **python**              `ptr = axcl.utils.bytes_to_ptr(data)`
         ======================= =====================================================
 
-    :param bytes data: data
+    :param bytes data: data, bytes or writable buffer such as bytearray or memoryview of bytearray
     :returns: **ptr** (*int*) - address, None is failure
     """
     if data and isinstance(data, bytes):
@@ -34,6 +34,12 @@ def bytes_to_ptr(data):
             return addressof(data_ptr.contents)
         else:
             return None  # Return None for empty data
+    elif data and isinstance(data, (bytearray, memoryview)):
+        # zero copy, address is valid as long as the buffer is alive
+        try:
+            return addressof(c_uint8.from_buffer(data))
+        except (TypeError, ValueError):
+            return None  # read-only or non-contiguous buffer
     else:
         return None  # Invalid input case
 
@@ -0,0 +1,206 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import copy
+import threading
+import axcl
+from axcl.utils.axcl_utils import bytes_to_ptr
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_utils import axclite_annexb_iter
+
+
+def axclite_annexb_has_header(data, h264: bool) -> bool:
+    """
+    True if an annexB frame carries SPS before its first VCL NAL
+    """
+    if not hasattr(data, 'find'):
+        # memoryview, parameter sets are expected in the head
+        data = bytes(data[:4096])
+
+    for pos, sc_len in axclite_annexb_iter(data):
+        head = data[pos + sc_len]
+        if h264:
+            nal_type = head & 0x1F
+            if nal_type == 7:
+                return True
+            if 1 <= nal_type <= 5:
+                return False
+        else:
+            nal_type = (head >> 1) & 0x3F
+            if nal_type == 33:
+                return True
+            if nal_type < 32:
+                return False
+    return False
+
+
+class AxcliteAutoVdec(AxcliteVdec):
+    """
+    AxcliteVdec sized from the stream instead of given width and height.
+
+    create() only keeps attr as a template, the group is created by send_stream() on the first frame with SPS,
+    which is parsed by axcl.vdec.extract_stream_header_info. Group and channels are sized to the parsed
+    resolution, and frame_buf_cnt of channels without one is derived from the number of reference frames.
+    When a later SPS changes the resolution, pending frames are drained and the group is recreated.
+    Observers are kept across recreation, the group id may change.
+
+    Frames before the first SPS can not be decoded and are skipped.
+
+    usage:
+        decoder = AxcliteAutoVdec()
+        decoder.register_observer(0, observer)
+        decoder.create(attr, device)  # max_pic_width/height and pic_width/height of 0 follow the stream
+        decoder.start()
+        decoder.send_stream(frame, pts)
+    """
+    def __init__(self, hub=None, drain_timeout=2000):
+        """
+        :param hub: AxcliteVdecHub to attach the group to after each creation if started with recv=False
+        :param drain_timeout: max time in ms to wait for pending frames before recreation
+        """
+        super().__init__()
+        self.hub = hub
+        self.drain_timeout = drain_timeout
+        self.template = None
+        self.recv = True
+        self.want_start = False
+        self.h264 = True
+        self.info = None
+        self.skipped = 0
+        self.recreated = 0
+        self._lock = threading.RLock()
+
+    def create(self, attr, device):
+        self.device = device
+        if 'grp_attr' not in attr or 'chn_attr' not in attr or len(attr['chn_attr']) != axcl.AX_DEC_MAX_CHN_NUM:
+            print(f"device {self.device:02x}: key 'grp_attr' or 'chn_attr' of {axcl.AX_DEC_MAX_CHN_NUM} channels not found in attr")
+            return 1
+
+        self.template = copy.deepcopy(attr)
+        self.attr = copy.deepcopy(attr)
+        self.h264 = attr['grp_attr'].get('codec_type', axcl.PT_H264) == axcl.PT_H264
+        return axcl.AXCL_SUCC
+
+    def destroy(self):
+        with self._lock:
+            if self.grp >= 0:
+                self._destroy_grp()
+            self.info = None
+
+    def start(self, recv=True):
+        with self._lock:
+            self.recv = recv
+            self.want_start = True
+            if self.grp >= 0:
+                return super().start(recv)
+        return axcl.AXCL_SUCC
+
+    def stop(self):
+        with self._lock:
+            self.want_start = False
+            if self.grp >= 0:
+                return super().stop()
+        return axcl.AXCL_SUCC
+
+    def send_stream(self, data, pts, user_data=0, timeout=1000):
+        empty = data is None or len(data) == 0
+        if not empty and axclite_annexb_has_header(data, self.h264):
+            ret = self._reconfigure(data)
+            if ret != axcl.AXCL_SUCC:
+                return ret
+
+        if self.grp < 0:
+            if not empty:
+                self.skipped += 1
+            return axcl.AXCL_SUCC
+
+        return super().send_stream(data, pts, user_data, timeout)
+
+    def statistics(self):
+        return {'grp': self.grp,
+                'width': self.info['width'] if self.info else 0,
+                'height': self.info['height'] if self.info else 0,
+                'recreated': self.recreated, 'skipped': self.skipped}
+
+    def _reconfigure(self, data):
+        stream = {'addr': bytes_to_ptr(data), 'stream_pack_len': len(data), 'end_of_frame': 1}
+        info, ret = axcl.vdec.extract_stream_header_info(stream, self.attr['grp_attr'].get('codec_type', axcl.PT_H264))
+        if ret != axcl.AXCL_SUCC:
+            # keep current group, a broken header is reported by decoder
+            print(f"device {self.device:02x}: extract stream header info fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return axcl.AXCL_SUCC
+
+        if self.info and info['width'] == self.info['width'] and info['height'] == self.info['height']:
+            return axcl.AXCL_SUCC
+
+        with self._lock:
+            if self.grp >= 0:
+                print(f"device {self.device:02x}: vdGrp {self.grp} resolution changes from {self.info['width']}x{self.info['height']} "
+                      f"to {info['width']}x{info['height']}, recreate")
+                self._drain()
+                if self.started:
+                    super().stop()
+                self._destroy_grp()
+                self.recreated += 1
+
+            ret = super().create(self._attr_of(info), self.device)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: create vdGrp of {info['width']}x{info['height']} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                self.info = None
+                return ret
+
+            self.info = info
+            print(f"device {self.device:02x}: vdGrp {self.grp} is sized to {info['width']}x{info['height']}, "
+                  f"{info['ref_frames_num']} reference frames, {info['bit_depth_y']} bit")
+            if self.hub:
+                self.hub.attach(self)
+            if self.want_start:
+                ret = super().start(self.recv)
+        return ret
+
+    def _attr_of(self, info):
+        w = info['width']
+        h = info['height']
+        attr = copy.deepcopy(self.template)
+        attr['grp_attr']['max_pic_width'] = w
+        attr['grp_attr']['max_pic_height'] = h
+        for i, chn_attr in enumerate(attr['chn_attr']):
+            if not chn_attr.get('enable', False):
+                continue
+
+            crop = chn_attr.get('crop_x', 0) > 0 or chn_attr.get('crop_y', 0) > 0
+            cw = chn_attr.get('pic_width', 0)
+            ch = chn_attr.get('pic_height', 0)
+            if (i == 0 and not crop) or cw == 0 or cw > w:
+                # chn 0 outputs original size, scaled output is never larger than stream
+                cw = w
+            if (i == 0 and not crop) or ch == 0 or ch > h:
+                ch = h
+            chn_attr['pic_width'] = cw
+            chn_attr['pic_height'] = ch
+
+            if 'frame_buf_cnt' not in chn_attr:
+                # reference frames, output fifo, one in decoding and one held by user
+                chn_attr['frame_buf_cnt'] = max(1, info['ref_frames_num']) + chn_attr.get('output_fifo_depth', 4) + 2
+        return attr
+
+    def _drain(self):
+        if not self.started:
+            return
+
+        # end of stream flushes frames of old resolution out of decoder
+        super().send_stream(None, 0)
+        self.wait_eos(self.drain_timeout / 1000)
+
+    def _destroy_grp(self):
+        if self.hub:
+            self.hub.detach(self)
+        super().destroy()
@@ -0,0 +1,253 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import copy
+import threading
+import time
+from queue import Queue
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteSubject
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_venc import AxcliteVenc
+
+
+class AxcliteCodecPool(AxcliteResource):
+    """
+    Warm VDEC groups and VENC channels shared by many short jobs, so creation and teardown are paid once.
+
+    Instances are created by add_vdec/add_venc and keyed by codec and max resolution. A lease returns the idle
+    instance of the smallest key which fits the requested size, it is created but not started. release() returns
+    it at once, stop and reset (including the busy retries of reset_grp) are done by a background thread, which
+    also unregisters all observers. Instances failing to reset are destroyed and removed from the pool.
+
+    usage:
+        pool = AxcliteCodecPool(device)
+        pool.add_vdec(axcl.PT_H264, 1920, 1080, 4)
+        decoder = pool.lease_vdec(axcl.PT_H264, 1280, 720)
+        decoder.register_observer(0, observer)
+        decoder.start()
+        ...  # send stream and wait end of stream
+        pool.release(decoder)
+    """
+    def __init__(self, device):
+        super().__init__(self.__class__.__name__)
+        self.device = device
+        self.idle = {}
+        self.keys = {}
+        self.attrs = {}
+        # attr each instance is created with, restored once released
+        self.created_attrs = {}
+        self.leased = set()
+        self.resets = Queue()
+        self._cond = threading.Condition()
+        self.reset_thread = threading.Thread(target=self.reset_worker, name='codec_pool_reset')
+        self.reset_thread.start()
+
+    def add_vdec(self, codec_type, max_width, max_height, count, chn_attr=None) -> int:
+        """
+        create count warm groups of max resolution
+        :param chn_attr: 'chn_attr' of AxcliteVdec.create, default is chn 0 of original size
+        :return: number of groups created
+        """
+        attr = {
+            'grp_attr': {
+                'codec_type': codec_type,
+                'max_pic_width': max_width,
+                'max_pic_height': max_height,
+                'output_order': axcl.AX_VDEC_OUTPUT_ORDER_DEC,
+                'display_mode': axcl.AX_VDEC_DISPLAY_MODE_PLAYBACK
+            },
+            'chn_attr': chn_attr if chn_attr else [
+                {'enable': True, 'link': False, 'pic_width': max_width, 'pic_height': max_height,
+                 'output_fifo_depth': 4, 'frame_buf_cnt': 8, 'recv_frame_timeout': 1000},
+                {'enable': False},
+                {'enable': False}
+            ]
+        }
+
+        key = ('vdec', codec_type, max_width, max_height)
+        created = 0
+        for _ in range(count):
+            decoder = AxcliteVdec()
+            if decoder.create(copy.deepcopy(attr), self.device) != axcl.AXCL_SUCC:
+                break
+            self._add(key, decoder, attr)
+            created += 1
+
+        print(f"device {self.device:02x}: {created} warm vdec groups of {max_width}x{max_height}")
+        return created
+
+    def add_venc(self, attr, count) -> int:
+        """
+        create count warm channels
+        :param attr: attr of AxcliteVenc.create, max_pic_width and max_pic_height are the max resolution of leases
+        :return: number of channels created
+        """
+        created = 0
+        key = None
+        for _ in range(count):
+            encoder = AxcliteVenc()
+            if encoder.create(copy.deepcopy(attr), self.device) != axcl.AXCL_SUCC:
+                break
+            venc_attr = encoder.chn_attr['venc_attr']
+            key = ('venc', venc_attr['type'], venc_attr['max_pic_width'], venc_attr['max_pic_height'])
+            self._add(key, encoder, encoder.chn_attr)
+            created += 1
+
+        if key:
+            print(f"device {self.device:02x}: {created} warm venc channels of {key[2]}x{key[3]}")
+        return created
+
+    def lease_vdec(self, codec_type, width, height, timeout=None) -> AxcliteVdec:
+        """
+        :return: created and stopped AxcliteVdec, None if no group fits or timeout
+        """
+        return self._lease('vdec', codec_type, width, height, timeout)
+
+    def lease_venc(self, attr, timeout=None) -> AxcliteVenc:
+        """
+        :param attr: attr of AxcliteVenc.create, the channel is reconfigured by set_chn_attr if it differs
+        :return: created and stopped AxcliteVenc, None if no channel fits, timeout or failure
+        """
+        venc_attr = attr['venc_attr']
+        encoder = self._lease('venc', venc_attr.get('type', axcl.PT_H264), venc_attr['pic_width_src'], venc_attr['pic_height_src'], timeout)
+        if encoder is None:
+            return None
+
+        # buffers are kept as created
+        chn_attr = copy.deepcopy(attr)
+        for k in ['type', 'max_pic_width', 'max_pic_height', 'mem_source', 'buf_size', 'in_fifo_depth', 'out_fifo_depth']:
+            chn_attr['venc_attr'][k] = encoder.chn_attr['venc_attr'][k]
+        for k, v in encoder.chn_attr['venc_attr'].items():
+            chn_attr['venc_attr'].setdefault(k, v)
+
+        if chn_attr != encoder.chn_attr:
+            ret = axcl.venc.set_chn_attr(encoder.get_chn_id(), chn_attr)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: set veChn {encoder.get_chn_id()} attr fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                self.release(encoder)
+                return None
+            encoder.chn_attr = chn_attr
+        return encoder
+
+    def release(self, codec):
+        """
+        return a leased AxcliteVdec or AxcliteVenc, it is reset in background
+        """
+        with self._cond:
+            if codec not in self.leased:
+                print(f"device {self.device:02x}: {codec.name} is not leased from pool")
+                return
+            self.leased.discard(codec)
+        self.resets.put(codec)
+
+    def destroy(self):
+        self.resets.put(None)
+        self.reset_thread.join()
+
+        with self._cond:
+            codecs = [codec for codecs in self.idle.values() for codec in codecs] + list(self.leased)
+            self.idle.clear()
+            self.keys.clear()
+            self.created_attrs.clear()
+            self.leased.clear()
+
+        for codec in codecs:
+            if codec.started:
+                codec.stop()
+            codec.destroy()
+
+    def statistics(self):
+        with self._cond:
+            return {'idle': {f"{k[0]} {k[2]}x{k[3]}": len(v) for k, v in self.idle.items()}, 'leased': len(self.leased)}
+
+    def _add(self, key, codec, attr):
+        with self._cond:
+            self.idle.setdefault(key, []).append(codec)
+            self.keys[codec] = key
+            self.attrs[key] = copy.deepcopy(attr)
+            self.created_attrs[codec] = copy.deepcopy(attr)
+            self._cond.notify_all()
+
+    def _lease(self, kind, codec_type, width, height, timeout):
+        # smallest max resolution first
+        keys = sorted((k for k in self.attrs if k[0] == kind and k[1] == codec_type and k[2] >= width and k[3] >= height),
+                      key=lambda k: k[2] * k[3])
+        if not keys:
+            print(f"device {self.device:02x}: no warm {kind} of codec {codec_type} fits {width}x{height}")
+            return None
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for key in keys:
+                    if self.idle.get(key):
+                        codec = self.idle[key].pop()
+                        self.leased.add(codec)
+                        return codec
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    print(f"device {self.device:02x}: lease {kind} of {width}x{height} timeout")
+                    return None
+                self._cond.wait(remaining)
+
+    def _reset(self, codec):
+        if codec.started:
+            ret = codec.stop()
+            if ret != axcl.AXCL_SUCC:
+                return ret
+
+        attr = self.created_attrs[codec]
+        if isinstance(codec, AxcliteVdec):
+            codec.subjects = [AxcliteSubject() for _ in range(axcl.AX_DEC_MAX_CHN_NUM)]
+            # restore decode mode which may be changed by job, such as I frames only
+            grp_attr = attr['grp_attr']
+            grp_param, ret = axcl.vdec.get_grp_param(codec.get_grp_id())
+            if ret != axcl.AXCL_SUCC:
+                return ret
+            grp_param['vdec_video_param']['output_order'] = grp_attr['output_order']
+            grp_param['vdec_video_param']['vdec_mode'] = grp_attr.get('vdec_mode', axcl.VIDEO_DEC_MODE_IPB)
+            return axcl.vdec.set_grp_param(codec.get_grp_id(), grp_param)
+
+        codec.subject = AxcliteSubject()
+        # restore attr changed by lease, so the next lease starts from the size and rc the channel is created with
+        if codec.chn_attr != attr:
+            ret = axcl.venc.set_chn_attr(codec.get_chn_id(), attr)
+            if ret != axcl.AXCL_SUCC:
+                return ret
+            codec.chn_attr = copy.deepcopy(attr)
+        return axcl.AXCL_SUCC
+
+    def reset_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        while True:
+            codec = self.resets.get()
+            if codec is None:
+                break
+
+            ret = self._reset(codec)
+            with self._cond:
+                if ret == axcl.AXCL_SUCC:
+                    self.idle[self.keys[codec]].append(codec)
+                    self._cond.notify_all()
+                else:
+                    print(f"device {self.device:02x}: reset {codec.name} fail, ret = 0x{ret&0xFFFFFFFF:x}, removed from pool")
+                    self.keys.pop(codec)
+                    self.created_attrs.pop(codec, None)
+            if ret != axcl.AXCL_SUCC:
+                codec.destroy()
+
+        context.destroy()
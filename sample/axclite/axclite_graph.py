@@ -0,0 +1,423 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import copy
+import time
+import axcl
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+from axclite.axclite_msys import AxcliteMSys
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_ivps import AxcliteIvps
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_pool import AxclitePool
+
+_NODE_TYPES = ('vdec', 'ivps', 'venc', 'npu')
+# node types a node type is able to feed, links to npu are done by observers on host, others by axcl.sys.link
+_LINK_TARGETS = {'vdec': ('ivps', 'venc', 'npu'), 'ivps': ('ivps', 'venc', 'npu'), 'venc': (), 'npu': ()}
+_MOD_IDS = {'vdec': axcl.AX_ID_VDEC, 'ivps': axcl.AX_ID_IVPS, 'venc': axcl.AX_ID_VENC}
+
+
+def _resolve(value):
+    """
+    replace names of axcl constants, such as 'PT_H264', by their values, so a spec can be loaded from YAML or JSON
+    """
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_resolve(v) for v in value]
+    if isinstance(value, str) and value.isupper() and isinstance(getattr(axcl, value, None), int):
+        return getattr(axcl, value)
+    return value
+
+
+def _parse_port(port):
+    name, _, chn = str(port).partition(':')
+    return name, int(chn) if chn else 0
+
+
+def axclite_compile_graph(spec: dict):
+    """
+    validate a graph spec and resolve it once, the result is instantiated by AxcliteGraph.create many times
+
+    spec = {
+        'nodes': {
+            'dec': {'type': 'vdec', 'attr': attr of AxcliteVdec.create},
+            'resize': {'type': 'ivps', 'attr': attr of AxcliteIvps.create},
+            'enc': {'type': 'venc', 'attr': attr of AxcliteVenc.create},
+            'det': {'type': 'npu', 'stage': callable(frame) shared by all instances,
+                    or 'factory': callable() returning the stage of each instance}
+        },
+        'links': [['dec:1', 'resize'], ['resize:0', 'enc'], ['dec:2', 'det']],
+        'pools': {'input': {'blk_size': int, 'blk_cnt': int}}
+    }
+    A port is 'name:chn', chn is 0 if omitted. Channels linked by the spec are set to link (and venc to link mode)
+    if not set in attr. Links to npu nodes are host observers of unlinked channels, so a channel is not able to feed
+    both npu and other nodes.
+    :return: compiled graph, None if the spec is invalid
+    """
+    nodes = spec.get('nodes', {})
+    if not nodes:
+        print("graph: no node in spec")
+        return None
+
+    compiled = {}
+    for name, node in nodes.items():
+        kind = node.get('type')
+        if kind not in _NODE_TYPES:
+            print(f"graph: node {name} has invalid type {kind}, should be one of {_NODE_TYPES}")
+            return None
+        if kind == 'npu':
+            if ('stage' in node) == ('factory' in node):
+                print(f"graph: npu node {name} needs one of 'stage' or 'factory'")
+                return None
+        elif 'attr' not in node:
+            print(f"graph: node {name} has no attr")
+            return None
+        compiled[name] = dict(node, attr=_resolve(node.get('attr', {})))
+
+    links = []
+    inputs = {}
+    # dst types of each src port
+    outputs = {}
+    for link in spec.get('links', []):
+        if len(link) != 2:
+            print(f"graph: invalid link {link}, should be [src, dst]")
+            return None
+        (src, src_chn), (dst, dst_chn) = _parse_port(link[0]), _parse_port(link[1])
+        if src not in compiled or dst not in compiled:
+            print(f"graph: link {link} refers to unknown node")
+            return None
+        src_type, dst_type = compiled[src]['type'], compiled[dst]['type']
+        if dst_type not in _LINK_TARGETS[src_type]:
+            print(f"graph: {src_type} node {src} can not be linked to {dst_type} node {dst}")
+            return None
+        if (dst, dst_chn) in inputs:
+            print(f"graph: {dst}:{dst_chn} is already linked from {inputs[(dst, dst_chn)]}")
+            return None
+
+        attr = compiled[src]['attr']
+        if src_type == 'vdec':
+            chns = attr.get('chn_attr', [])
+            if src_chn >= len(chns) or not chns[src_chn].get('enable', False):
+                print(f"graph: vdec node {src} chn {src_chn} is not enabled")
+                return None
+            if dst_type != 'npu':
+                chns[src_chn].setdefault('link', True)
+        else:
+            filters = attr.get('filters', [])
+            if src_chn >= len(filters):
+                print(f"graph: ivps node {src} has no filter {src_chn}")
+                return None
+            if dst_type != 'npu':
+                filters[src_chn].setdefault('link', True)
+        if dst_type == 'venc':
+            compiled[dst]['attr'].setdefault('venc_attr', {}).setdefault('link_mode', axcl.AX_VENC_LINK_MODE)
+
+        inputs[(dst, dst_chn)] = f"{src}:{src_chn}"
+        outputs.setdefault((src, src_chn), set()).add(dst_type)
+        links.append((src, src_chn, dst, dst_chn))
+
+    # frames of a linked channel go to the linked module only, so they never reach an observer on host
+    for (src, src_chn), dst_types in outputs.items():
+        if 'npu' not in dst_types:
+            continue
+        attr = compiled[src]['attr']
+        port = attr['chn_attr'][src_chn] if compiled[src]['type'] == 'vdec' else attr['filters'][src_chn]
+        if len(dst_types) > 1 or port.get('link', False):
+            print(f"graph: {src}:{src_chn} is linked to a module, so it can not feed npu node, use another chn")
+            return None
+
+    # topological order, sources first
+    order = []
+    pending = {name: sum(1 for link in links if link[2] == name) for name in compiled}
+    ready = [name for name in compiled if pending[name] == 0]
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for link in links:
+            if link[0] == name:
+                pending[link[2]] -= 1
+                if pending[link[2]] == 0:
+                    ready.append(link[2])
+    if len(order) != len(compiled):
+        print(f"graph: cycle found among nodes {[name for name in compiled if name not in order]}")
+        return None
+
+    for name, pool in spec.get('pools', {}).items():
+        if pool.get('blk_size', 0) <= 0 or pool.get('blk_cnt', 0) <= 0:
+            print(f"graph: pool {name} needs positive blk_size and blk_cnt")
+            return None
+
+    return {'nodes': compiled, 'order': order, 'links': links, 'pools': copy.deepcopy(spec.get('pools', {})), 'compiled': True}
+
+
+class _NodeCounter(AxcliteObserver):
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    def update(self, data):
+        self.frames += 1
+        if 'pack' in data:
+            self.bytes += data['pack']['len']
+
+
+class _NpuStage(AxcliteObserver):
+    def __init__(self, stage):
+        self.stage = stage
+        self.frames = 0
+        self.busy = 0.0
+
+    def update(self, data):
+        begin = time.perf_counter()
+        if isinstance(self.stage, AxcliteObserver):
+            self.stage.update(data)
+        else:
+            self.stage(data)
+        self.busy += time.perf_counter() - begin
+        self.frames += 1
+
+
+class AxcliteGraph(AxcliteResource):
+    """
+    Build a pipeline of VDEC, IVPS, VENC and NPU stages from a spec (see axclite_compile_graph), instead of creating,
+    linking, starting and tearing down each module by hand.
+
+    create() allocates pools, creates nodes from sources to sinks and links them by AxcliteMSys, start() starts
+    sinks before sources so no frame is sent to a module not started, stop() stops sources first and destroy()
+    unlinks the links of this graph only and destroys in reverse, so many graphs of one spec run side by side.
+    Compile the spec once and create a graph per stream, validation and constant resolution are not repeated.
+
+    statistics() reports frames and fps of each node: decoded frames of vdec from query_status, frames of
+    unlinked channels of ivps (linked ones are counted by their consumers), streams and kbps of venc, and
+    frames and average ms per frame of npu stages.
+
+    usage:
+        plan = axclite_compile_graph(spec)
+        graph = AxcliteGraph('stream0')
+        if graph.create(plan, device) == axcl.AXCL_SUCC and graph.start() == axcl.AXCL_SUCC:
+            graph.node('enc').register_observer(writer)
+            graph.node('dec').send_stream(nal, pts)
+            ...
+            graph.node('dec').send_stream(None, 0)
+            graph.wait_eos()
+            graph.stop()
+        graph.destroy()
+    """
+    def __init__(self, name='graph'):
+        super().__init__(self.__class__.__name__)
+        self.label = name
+        self.device = -1
+        self.plan = None
+        self.nodes = {}
+        self.pools = {}
+        self.links = []
+        self.counters = {}
+        self.started = False
+        self.start_time = 0.0
+        self.stop_time = 0.0
+
+    def node(self, name):
+        return self.nodes.get(name)
+
+    def pool(self, name) -> AxclitePool:
+        return self.pools.get(name)
+
+    def create(self, spec: dict, device: int):
+        """
+        :param spec: compiled by axclite_compile_graph, or a spec compiled here
+        """
+        self.device = device
+        plan = spec if spec.get('compiled') else axclite_compile_graph(spec)
+        if plan is None:
+            return 1
+        self.plan = plan
+
+        for name, pool_attr in plan['pools'].items():
+            pool = AxclitePool()
+            if pool.create(pool_attr['blk_size'], pool_attr['blk_cnt'], f"{self.label}_{name}", pool_attr.get('cached', False)) == axcl.AX_INVALID_POOLID:
+                print(f"device {self.device:02x}: graph {self.label} create pool {name} fail")
+                self.destroy()
+                return 1
+            self.pools[name] = pool
+
+        for name in plan['order']:
+            ret = self._create_node(name, plan['nodes'][name])
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: graph {self.label} create node {name} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                self.destroy()
+                return ret
+
+        for src, src_chn, dst, dst_chn in plan['links']:
+            if plan['nodes'][dst]['type'] == 'npu':
+                self.nodes[src].register_observer(src_chn, self.counters[dst])
+                continue
+
+            src_info = self._port(src, src_chn)
+            dst_info = self._port(dst, dst_chn)
+            ret = AxcliteMSys().link(src_info, dst_info)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: graph {self.label} link {src}:{src_chn} to {dst}:{dst_chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                self.destroy()
+                return ret
+            self.links.append((src_info, dst_info))
+
+        # unlinked channels without npu stage are counted on host
+        for name, node in plan['nodes'].items():
+            if node['type'] == 'vdec':
+                chns = [i for i, chn in enumerate(node['attr']['chn_attr']) if chn.get('enable', False) and not chn.get('link', False)]
+            elif node['type'] == 'ivps':
+                chns = [i for i, f in enumerate(node['attr']['filters']) if not f.get('link', False)]
+            else:
+                continue
+            self.counters[name] = {}
+            for chn in chns:
+                self.counters[name][chn] = _NodeCounter()
+                self.nodes[name].register_observer(chn, self.counters[name][chn])
+
+        print(f"device {self.device:02x}: graph {self.label} is created, {' -> '.join(plan['order'])}")
+        return axcl.AXCL_SUCC
+
+    def start(self):
+        if self.started:
+            return axcl.AXCL_SUCC
+
+        for name in reversed(self.plan['order']):
+            obj = self.nodes[name]
+            if obj is None:
+                continue
+            ret = obj.start()
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: graph {self.label} start node {name} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                self.started = True
+                self.stop()
+                return ret
+
+        self.started = True
+        self.start_time = time.monotonic()
+        self.stop_time = 0.0
+        print(f"device {self.device:02x}: graph {self.label} is started")
+        return axcl.AXCL_SUCC
+
+    def stop(self):
+        if not self.started:
+            return axcl.AXCL_SUCC
+
+        ret = axcl.AXCL_SUCC
+        for name in self.plan['order']:
+            obj = self.nodes[name]
+            if obj is None or not obj.started:
+                continue
+            r = obj.stop()
+            if r != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: graph {self.label} stop node {name} fail, ret = 0x{r&0xFFFFFFFF:x}")
+                ret = r
+
+        self.started = False
+        self.stop_time = time.monotonic()
+        print(f"device {self.device:02x}: graph {self.label} is stopped")
+        return ret
+
+    def destroy(self):
+        self.stop()
+
+        for src_info, dst_info in reversed(self.links):
+            ret = AxcliteMSys().unlink(src_info, dst_info)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: graph {self.label} unlink {src_info} with {dst_info} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+        self.links.clear()
+
+        if self.plan:
+            for name in reversed(self.plan['order']):
+                obj = self.nodes.pop(name, None)
+                if obj is not None:
+                    obj.destroy()
+        self.nodes.clear()
+
+        for pool in self.pools.values():
+            pool.destroy()
+        self.pools.clear()
+
+    def wait_eos(self, timeout=None) -> bool:
+        """
+        wait until end of stream sent to sources reaches all sinks: venc nodes, and vdec or ivps nodes of unlink
+        channels not feeding other nodes
+        :return: False if timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in reversed(self.plan['order']):
+            node = self.plan['nodes'][name]
+            if node['type'] == 'npu' or any(link[0] == name and self.plan['nodes'][link[2]]['type'] != 'npu' for link in self.plan['links']):
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.nodes[name].wait_eos(remaining):
+                print(f"device {self.device:02x}: graph {self.label} wait end of stream of node {name} timeout")
+                return False
+        return True
+
+    def statistics(self):
+        elapsed = (self.stop_time or time.monotonic()) - self.start_time if self.start_time else 0
+        stats = {}
+        if self.plan is None:
+            return stats
+
+        for name in self.plan['order']:
+            kind = self.plan['nodes'][name]['type']
+            counter = self.counters.get(name)
+            item = {}
+            if kind == 'vdec':
+                status = self.nodes[name].query_status() if name in self.nodes else None
+                item['frames'] = status['decode_stream_frames'] if status else 0
+            elif kind == 'ivps':
+                item['frames'] = sum(c.frames for c in counter.values()) + sum(
+                    self._consumed(dst) for src, _, dst, _ in self.plan['links'] if src == name and self.plan['nodes'][dst]['type'] != 'npu')
+            elif kind == 'venc':
+                item['frames'] = counter.frames
+                item['kbps'] = round(counter.bytes * 8 / elapsed / 1000) if elapsed else 0
+            else:
+                item['frames'] = counter.frames
+                item['ms'] = round(counter.busy * 1000 / counter.frames, 2) if counter.frames else 0
+            item['fps'] = round(item['frames'] / elapsed, 1) if elapsed else 0
+            stats[name] = item
+        return stats
+
+    def _consumed(self, name):
+        counter = self.counters.get(name)
+        if isinstance(counter, dict):
+            return sum(c.frames for c in counter.values())
+        return counter.frames if counter else 0
+
+    def _create_node(self, name, node):
+        kind = node['type']
+        if kind == 'npu':
+            self.nodes[name] = None
+            self.counters[name] = _NpuStage(node['factory']() if 'factory' in node else node['stage'])
+            return axcl.AXCL_SUCC
+
+        obj = {'vdec': AxcliteVdec, 'ivps': AxcliteIvps, 'venc': AxcliteVenc}[kind]()
+        # create of modules changes attr
+        ret = obj.create(copy.deepcopy(node['attr']), self.device)
+        if ret != axcl.AXCL_SUCC:
+            return ret
+        self.nodes[name] = obj
+
+        if kind == 'venc':
+            self.counters[name] = _NodeCounter()
+            obj.register_observer(self.counters[name])
+        return axcl.AXCL_SUCC
+
+    def _port(self, name, chn):
+        kind = self.plan['nodes'][name]['type']
+        obj = self.nodes[name]
+        if kind == 'venc':
+            return {'mod_id': _MOD_IDS[kind], 'grp_id': 0, 'chn_id': obj.get_chn_id()}
+        return {'mod_id': _MOD_IDS[kind], 'grp_id': obj.get_grp_id(), 'chn_id': chn}
@@ -15,7 +15,7 @@ import threading
 import axcl
 from axclite.axclite_context import AxcliteContext
 from axclite.axclite_resource import AxcliteResource
-from axclite.axclite_utils import axclite_align_up
+from axclite.axclite_utils import axclite_align_up, axclite_is_error
 from axclite.axclite_observer import AxcliteObserver, AxcliteSubject
 
 
@@ -70,6 +70,9 @@ class AxcliteIvps(AxcliteResource):
         self.chn = []
         self.backup_fifo_depth = 0
         self.started = False
+        # set once every unlink channel gets AX_ERR_IVPS_FLOW_END
+        self.eos = threading.Event()
+        self.eos_chns = set()
 
     def get_grp_id(self):
         return self.grp
@@ -237,14 +240,18 @@ class AxcliteIvps(AxcliteResource):
         if ret != axcl.AXCL_SUCC:
             return ret
 
+        self.eos.clear()
+        self.eos_chns.clear()
+
+        # set before starting threads, receive threads exit once started is False
+        self.started = True
+
         # start thread to receive decoded image
         for i in range(len(self.chn)):
             if not self.chn[i]['link']:
                 self.chn[i]['worker'] = threading.Thread(target=self.recv_worker, args=(i,))
                 self.chn[i]['worker'].start()
 
-        self.started = True
-
         print(f"device {self.device:02x}: ivGrp {self.grp} is started")
         return axcl.AXCL_SUCC
 
@@ -269,6 +276,23 @@ class AxcliteIvps(AxcliteResource):
     def send_frame(self, frame, timeout):
         return axcl.ivps.send_frame(self.grp, frame, timeout)
 
+    def end_of_stream(self, chn):
+        self.eos_chns.add(chn)
+        if len(self.eos_chns) == sum(1 for c in self.chn if not c['link']) and not self.eos.is_set():
+            print(f"device {self.device:02x}: ivGrp {self.grp} reaches end of stream")
+            self.eos.set()
+
+    def wait_eos(self, timeout=None) -> bool:
+        """
+        wait until all unlink channels get the end of stream, frames of link channels never reach host, wait end
+        of stream of the module linked to instead
+        :return: False if timeout
+        """
+        if all(c['link'] for c in self.chn):
+            print(f"device {self.device:02x}: ivGrp {self.grp} has no unlink channel to wait end of stream")
+            return False
+        return self.eos.wait(timeout)
+
     def recv_worker(self, chn):
         # print(f"device {self.device:02x}: ivGrp {self.grp} on device {self.device} recv worker +++")
         context = AxcliteContext()
@@ -278,6 +302,9 @@ class AxcliteIvps(AxcliteResource):
         while self.started:
             frame, ret = axcl.ivps.get_chn_frame(self.grp, chn, timeout)
             if ret != axcl.AXCL_SUCC:
+                if axclite_is_error(ret, axcl.AX_ERR_IVPS_FLOW_END):
+                    self.end_of_stream(chn)
+                    break
                 time.sleep(0.001)
                 continue
 
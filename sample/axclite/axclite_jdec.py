@@ -0,0 +1,241 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import struct
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+import axcl
+from axcl.utils.axcl_utils import bytes_to_ptr
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+from axclite.axclite_utils import axclite_align_up
+from axclite.axclite_vdec import VDEC_STRIDE_ALIGN
+
+IVPS_STRIDE_ALIGN = 16
+
+_CROP_RESIZE = {
+    'vpp': axcl.ivps.crop_resize_vpp,
+    'vgp': axcl.ivps.crop_resize_vgp,
+    'tdp': axcl.ivps.crop_resize_tdp
+}
+
+
+def axclite_jpeg_size(data):
+    """
+    parse width and height from the SOF marker of a jpeg
+    :return: (width, height), (0, 0) if not found
+    """
+    pos = 2
+    n = len(data)
+    while pos + 4 <= n:
+        if data[pos] != 0xFF:
+            break
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # fill byte
+            pos += 1
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if pos + 9 > n:
+                break
+            height, width = struct.unpack_from('>HH', data, pos + 5)
+            return width, height
+        length, = struct.unpack_from('>H', data, pos + 2)
+        pos += 2 + length
+    return 0, 0
+
+
+def axclite_read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class AxcliteJpegDecoder(AxcliteResource):
+    """
+    Batch jpeg decoder:
+        1. files are read by a thread pool
+        2. several decode threads keep decodes in flight on the JDEC cores, jpeg_decode_one_frame releases the GIL
+        3. output buffers come from a pool sized by the max resolution, no allocation per image
+        4. optional IVPS resize to a fixed size, such as model input
+
+    The frame passed to callback is valid only inside callback, its buffer is returned to pool afterwards.
+    JDEC should be enabled by AxcliteMSys().init(AXCL_LITE_JDEC).
+    """
+    def __init__(self, device, max_width, max_height, decoders=2, readers=4, resize=None, engine='vpp'):
+        """
+        :param decoders: decode threads, which is the number of in-flight decodes
+        :param readers: file reader threads
+        :param resize: None or (width, height) of NV12 output resized by IVPS
+        """
+        super().__init__(self.__class__.__name__)
+        if engine not in _CROP_RESIZE:
+            raise ValueError(f"engine {engine} not support")
+
+        self.device = device
+        self.max_width = max_width
+        self.max_height = max_height
+        self.decoders = decoders
+        self.readers = readers
+        self.resize = resize
+        self.engine = engine
+        self.stride = axclite_align_up(max_width, VDEC_STRIDE_ALIGN)
+        self.buf_size = self.stride * axclite_align_up(max_height, 16) * 3 // 2
+        self.resize_stride = axclite_align_up(resize[0], IVPS_STRIDE_ALIGN) if resize else 0
+        self.resize_size = self.resize_stride * resize[1] * 3 // 2 if resize else 0
+        self.pool = Queue()
+        self.resize_pool = Queue()
+        self.buffers = []
+
+        # one buffer more than decode threads, so a decode never waits for the callback of another thread
+        for _ in range(decoders + 1):
+            self._alloc(self.pool, self.buf_size)
+            if resize:
+                self._alloc(self.resize_pool, self.resize_size)
+
+        self.aspect_ratio = {
+            'aspect_ratio_mode': axcl.AX_IVPS_ASPECT_RATIO_STRETCH,
+            'background_color': 0,
+            'alignments': [axcl.AX_IVPS_ASPECT_RATIO_HORIZONTAL_CENTER, axcl.AX_IVPS_ASPECT_RATIO_VERTICAL_CENTER],
+            'rectangle': {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+        }
+
+    def _alloc(self, pool, size):
+        addr = device_mem_alloc(size)
+        if addr == 0:
+            self.destroy()
+            raise RuntimeError(f"alloc jpeg decode buffer of {size} fail")
+        self.buffers.append(addr)
+        pool.put(addr)
+
+    def destroy(self):
+        for addr in self.buffers:
+            device_mem_free(addr)
+        self.buffers.clear()
+
+    def decode_one(self, data, buf, resize_buf=0):
+        """
+        decode one jpeg into buf, and resize into resize_buf if resize is set
+        :return: (frame, ret), frame is AX_VIDEO_FRAME_T dict of the output
+        """
+        width, height = axclite_jpeg_size(data)
+        if width == 0 or height == 0 or width > self.max_width or height > self.max_height:
+            print(f"device {self.device:02x}: jpeg {width}x{height} is invalid or exceeds {self.max_width}x{self.max_height}")
+            return None, 1
+
+        stride = axclite_align_up(width, VDEC_STRIDE_ALIGN)
+        y_size = stride * axclite_align_up(height, 16)
+        frame = {
+            'width': width,
+            'height': height,
+            'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+            'pic_stride': [stride, stride, 0],
+            'phy_addr': [buf, buf + y_size, 0],
+            'vir_addr': [0],
+            'frame_size': y_size * 3 // 2
+        }
+        param = {
+            'stream': {'addr': bytes_to_ptr(data), 'stream_pack_len': len(data), 'end_of_frame': 1},
+            'frame': frame,
+            'output_mode': axcl.AX_VDEC_OUTPUT_ORIGINAL,
+            'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR
+        }
+        ret = axcl.vdec.jpeg_decode_one_frame(param)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: jpeg decode fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None, ret
+
+        if not self.resize:
+            return frame, axcl.AXCL_SUCC
+
+        w, h = self.resize
+        dst = {
+            'width': w,
+            'height': h,
+            'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+            'pic_stride': [self.resize_stride, self.resize_stride, 0],
+            'phy_addr': [resize_buf, resize_buf + self.resize_stride * h, 0],
+            'vir_addr': [0],
+            'frame_size': self.resize_size
+        }
+        ret = _CROP_RESIZE[self.engine](frame, dst, self.aspect_ratio)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: resize {width}x{height} to {w}x{h} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None, ret
+
+        return dst, axcl.AXCL_SUCC
+
+    def decode_files(self, paths, callback, userdata=None) -> dict:
+        """
+        :param paths: jpeg file paths
+        :param callback: callback(index, path, frame, userdata), frame is None if failure
+        :return: statistics
+        """
+        jobs = Queue(maxsize=self.decoders * 4)
+        stats = {'images': len(paths), 'decoded': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def decode_worker():
+            context = AxcliteContext()
+            context.create(self.device)
+            while True:
+                job = jobs.get()
+                if job is None:
+                    break
+
+                index, path, future = job
+                frame = None
+                buf = self.pool.get()
+                resize_buf = self.resize_pool.get() if self.resize else 0
+                try:
+                    frame, ret = self.decode_one(future.result(), buf, resize_buf)
+                except OSError as e:
+                    print(f"device {self.device:02x}: read {path} fail, {e}")
+                    ret = 1
+
+                try:
+                    callback(index, path, frame, userdata)
+                except Exception:
+                    # keep the worker alive, or readers block on the full jobs queue forever
+                    print(f"device {self.device:02x}: callback of {path} fail")
+                    print(traceback.format_exc())
+                finally:
+                    self.pool.put(buf)
+                    if resize_buf:
+                        self.resize_pool.put(resize_buf)
+
+                with lock:
+                    stats['decoded' if ret == axcl.AXCL_SUCC else 'failed'] += 1
+            context.destroy()
+
+        begin = time.monotonic()
+        threads = [threading.Thread(target=decode_worker, name=f"jdec_{i}") for i in range(self.decoders)]
+        for t in threads:
+            t.start()
+
+        # readers run ahead of decoders, bounded by jobs queue
+        with ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix='jdec_reader') as executor:
+            for index, path in enumerate(paths):
+                jobs.put((index, path, executor.submit(axclite_read_file, path)))
+            for _ in threads:
+                jobs.put(None)
+            for t in threads:
+                t.join()
+
+        elapsed = time.monotonic() - begin
+        stats['seconds'] = elapsed
+        stats['images_per_second'] = stats['decoded'] / elapsed if elapsed > 0 else 0
+        print(f"device {self.device:02x}: decoded {stats['decoded']}/{stats['images']} jpeg in {elapsed:.2f}s, "
+              f"{stats['images_per_second']:.1f} images/s")
+        return stats
@@ -0,0 +1,301 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import ctypes
+import threading
+import time
+import traceback
+from pathlib import Path
+from queue import Queue
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+from axclite.axclite_utils import axclite_align_up, axclite_align_down
+from axclite.axclite_jdec import IVPS_STRIDE_ALIGN
+
+_CROP_RESIZE_V2 = {
+    'vpp': axcl.ivps.crop_resize_v2_vpp,
+    'vgp': axcl.ivps.crop_resize_v2_vgp,
+    'tdp': axcl.ivps.crop_resize_v2_tdp
+}
+
+
+class AxcliteJpegEncoder(AxcliteResource):
+    """
+    Batch jpeg snapshot encoder, a task is a dict of:
+        'frame': AX_VIDEO_FRAME_T dict of NV12 in device memory, such as output of vdec or ivps
+        'box': (x, y, width, height) to crop, None is the whole frame
+        'size': (width, height) to resize the box to by IVPS, None keeps the box size and crops by JENC only
+        'quality': q factor of 1 ~ 99, default 90
+        'path': write jpeg to this file instead of returning bytes
+
+    Tasks are pipelined by three stages:
+        1. the calling thread crops and resizes consecutive tasks of the same frame by one crop_resize_v2 call
+           into pooled buffers
+        2. several encode threads keep jpeg_encode_one_frame in flight, into pooled output buffers
+        3. one thread copies outputs back by a single pinned staging buffer, then returns bytes or writes files
+    No device memory is allocated per snapshot. Frames must be valid until snapshot() returns.
+    JENC should be enabled by AxcliteMSys().init(AXCL_LITE_JENC | AXCL_LITE_IVPS).
+    """
+    def __init__(self, device, max_width, max_height, encoders=2, batch=8, engine='vpp', max_stream_size=0):
+        """
+        :param max_width: max width of resized snapshots
+        :param max_height: max height of resized snapshots
+        :param encoders: encode threads, which is the number of in-flight encodes
+        :param batch: max boxes of one crop_resize_v2 call
+        :param max_stream_size: size of output buffers, default is size of NV12 of max crop or resize
+        """
+        super().__init__(self.__class__.__name__)
+        if engine not in _CROP_RESIZE_V2:
+            raise ValueError(f"engine {engine} not support")
+
+        self.device = device
+        self.max_width = max_width
+        self.max_height = max_height
+        self.encoders = encoders
+        self.batch = max(1, batch)
+        self.engine = engine
+        self.stride = axclite_align_up(max_width, IVPS_STRIDE_ALIGN)
+        self.buf_size = self.stride * axclite_align_up(max_height, 2) * 3 // 2
+        self.stream_size = max_stream_size if max_stream_size > 0 else self.buf_size
+        self.resize_pool = Queue()
+        self.stream_pool = Queue()
+        self.buffers = []
+        self.staging = 0
+
+        # resize buffers cover a batch being resized and batches queued to encoders
+        for _ in range(self.batch * 2 + encoders):
+            self._alloc(self.resize_pool, self.buf_size)
+        for _ in range(encoders + 2):
+            self._alloc(self.stream_pool, self.stream_size)
+
+        self.staging, ret = axcl.rt.malloc_host(self.stream_size)
+        if ret != axcl.AXCL_SUCC or not self.staging:
+            self.staging = 0
+            self._staging_buf = ctypes.create_string_buffer(self.stream_size)
+            self.staging_addr = ctypes.addressof(self._staging_buf)
+        else:
+            self.staging_addr = self.staging
+
+        self.aspect_ratio = {
+            'aspect_ratio_mode': axcl.AX_IVPS_ASPECT_RATIO_STRETCH,
+            'background_color': 0,
+            'alignments': [axcl.AX_IVPS_ASPECT_RATIO_HORIZONTAL_CENTER, axcl.AX_IVPS_ASPECT_RATIO_VERTICAL_CENTER],
+            'rectangle': {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+        }
+
+    def _alloc(self, pool, size):
+        addr = device_mem_alloc(size)
+        if addr == 0:
+            self.destroy()
+            raise RuntimeError(f"alloc jpeg encode buffer of {size} fail")
+        self.buffers.append(addr)
+        pool.put(addr)
+
+    def destroy(self):
+        for addr in self.buffers:
+            device_mem_free(addr)
+        self.buffers.clear()
+        if self.staging:
+            axcl.rt.free_host(self.staging)
+            self.staging = 0
+
+    def snapshot(self, tasks, callback=None, userdata=None) -> list:
+        """
+        :param tasks: list of task dict
+        :param callback: callback(index, result, userdata) once a snapshot is done, in completion order
+        :return: result of each task: jpeg bytes, or path if 'path' is given, None if failure
+        """
+        results = [None] * len(tasks)
+        stats = {'snapshots': len(tasks), 'encoded': 0, 'failed': 0, 'bytes': 0}
+        jobs = Queue(maxsize=self.encoders * 2)
+        outputs = Queue()
+
+        def encode_worker():
+            context = AxcliteContext()
+            context.create(self.device)
+            while True:
+                job = jobs.get()
+                if job is None:
+                    break
+
+                index, src, resize_buf = job
+                stream_buf = self.stream_pool.get()
+                size = self._encode_one(src, tasks[index].get('quality', 90), stream_buf)
+                if resize_buf:
+                    self.resize_pool.put(resize_buf)
+                outputs.put((index, stream_buf, size))
+            context.destroy()
+
+        def copy_worker():
+            context = AxcliteContext()
+            context.create(self.device)
+            while True:
+                output = outputs.get()
+                if output is None:
+                    break
+
+                index, stream_buf, size = output
+                try:
+                    result = self._copy_back(tasks[index], stream_buf, size)
+                finally:
+                    # encode workers wait on stream_pool, so the buffer goes back whatever happens
+                    if stream_buf:
+                        self.stream_pool.put(stream_buf)
+
+                results[index] = result
+                if result is None:
+                    stats['failed'] += 1
+                else:
+                    stats['encoded'] += 1
+                    stats['bytes'] += size
+                if callback:
+                    try:
+                        callback(index, result, userdata)
+                    except Exception:
+                        print(f"device {self.device:02x}: callback of snapshot {index} fail")
+                        print(traceback.format_exc())
+            context.destroy()
+
+        begin = time.monotonic()
+        threads = [threading.Thread(target=encode_worker, name=f"jenc_{i}") for i in range(self.encoders)]
+        copier = threading.Thread(target=copy_worker, name='jenc_copy')
+        for t in threads + [copier]:
+            t.start()
+
+        try:
+            self._resize_tasks(tasks, jobs, outputs)
+        finally:
+            for _ in threads:
+                jobs.put(None)
+            for t in threads:
+                t.join()
+            outputs.put(None)
+            copier.join()
+
+        elapsed = time.monotonic() - begin
+        print(f"device {self.device:02x}: encoded {stats['encoded']}/{stats['snapshots']} snapshots in {elapsed:.2f}s, "
+              f"{stats['encoded'] / elapsed if elapsed > 0 else 0:.1f} snapshots/s, {stats['bytes']} bytes")
+        return results
+
+    def _resize_tasks(self, tasks, jobs, outputs):
+        i = 0
+        while i < len(tasks):
+            task = tasks[i]
+            frame = task['frame']
+            if not task.get('size'):
+                src = self._crop_frame(frame, task.get('box'))
+                if src is None:
+                    outputs.put((i, 0, 0))
+                else:
+                    jobs.put((i, src, 0))
+                i += 1
+                continue
+
+            # consecutive tasks of the same frame with resize are done by one call
+            end = i + 1
+            while end < len(tasks) and end - i < self.batch and tasks[end]['frame'] is frame and tasks[end].get('size'):
+                end += 1
+
+            boxes = []
+            dsts = []
+            for task in tasks[i:end]:
+                x, y, w, h = task.get('box') or (0, 0, frame['width'], frame['height'])
+                boxes.append({'x': x, 'y': y, 'width': w, 'height': h})
+                dsts.append(self._dst_frame(self.resize_pool.get(), *task['size']))
+
+            ret = _CROP_RESIZE_V2[self.engine](frame, boxes, dsts, self.aspect_ratio)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: crop resize {end - i} boxes fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            for index, dst in enumerate(dsts, i):
+                if ret == axcl.AXCL_SUCC:
+                    jobs.put((index, dst, dst['phy_addr'][0]))
+                else:
+                    self.resize_pool.put(dst['phy_addr'][0])
+                    outputs.put((index, 0, 0))
+            i = end
+
+    def _dst_frame(self, buf, width, height):
+        width = min(axclite_align_down(width, 2), self.max_width)
+        height = min(axclite_align_down(height, 2), self.max_height)
+        return {
+            'width': width,
+            'height': height,
+            'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+            'pic_stride': [self.stride, self.stride, 0],
+            'phy_addr': [buf, buf + self.stride * height, 0],
+            'vir_addr': [0],
+            'frame_size': self.stride * height * 3 // 2
+        }
+
+    def _crop_frame(self, frame, box):
+        # crop by JENC itself, the source frame is encoded in place
+        src = dict(frame)
+        x, y, w, h = box or (0, 0, frame['width'], frame['height'])
+        x = axclite_align_down(max(0, x), 2)
+        y = axclite_align_down(max(0, y), 2)
+        w = axclite_align_down(min(w, frame['width'] - x), 2)
+        h = axclite_align_down(min(h, frame['height'] - y), 2)
+        if w <= 0 or h <= 0 or w * h * 3 // 2 > self.stream_size:
+            print(f"device {self.device:02x}: crop box {box} of {frame['width']}x{frame['height']} is invalid or too large")
+            return None
+        src['crop'] = (x, y, w, h)
+        return src
+
+    def _encode_one(self, src, quality, stream_buf) -> int:
+        """
+        :return: size of jpeg, 0 if failure
+        """
+        x, y, w, h = src.get('crop', (0, 0, src['width'], src['height']))
+        param = {
+            'width': src['width'],
+            'height': src['height'],
+            'img_format': src.get('img_format', axcl.AX_FORMAT_YUV420_SEMIPLANAR),
+            'pic_stride': src['pic_stride'],
+            'phy_addr': src['phy_addr'],
+            'crop_x': x,
+            'crop_y': y,
+            'crop_width': w,
+            'crop_height': h,
+            'output_phy_addr': stream_buf,
+            'output_len': self.stream_size,
+            'strm_buf_type': axcl.AX_STREAM_BUF_NON_CACHE,
+            'jpeg_param': {'q_factor': min(max(quality, 1), 99)}
+        }
+        output, ret = axcl.venc.jpeg_encode_one_frame(param)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: jpeg encode {w}x{h} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return 0
+        return output['output_len']
+
+    def _copy_back(self, task, stream_buf, size):
+        if size == 0:
+            return None
+
+        ret = axcl.rt.memcpy(self.staging_addr, stream_buf, size, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: copy jpeg of {size} bytes from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None
+
+        data = (ctypes.c_char * size).from_address(self.staging_addr)
+        path = task.get('path')
+        if path is None:
+            return bytes(data)
+
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"device {self.device:02x}: write {path} fail, {e}")
+            return None
+        return path
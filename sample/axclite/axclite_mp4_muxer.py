@@ -0,0 +1,411 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import ctypes
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+import axcl
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+from axclite.axclite_utils import axclite_annexb_iter
+
+MP4_TIMESCALE = 90000
+MP4_MOVIE_TIMESCALE = 1000
+
+MP4_SAMPLE_SYNC = 0x02000000      # sample_depends_on = 2
+MP4_SAMPLE_NON_SYNC = 0x01010000  # sample_depends_on = 1, sample_is_non_sync_sample = 1
+
+_MATRIX = struct.pack('>9I', 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+
+def _box(kind: bytes, *payloads) -> bytes:
+    return struct.pack('>I4s', 8 + sum(len(p) for p in payloads), kind) + b''.join(payloads)
+
+
+def _full_box(kind: bytes, version: int, flags: int, *payloads) -> bytes:
+    return _box(kind, struct.pack('>I', (version << 24) | flags), *payloads)
+
+
+def _be32(values) -> bytes:
+    data = array('I', values)
+    if sys.byteorder == 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def axclite_annexb_nals(data: bytes) -> list:
+    """
+    split annexB data into NAL units without start codes
+    """
+    nals = []
+    units = list(axclite_annexb_iter(data))
+    for i, (pos, sc_len) in enumerate(units):
+        start = pos + sc_len
+        if i + 1 < len(units):
+            end = units[i + 1][0]
+        else:
+            # a trailing start code without NAL header is not payload
+            end = len(data) - 3 if data.endswith(b'\x00\x00\x01') else len(data)
+        # trailing_zero_8bits
+        while end > start and data[end - 1] == 0:
+            end -= 1
+        if end > start:
+            nals.append(data[start:end])
+    return nals
+
+
+class AxcliteMp4Muxer(AxcliteObserver, AxcliteResource):
+    """
+    Mux H.264/H.265 packets of axcl.venc.get_stream into fragmented MP4, or plain MP4 with moov at end.
+
+    Packets are converted from annexB to length prefixed samples, parameter sets are moved into avcC/hvcC,
+    parameter sets changed after the header (such as AxcliteVenc.reconfigure to another size) are kept in band.
+    Packets before the first key frame with parameter sets are skipped. Sample duration is the pts delta
+    to the next packet, pack['pts'] is in us; if pts does not increase, 1/fps is used.
+    Samples are expected in decode order without B frames, so no composition offsets are written.
+
+    fragmented: ftyp and moov are written on the first key frame, each fragment (moof + mdat) starts at a key
+    frame, and is cut earlier once longer than fragment_duration. Only the current fragment is kept in memory.
+    plain: samples are written into mdat at once, sample tables are kept in compact arrays (4 bytes per sample
+    for stsz, run length coded stts and stsc, one chunk per GOP), mdat size is patched and moov is appended on close.
+
+    usage:
+        muxer = AxcliteMp4Muxer(device, '/tmp/axcl/dump.mp4', axcl.PT_H265, 1920, 1080, fps=30)
+        encoder.register_observer(muxer)
+        ...
+        encoder.stop()
+        muxer.close()
+    """
+    def __init__(self, device, file_path, codec_type, width, height, fps=30, fragmented=True, fragment_duration=2.0,
+                 buffer_size=0x100000):
+        """
+        :param codec_type: axcl.PT_H264 or axcl.PT_H265
+        :param fragment_duration: max seconds of a fragment
+        :param buffer_size: buffer size of file IO
+        """
+        AxcliteResource.__init__(self, self.__class__.__name__)
+        if codec_type not in [axcl.PT_H264, axcl.PT_H265]:
+            raise ValueError(f"unsupported codec type {codec_type}")
+
+        self.device = device
+        self.file_path = file_path
+        self.h264 = codec_type == axcl.PT_H264
+        self.width = width
+        self.height = height
+        self.fragmented = fragmented
+        self.fragment_duration = int(fragment_duration * MP4_TIMESCALE)
+        self.default_duration = MP4_TIMESCALE // max(1, fps)
+        self.last_duration = self.default_duration
+
+        self.params = {}
+        self.prefix = []
+        self.inband = False
+        self.pending = None
+        self.pending_ts = 0
+        self.started = False
+        self.closed = False
+        self.offset = 0
+        self.decode_time = 0
+        self.samples = 0
+        self.skipped = 0
+        self.dropped = 0
+
+        # fragmented: current fragment
+        self.fragments = 0
+        self.frag_start = 0
+        self.frag_entries = array('I')  # duration, size, flags of each sample
+        self.frag_data = bytearray()
+
+        # plain: sample tables
+        self.mdat_pos = 0
+        self.sizes = array('I')
+        self.stts = []  # [count, delta]
+        self.stss = array('I')
+        self.stsc = []  # [first_chunk, samples_per_chunk]
+        self.chunk_offsets = array('Q')
+        self.chunk_samples = 0
+
+        self.host = None
+        self._lock = threading.Lock()
+
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(file_path, 'wb', buffering=buffer_size)
+
+    def update(self, data):
+        self.write_pack(data['pack'])
+
+    def write_pack(self, pack) -> int:
+        """
+        copy one packet from device and mux it, called from the receive thread before the stream is released
+        """
+        size = pack['len']
+        if size == 0:
+            return axcl.AXCL_SUCC
+
+        if self.host is None or len(self.host) < size:
+            self.host = ctypes.create_string_buffer(size)
+        ret = axcl.rt.memcpy(ctypes.addressof(self.host), pack['phy_addr'], size, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: copy packet of {size} bytes from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self.dropped += 1
+            return ret
+
+        data = ctypes.string_at(ctypes.addressof(self.host), size)
+        return self.write_frame(data, pack['pts'], pack.get('coding_type') == axcl.AX_VENC_INTRA_FRAME)
+
+    def write_frame(self, data, pts: int, key=False) -> int:
+        """
+        mux one annexB access unit in host memory (bytes or memoryview)
+        :param pts: in us
+        :param key: True if it is a key frame, IDR NAL units also mark key frame
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        vcl = False
+        sample = []
+        for nal in axclite_annexb_nals(data):
+            if self.h264:
+                nal_type = nal[0] & 0x1F
+                if nal_type in [7, 8]:
+                    if not self._add_param(nal_type, nal):
+                        sample.append(nal)
+                    continue
+                if nal_type == 9:
+                    continue
+                if 1 <= nal_type <= 5:
+                    vcl = True
+                    key = key or nal_type == 5
+            else:
+                nal_type = (nal[0] >> 1) & 0x3F
+                if nal_type in [32, 33, 34]:
+                    if not self._add_param(nal_type, nal):
+                        sample.append(nal)
+                    continue
+                if nal_type == 35:
+                    continue
+                if nal_type < 32:
+                    vcl = True
+                    key = key or 16 <= nal_type <= 21
+            sample.append(nal)
+
+        with self._lock:
+            if self.closed:
+                return axcl.AXCL_SUCC
+
+            # SEI and parameter sets may come in a packet without picture
+            if not vcl:
+                self.prefix.extend(sample)
+                return axcl.AXCL_SUCC
+            if self.prefix:
+                sample = self.prefix + sample
+                self.prefix = []
+
+            if not self.started:
+                if not key or not self._has_params():
+                    self.skipped += 1
+                    return axcl.AXCL_SUCC
+                self._write_header()
+                self.started = True
+
+            payload = b''.join(b for nal in sample for b in (struct.pack('>I', len(nal)), nal))
+            ts = pts * MP4_TIMESCALE // 1000000
+            if self.pending:
+                duration = ts - self.pending_ts
+                self._commit(*self.pending, duration if duration > 0 else self.default_duration)
+            self.pending = (payload, key)
+            self.pending_ts = ts
+        return axcl.AXCL_SUCC
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+
+            if self.pending:
+                self._commit(*self.pending, self.last_duration)
+                self.pending = None
+
+            if self.fragmented:
+                self._flush_fragment()
+            elif self.started:
+                self._close_chunk()
+                self.f.seek(self.mdat_pos + 8)
+                self.f.write(struct.pack('>Q', self.offset - self.mdat_pos))
+                self.f.seek(self.offset)
+                self.f.write(self._moov())
+            self.f.close()
+
+    def destroy(self):
+        self.close()
+
+    def statistics(self):
+        return {'samples': self.samples, 'fragments': self.fragments, 'skipped': self.skipped, 'dropped': self.dropped,
+                'duration_ms': self.decode_time * 1000 // MP4_TIMESCALE}
+
+    def _add_param(self, nal_type, nal) -> bool:
+        """
+        :return: False if the parameter set is changed once the header is written, such as the encoder is
+                 reconfigured to another resolution, it is kept in band of the sample
+        """
+        nals = self.params.setdefault(nal_type, [])
+        if self.inband or (self.started and nal not in nals):
+            # all parameter sets are in band once changed, so a decoder is able to switch back
+            self.inband = True
+            return False
+        if nal in nals:
+            return True
+        if len(nals) < 16:
+            nals.append(nal)
+        return True
+
+    def _has_params(self):
+        return all(self.params.get(t) for t in ([7, 8] if self.h264 else [32, 33, 34]))
+
+    def _write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def _write_header(self):
+        brands = [b'isom', b'iso2', b'avc1' if self.h264 else b'hvc1', b'mp41'] + ([b'iso6'] if self.fragmented else [])
+        self._write(_box(b'ftyp', b'isom', struct.pack('>I', 0x200), *brands))
+        if self.fragmented:
+            self._write(self._moov())
+        else:
+            # 64 bits size, patched on close
+            self.mdat_pos = self.offset
+            self._write(struct.pack('>I4sQ', 1, b'mdat', 0))
+
+    def _commit(self, payload, key, duration):
+        self.last_duration = duration
+        self.samples += 1
+
+        if self.fragmented:
+            if self.frag_entries and (key or self.decode_time - self.frag_start >= self.fragment_duration):
+                self._flush_fragment()
+            if not self.frag_entries:
+                self.frag_start = self.decode_time
+            self.frag_entries.extend((duration, len(payload), MP4_SAMPLE_SYNC if key else MP4_SAMPLE_NON_SYNC))
+            self.frag_data += payload
+        else:
+            # one chunk per GOP
+            if key or not self.chunk_offsets:
+                self._close_chunk()
+                self.chunk_offsets.append(self.offset)
+            self.chunk_samples += 1
+            self._write(payload)
+            self.sizes.append(len(payload))
+            if self.stts and self.stts[-1][1] == duration:
+                self.stts[-1][0] += 1
+            else:
+                self.stts.append([1, duration])
+            if key:
+                self.stss.append(self.samples)
+
+        self.decode_time += duration
+
+    def _close_chunk(self):
+        if self.chunk_samples:
+            if not self.stsc or self.stsc[-1][1] != self.chunk_samples:
+                self.stsc.append([len(self.chunk_offsets), self.chunk_samples])
+            self.chunk_samples = 0
+
+    def _flush_fragment(self):
+        if not self.frag_entries:
+            return
+
+        self.fragments += 1
+        count = len(self.frag_entries) // 3
+        entries = _be32(self.frag_entries)
+        # moof(8) + mfhd(16) + traf(8) + tfhd(16) + tfdt(20) + trun(20 + entries), then mdat header(8)
+        data_offset = 8 + 16 + 8 + 16 + 20 + 20 + len(entries) + 8
+        moof = _box(b'moof',
+                    _full_box(b'mfhd', 0, 0, struct.pack('>I', self.fragments)),
+                    _box(b'traf',
+                         _full_box(b'tfhd', 0, 0x020000, struct.pack('>I', 1)),  # default-base-is-moof
+                         _full_box(b'tfdt', 1, 0, struct.pack('>Q', self.frag_start)),
+                         _full_box(b'trun', 0, 0x000701, struct.pack('>Ii', count, data_offset), entries)))
+        self._write(moof)
+        self._write(struct.pack('>I4s', 8 + len(self.frag_data), b'mdat'))
+        self._write(self.frag_data)
+        self.frag_entries = array('I')
+        self.frag_data = bytearray()
+
+    def _config(self):
+        if self.h264:
+            sps = self.params[7]
+            pps = self.params[8]
+            cfg = struct.pack('>5BB', 1, sps[0][1], sps[0][2], sps[0][3], 0xFF, 0xE0 | len(sps))
+            cfg += b''.join(struct.pack('>H', len(nal)) + nal for nal in sps)
+            cfg += struct.pack('>B', len(pps)) + b''.join(struct.pack('>H', len(nal)) + nal for nal in pps)
+            if sps[0][1] in [100, 110, 122, 144]:
+                # 4:2:0, 8 bits, no sps ext
+                cfg += bytes([0xFD, 0xF8, 0xF8, 0])
+            return _box(b'avcC', cfg)
+
+        # profile_tier_level of sps, emulation prevention bytes removed
+        rbsp = self.params[33][0][2:32].replace(b'\x00\x00\x03', b'\x00\x00')
+        sub_layers = ((rbsp[0] >> 1) & 0x07) + 1
+        nesting = rbsp[0] & 0x01
+        arrays = b''
+        for nal_type in [32, 33, 34]:
+            nals = self.params[nal_type]
+            arrays += struct.pack('>BH', 0x80 | nal_type, len(nals))
+            arrays += b''.join(struct.pack('>H', len(nal)) + nal for nal in nals)
+        cfg = struct.pack('>B', 1) + rbsp[1:13] + struct.pack('>HBBBBHBB', 0xF000, 0xFC, 0xFD, 0xF8, 0xF8, 0,
+                                                             (sub_layers << 3) | (nesting << 2) | 3, 3) + arrays
+        return _box(b'hvcC', cfg)
+
+    def _stbl(self):
+        entry = struct.pack('>6xH', 1) + struct.pack('>HH12xHHIIIH', 0, 0, self.width, self.height, 0x00480000, 0x00480000, 0, 1)
+        entry += bytes(32) + struct.pack('>Hh', 0x18, -1) + self._config()
+        stsd = _full_box(b'stsd', 0, 0, struct.pack('>I', 1), _box(b'avc1' if self.h264 else b'hvc1', entry))
+
+        if self.fragmented:
+            return _box(b'stbl', stsd,
+                        _full_box(b'stts', 0, 0, struct.pack('>I', 0)),
+                        _full_box(b'stsc', 0, 0, struct.pack('>I', 0)),
+                        _full_box(b'stsz', 0, 0, struct.pack('>II', 0, 0)),
+                        _full_box(b'stco', 0, 0, struct.pack('>I', 0)))
+
+        if self.chunk_offsets and self.chunk_offsets[-1] > 0xFFFFFFFF:
+            chunk = _full_box(b'co64', 0, 0, struct.pack('>I', len(self.chunk_offsets)),
+                              b''.join(struct.pack('>Q', offset) for offset in self.chunk_offsets))
+        else:
+            chunk = _full_box(b'stco', 0, 0, struct.pack('>I', len(self.chunk_offsets)), _be32(self.chunk_offsets))
+        return _box(b'stbl', stsd,
+                    _full_box(b'stts', 0, 0, struct.pack('>I', len(self.stts)), _be32(v for run in self.stts for v in run)),
+                    _full_box(b'stss', 0, 0, struct.pack('>I', len(self.stss)), _be32(self.stss)),
+                    _full_box(b'stsc', 0, 0, struct.pack('>I', len(self.stsc)), _be32(v for run in self.stsc for v in (*run, 1))),
+                    _full_box(b'stsz', 0, 0, struct.pack('>II', 0, len(self.sizes)), _be32(self.sizes)),
+                    chunk)
+
+    def _moov(self):
+        duration = 0 if self.fragmented else self.decode_time
+        movie_duration = duration * MP4_MOVIE_TIMESCALE // MP4_TIMESCALE
+
+        mvhd = _full_box(b'mvhd', 1, 0, struct.pack('>QQIQIH10x', 0, 0, MP4_MOVIE_TIMESCALE, movie_duration, 0x00010000, 0x0100),
+                         _MATRIX, bytes(24), struct.pack('>I', 2))
+        tkhd = _full_box(b'tkhd', 1, 0x000003, struct.pack('>QQIIQ8xhhhH', 0, 0, 1, 0, movie_duration, 0, 0, 0, 0),
+                         _MATRIX, struct.pack('>II', self.width << 16, self.height << 16))
+        mdhd = _full_box(b'mdhd', 1, 0, struct.pack('>QQIQHH', 0, 0, MP4_TIMESCALE, duration, 0x55C4, 0))  # und
+        hdlr = _full_box(b'hdlr', 0, 0, struct.pack('>I4s12x', 0, b'vide'), b'VideoHandler\x00')
+        vmhd = _full_box(b'vmhd', 0, 1, struct.pack('>4H', 0, 0, 0, 0))
+        dinf = _box(b'dinf', _full_box(b'dref', 0, 0, struct.pack('>I', 1), _full_box(b'url ', 0, 1)))
+        trak = _box(b'trak', tkhd, _box(b'mdia', mdhd, hdlr, _box(b'minf', vmhd, dinf, self._stbl())))
+
+        if self.fragmented:
+            mvex = _box(b'mvex', _full_box(b'trex', 0, 0, struct.pack('>5I', 1, 1, 0, 0, 0)))
+            return _box(b'moov', mvhd, trak, mvex)
+        return _box(b'moov', mvhd, trak)
@@ -121,7 +121,7 @@ class AxcliteMSys(AxcliteSingleton):
         val = tuple(dst.values())
         if key in self._link_table and val in self._link_table[key]:
             self._link_table[key].remove(val)
-            if len(self._link_table[key] == 0):
+            if len(self._link_table[key]) == 0:
                 self._link_table.pop(key)
 
         # print(f"src: {src} unlink with dst: {dst} success")
@@ -0,0 +1,182 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import axcl
+from axcl.rt.axcl_rt_engine_type import AXCL_DATA_LAYOUT_NCHW
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+from axclite.axclite_utils import axclite_align_up, axclite_get_stride, axclite_get_image_size
+
+IVPS_STRIDE_ALIGN = 16
+
+_CROP_RESIZE = {
+    'vpp': axcl.ivps.crop_resize_vpp,
+    'vgp': axcl.ivps.crop_resize_vgp,
+    'tdp': axcl.ivps.crop_resize_tdp
+}
+
+_CSC = {
+    'vpp': axcl.ivps.csc_vpp,
+    'vgp': axcl.ivps.csc_vgp,
+    'tdp': axcl.ivps.csc_tdp
+}
+
+
+class AxclitePreprocess(AxcliteResource):
+    """
+    Resize (letterbox) and convert decoded NV12 frames by IVPS directly into the NPU input buffer,
+    so frames never touch host memory.
+
+    If the model width does not meet the IVPS stride alignment, IVPS writes to a device staging
+    buffer and DMA 2D copy removes the stride padding into the dense NPU input buffer.
+    """
+    def __init__(self, engine='vpp', dst_format=axcl.AX_FORMAT_RGB888, letterbox=True, background_color=0x727272):
+        super().__init__(self.__class__.__name__)
+        if engine not in _CROP_RESIZE:
+            raise ValueError(f"engine {engine} not support")
+
+        self.engine = engine
+        self.dst_format = dst_format
+        self.letterbox = letterbox
+        self.background_color = background_color
+        self.width = 0
+        self.height = 0
+        self.input_addr = 0
+        self.input_size = 0
+        self.staging_addr = 0
+        self.dst = None
+        self.aspect_ratio = None
+        # scale_x, scale_y, pad_x, pad_y of last resize to map model coordinates back to the frame
+        self.transform = (1.0, 1.0, 0, 0)
+
+    def configure(self, info: int, io: int, index: int = 0, group: int = 0) -> int:
+        """
+        configure from the model signature of input index and bind the NPU input buffer already set by engine_set_input_buffer_by_index
+        """
+        dims, ret = axcl.rt.engine_get_input_dims(info, group, index)
+        if ret != axcl.AXCL_SUCC:
+            return ret
+
+        layout, ret = axcl.rt.engine_get_input_data_layout(info, index)
+        if ret != axcl.AXCL_SUCC:
+            return ret
+
+        if len(dims) != 4 or layout == AXCL_DATA_LAYOUT_NCHW:
+            print(f"input {index} dims {dims} layout {layout} is not a NHWC image")
+            return 1
+
+        if self.dst_format == axcl.AX_FORMAT_YUV420_SEMIPLANAR:
+            # NV12 input is [1, h * 3 / 2, w, 1]
+            self.height = dims[1] * 2 // 3
+        else:
+            self.height = dims[1]
+        self.width = dims[2]
+
+        self.input_addr, self.input_size, ret = axcl.rt.engine_get_input_buffer_by_index(io, index)
+        if ret != axcl.AXCL_SUCC or not self.input_addr:
+            print(f"input {index} buffer is not set, ret = 0x{ret&0xFFFFFFFF:x}")
+            return ret if ret != axcl.AXCL_SUCC else 1
+
+        dense_stride = axclite_get_stride(self.width, self.dst_format)
+        image_size = axclite_get_image_size(dense_stride, self.height, self.dst_format)
+        if image_size > self.input_size:
+            print(f"input {index} buffer size {self.input_size} < image size {image_size}")
+            return 1
+
+        dst_addr = self.input_addr
+        stride = dense_stride
+        device_mem_free(self.staging_addr)
+        self.staging_addr = 0
+        if self.width % IVPS_STRIDE_ALIGN != 0:
+            stride = axclite_get_stride(axclite_align_up(self.width, IVPS_STRIDE_ALIGN), self.dst_format)
+            self.staging_addr = device_mem_alloc(axclite_get_image_size(stride, self.height, self.dst_format))
+            if self.staging_addr == 0:
+                return 1
+            dst_addr = self.staging_addr
+
+        self.dst = {
+            'width': self.width,
+            'height': self.height,
+            'img_format': self.dst_format,
+            'pic_stride': [stride, stride, 0],
+            'phy_addr': [dst_addr, dst_addr + stride * self.height if self.dst_format == axcl.AX_FORMAT_YUV420_SEMIPLANAR else 0, 0],
+            'vir_addr': [0],
+            'frame_size': axclite_get_image_size(stride, self.height, self.dst_format)
+        }
+
+        self.aspect_ratio = {
+            'aspect_ratio_mode': axcl.AX_IVPS_ASPECT_RATIO_AUTO if self.letterbox else axcl.AX_IVPS_ASPECT_RATIO_STRETCH,
+            'background_color': self.background_color,
+            'alignments': [axcl.AX_IVPS_ASPECT_RATIO_HORIZONTAL_CENTER, axcl.AX_IVPS_ASPECT_RATIO_VERTICAL_CENTER],
+            'rectangle': {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+        }
+
+        print(f"preprocess {self.engine}: {self.width}x{self.height} to 0x{self.input_addr:x}, staging: {self.staging_addr != 0}")
+        return axcl.AXCL_SUCC
+
+    def destroy(self):
+        device_mem_free(self.staging_addr)
+        self.staging_addr = 0
+        self.dst = None
+
+    def _update_transform(self, src_w, src_h):
+        if not self.letterbox:
+            self.transform = (self.width / src_w, self.height / src_h, 0, 0)
+            return
+
+        scale = min(self.width / src_w, self.height / src_h)
+        pad_x = (self.width - int(src_w * scale)) // 2
+        pad_y = (self.height - int(src_h * scale)) // 2
+        self.transform = (scale, scale, pad_x, pad_y)
+
+    def run(self, frame: dict) -> int:
+        """
+        :param frame: AX_VIDEO_FRAME_T dict, such as frame['video_frame'] from vdec or ivps
+        """
+        if self.dst is None:
+            print("preprocess is not configured")
+            return 1
+
+        if frame['width'] == self.width and frame['height'] == self.height:
+            ret = _CSC[self.engine](frame, self.dst)
+        else:
+            ret = _CROP_RESIZE[self.engine](frame, self.dst, self.aspect_ratio)
+        if ret != axcl.AXCL_SUCC:
+            print(f"preprocess {self.engine} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return ret
+
+        self._update_transform(frame['width'], frame['height'])
+
+        if self.staging_addr:
+            ret = self._remove_stride_padding()
+
+        return ret
+
+    def _remove_stride_padding(self):
+        dense_stride = axclite_get_stride(self.width, self.dst_format)
+        stride = self.dst['pic_stride'][0]
+        rows = self.height * 3 // 2 if self.dst_format == axcl.AX_FORMAT_YUV420_SEMIPLANAR else self.height
+        dim_desc = {
+            'n_tiles': [rows],
+            'src_info': {'phy_addr': self.staging_addr, 'img_w': dense_stride, 'stride': [stride]},
+            'dst_info': {'phy_addr': self.input_addr, 'img_w': dense_stride, 'stride': [dense_stride]}
+        }
+        ret = axcl.dmadim.mem_copy_xd(dim_desc, axcl.AX_DMADIM_2D)
+        if ret != axcl.AXCL_SUCC:
+            print(f"preprocess remove stride padding fail, ret = 0x{ret&0xFFFFFFFF:x}")
+        return ret
+
+    def map_to_frame(self, x, y):
+        """
+        map a point of model input coordinates back to frame coordinates
+        """
+        scale_x, scale_y, pad_x, pad_y = self.transform
+        return (x - pad_x) / scale_x, (y - pad_y) / scale_y
@@ -0,0 +1,292 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import ctypes
+import os
+import threading
+from array import array
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+
+
+class AxclitePrerollRecorder(AxcliteObserver, AxcliteResource):
+    """
+    Keep the last seconds of encoded packets of one channel, and record them with the following packets on trigger.
+
+    Packets are copied from device into one preallocated ring of ring_size bytes, a packet never wraps around the
+    end of ring. Offset, length, pts and key flag of packets and the sequence numbers of key frames (the GOP index)
+    are kept in preallocated arrays, so nothing is allocated per packet. The oldest packets are overwritten when
+    the ring or the index is full.
+
+    trigger() starts recording from the most recent key frame at or before (last pts - pre_roll), a thread writes
+    packets to the sink. Once post_roll has passed, axcl.venc.request_idr is called and recording ends just before
+    the next key frame, so the next clip starts from an IDR at once. Packets being written are not overwritten, if
+    the sink is slower than the encoder, new packets are dropped after timeout.
+
+    sink is any object with write_frame(data, pts, key) and close(), such as AxcliteMp4Muxer or AxcliteStreamWriter,
+    data is a memoryview of the ring which is valid only during the call. A sink factory can be given to trigger()
+    instead, it is called only if a new recording starts, so no file is created when an event extends a recording.
+
+    usage:
+        recorder = AxclitePrerollRecorder(device, encoder.get_chn_id())
+        encoder.register_observer(recorder)
+        ...
+        recorder.trigger(lambda: AxcliteMp4Muxer(device, 'event.mp4', axcl.PT_H264, 1920, 1080, fragmented=False), 5, 10)
+    """
+    def __init__(self, device, chn, ring_size=0x800000, max_packets=4096, max_gops=1024, timeout=1.0):
+        """
+        :param chn: venc channel, to request IDR at the end of recording
+        :param ring_size: bytes of ring, should hold pre_roll seconds at max bitrate
+        :param max_packets: max packets in ring
+        :param max_gops: max key frames in ring
+        :param timeout: max seconds to wait for the sink before a packet is dropped
+        """
+        AxcliteResource.__init__(self, self.__class__.__name__)
+        self.device = device
+        self.chn = chn
+        self.ring_size = ring_size
+        self.max_packets = max_packets
+        self.max_gops = max_gops
+        self.timeout = timeout
+
+        self.ring = bytearray(ring_size)
+        self.view = memoryview(self.ring)
+        self._ring_c = (ctypes.c_char * ring_size).from_buffer(self.ring)
+        self.ring_addr = ctypes.addressof(self._ring_c)
+
+        # packet index, packet seq is monotonic, index in arrays is seq % max_packets
+        self.positions = array('Q', bytes(8 * max_packets))  # virtual position in ring, offset is position % ring_size
+        self.lengths = array('I', bytes(4 * max_packets))
+        self.pts = array('Q', bytes(8 * max_packets))
+        self.keys = array('B', bytes(max_packets))
+        self.head_seq = 0
+        self.tail_seq = 0
+        self.head_pos = 0
+
+        # GOP index, seq of key packets
+        self.gops = array('Q', bytes(8 * max_gops))
+        self.gop_head = 0
+        self.gop_tail = 0
+
+        self.sink = None
+        self.read_seq = -1
+        self.stop_seq = -1
+        self.end_pts = 0
+        self.idr_requested = False
+        self.recordings = 0
+        self.dropped = 0
+        self.closed = False
+        self.thread = None
+        self._cond = threading.Condition()
+
+    def update(self, data):
+        self.write_pack(data['pack'])
+
+    def write_pack(self, pack) -> bool:
+        """
+        copy one packet into ring, called from the receive thread before the stream is released
+        :return: False if the packet is dropped
+        """
+        size = pack['len']
+        if size == 0:
+            return True
+        if size > self.ring_size:
+            self.dropped += 1
+            return False
+
+        key = pack.get('coding_type') == axcl.AX_VENC_INTRA_FRAME
+        with self._cond:
+            if self.closed:
+                return False
+
+            pos = self.head_pos
+            if pos % self.ring_size + size > self.ring_size:
+                # skip to head of ring, never wrap a packet
+                pos += self.ring_size - pos % self.ring_size
+            if not self._cond.wait_for(lambda: self._evict(pos + size), self.timeout):
+                self.dropped += 1
+                print(f"device {self.device:02x}: veChn {self.chn} recording is too slow, drop packet of {size} bytes")
+                return False
+
+        # copied outside lock, the range is neither read nor evicted
+        offset = pos % self.ring_size
+        ret = axcl.rt.memcpy(self.ring_addr + offset, pack['phy_addr'], size, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: copy packet of {size} bytes from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self.dropped += 1
+            return False
+
+        with self._cond:
+            seq = self.head_seq
+            index = seq % self.max_packets
+            self.positions[index] = pos
+            self.lengths[index] = size
+            self.pts[index] = pack['pts']
+            self.keys[index] = key
+            if key:
+                if self.gop_head - self.gop_tail == self.max_gops:
+                    self.gop_tail += 1
+                self.gops[self.gop_head % self.max_gops] = seq
+                self.gop_head += 1
+            self.head_pos = pos + size
+            self.head_seq = seq + 1
+
+            if self.sink and self.stop_seq < 0:
+                if self.read_seq < 0:
+                    # no key frame in ring when triggered
+                    if key:
+                        self.read_seq = seq
+                elif pack['pts'] >= self.end_pts:
+                    if key:
+                        self.stop_seq = seq
+                    elif not self.idr_requested:
+                        self.idr_requested = True
+                        ret = axcl.venc.request_idr(self.chn, 1)
+                        if ret != axcl.AXCL_SUCC:
+                            print(f"device {self.device:02x}: request IDR of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self._cond.notify_all()
+        return True
+
+    @property
+    def recording(self) -> bool:
+        """
+        True if a recording is active and would be extended by trigger()
+        """
+        with self._cond:
+            return self.sink is not None and self.stop_seq < 0
+
+    def trigger(self, sink, pre_roll, post_roll) -> bool:
+        """
+        start recording, or extend the current recording by post_roll
+        :param sink: sink of the recording, or a callable returning it which is called only if a new recording starts
+        :param pre_roll: seconds before the last packet
+        :param post_roll: seconds after the last packet
+        :return: False if closed or the sink factory fails, a sink object is closed and its empty file is removed
+                 if the current recording is extended
+        """
+        factory = None if hasattr(sink, 'write_frame') else sink
+        with self._cond:
+            if self.closed:
+                if factory is None:
+                    self._discard(sink)
+                return False
+
+            last_pts = self.pts[(self.head_seq - 1) % self.max_packets] if self.head_seq > self.tail_seq else 0
+            if self.sink:
+                if self.stop_seq < 0:
+                    self.end_pts = max(self.end_pts, last_pts + int(post_roll * 1000000))
+                    self.idr_requested = False
+                    if factory is None and sink is not self.sink:
+                        self._discard(sink)
+                    return True
+                # the previous recording is finishing, wait for it
+                self._cond.wait_for(lambda: self.sink is None)
+
+            if factory is not None:
+                sink = factory()
+                if sink is None:
+                    return False
+
+            start_pts = last_pts - int(pre_roll * 1000000)
+            self.read_seq = -1
+            for i in range(self.gop_head - 1, self.gop_tail - 1, -1):
+                seq = self.gops[i % self.max_gops]
+                self.read_seq = seq
+                if self.pts[seq % self.max_packets] <= start_pts:
+                    break
+
+            self.sink = sink
+            self.stop_seq = -1
+            self.end_pts = last_pts + int(post_roll * 1000000)
+            self.idr_requested = False
+            self.recordings += 1
+
+        if self.thread:
+            self.thread.join()
+        self.thread = threading.Thread(target=self.record_worker, name=f'preroll_recorder_{self.chn}')
+        self.thread.start()
+        return True
+
+    def record_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.closed or self.stop_seq >= 0 or 0 <= self.read_seq < self.head_seq)
+                seq = self.read_seq
+                if seq < 0 or seq >= self.head_seq or seq == self.stop_seq:
+                    # stopped or closed
+                    break
+                index = seq % self.max_packets
+                offset = self.positions[index] % self.ring_size
+                size = self.lengths[index]
+                pts = self.pts[index]
+                key = self.keys[index]
+
+            self.sink.write_frame(self.view[offset:offset + size], pts, bool(key))
+
+            with self._cond:
+                self.read_seq = seq + 1
+                self._cond.notify_all()
+
+        self.sink.close()
+        with self._cond:
+            self.sink = None
+            self.read_seq = -1
+            self.stop_seq = -1
+            self._cond.notify_all()
+
+        context.destroy()
+
+    @staticmethod
+    def _discard(sink):
+        # a sink such as AxcliteMp4Muxer opens its file when it is created
+        sink.close()
+        file_path = getattr(sink, 'file_path', None)
+        if file_path and os.path.isfile(file_path) and os.path.getsize(file_path) == 0:
+            os.remove(file_path)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def destroy(self):
+        self.close()
+        self._ring_c = None
+        self.view.release()
+
+    def statistics(self):
+        with self._cond:
+            count = self.head_seq - self.tail_seq
+            duration = 0
+            if count:
+                duration = self.pts[(self.head_seq - 1) % self.max_packets] - self.pts[self.tail_seq % self.max_packets]
+                size = self.head_pos - self.positions[self.tail_seq % self.max_packets]
+            return {'packets': count, 'gops': self.gop_head - self.gop_tail, 'bytes': size if count else 0,
+                    'duration_ms': duration // 1000, 'recordings': self.recordings, 'dropped': self.dropped}
+
+    def _evict(self, end) -> bool:
+        # evict oldest packets until [end - ring_size, end) is free and index has room, never evict unread packets
+        while self.tail_seq < self.head_seq and (end - self.positions[self.tail_seq % self.max_packets] > self.ring_size
+                                                 or self.head_seq - self.tail_seq >= self.max_packets):
+            if 0 <= self.read_seq <= self.tail_seq and self.sink:
+                return False
+            if self.gop_tail < self.gop_head and self.gops[self.gop_tail % self.max_gops] == self.tail_seq:
+                self.gop_tail += 1
+            self.tail_seq += 1
+        return True
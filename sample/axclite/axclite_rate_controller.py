@@ -0,0 +1,337 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import copy
+import math
+import threading
+import time
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+from axclite.axclite_venc import AxcliteVenc
+
+# rc attr key of rc param: key of bitrate in kbps
+VENC_RC_BITRATE_KEYS = {
+    'h264_cbr_rc_attr': 'bitrate',
+    'h264_vbr_rc_attr': 'max_bitrate',
+    'h264_avbr_rc_attr': 'max_bitrate',
+    'h264_qvbr_rc_attr': 'target_bitrate',
+    'h264_cvbr_rc_attr': 'max_bitrate',
+    'h264_qp_map_rc_attr': 'target_bitrate',
+    'h265_cbr_rc_attr': 'bitrate',
+    'h265_vbr_rc_attr': 'max_bitrate',
+    'h265_avbr_rc_attr': 'max_bitrate',
+    'h265_qvbr_rc_attr': 'target_bitrate',
+    'h265_cvbr_rc_attr': 'max_bitrate',
+    'h265_qp_map_rc_attr': 'target_bitrate',
+    'mjpeg_cbr_rc_attr': 'bitrate',
+    'mjpeg_vbr_rc_attr': 'max_bitrate'
+}
+
+
+class _RateChannel(AxcliteObserver):
+    """
+    count output bytes of one channel, updated by the receive thread and read by the control thread
+    """
+    def __init__(self, encoder, weight, param, rc_key):
+        self.encoder = encoder
+        self.chn = encoder.get_chn_id()
+        self.weight = weight
+        self.rc_key = rc_key
+        self.bitrate_key = VENC_RC_BITRATE_KEYS[rc_key]
+        self.nominal = copy.deepcopy(param)
+        self.nominal_kbps = param[rc_key][self.bitrate_key]
+        self.nominal_fps = param['frame_rate']['dst_frame_rate']
+        self.bytes = 0
+        self.frames = 0
+
+        self.last_bytes = 0
+        self.last_frames = 0
+        self.kbps = -1.0
+        self.fps = 0.0
+        self.demand = self.nominal_kbps
+        self.target_kbps = self.nominal_kbps
+        self.bitrate = self.nominal_kbps
+        self.dst_fps = self.nominal_fps
+        self.backlog = 0
+        self.changes = 0
+        self.idrs = 0
+        self.last_idr = 0.0
+        self.idr_bitrate = self.nominal_kbps
+        self.idr_fps = self.nominal_fps
+
+    def update(self, data):
+        self.bytes += data['pack']['len']
+        self.frames += 1
+
+
+class AxcliteRateController(AxcliteResource):
+    """
+    Closed-loop rate control of encode channels sharing one link of budget_kbps.
+
+    Output bytes of each attached channel are counted from its streams, and every interval the measured bitrate
+    (smoothed by EWMA) is compared to the share of budget the channel is allocated:
+        1. the budget (scaled by headroom) is shared by weight, a channel using less than its share keeps only
+           what it uses, and the rest is shared by others (water filling), no channel gets more than its
+           configured bitrate
+        2. if streams are queued in the encoder (query_status left_stream_frames >= backlog_frames), the link or
+           the consumer is too slow, the budget is reduced by step at once and recovered slowly
+        3. bitrate of rc param is corrected by target / measured, limited to step per interval, so a channel
+           overshooting its set bitrate is brought back to its share
+        4. bitrate never goes below min_kbps at the configured frame rate, below that the destination frame
+           rate is reduced down to min_fps, and the max QP is raised by 6 per halving of bitrate (capped at 51)
+           so the encoder is able to reach the lower bitrate instead of overflowing
+        5. IDR is requested once bitrate or frame rate has changed by more than idr_ratio since the last IDR,
+           at most once per idr_holdoff seconds per channel
+    Changes are applied by axcl.venc.set_rc_param, the channel is neither stopped nor recreated.
+
+    usage:
+        controller = AxcliteRateController(device, 8000)
+        for encoder in encoders:
+            controller.attach(encoder)
+        controller.start()
+        ...
+        controller.set_budget(4000)
+        ...
+        controller.stop()
+    """
+    def __init__(self, device, budget_kbps, interval=1.0, min_kbps=256, min_fps=5, headroom=0.9, step=0.25,
+                 smoothing=0.5, deadband=0.05, backlog_frames=2, idr_ratio=0.3, idr_holdoff=2.0):
+        """
+        :param budget_kbps: aggregate bitrate of all attached channels
+        :param interval: seconds between two adjustments
+        :param min_kbps: min bitrate of a channel at its configured frame rate
+        :param min_fps: min destination frame rate of a channel
+        :param headroom: ratio of budget allocated, the rest absorbs I frames and measurement error
+        :param step: max ratio of bitrate change per interval
+        :param smoothing: EWMA weight of the latest measurement
+        :param deadband: ratio of bitrate change ignored
+        :param backlog_frames: queued streams of a channel taken as congestion
+        :param idr_ratio: ratio of change since the last IDR requesting IDR
+        :param idr_holdoff: min seconds between two IDR requests of a channel
+        """
+        super().__init__(self.__class__.__name__)
+        self.device = device
+        self.budget_kbps = budget_kbps
+        self.interval = interval
+        self.min_kbps = min_kbps
+        self.min_fps = min_fps
+        self.headroom = headroom
+        self.step = step
+        self.smoothing = smoothing
+        self.deadband = deadband
+        self.backlog_frames = backlog_frames
+        self.idr_ratio = idr_ratio
+        self.idr_holdoff = idr_holdoff
+
+        self.channels = {}
+        self.pressure = 1.0
+        self.congestions = 0
+        self.thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def attach(self, encoder: AxcliteVenc, weight=1.0):
+        """
+        control an encoder created, its current rc param is taken as the max bitrate and frame rate
+        """
+        chn = encoder.get_chn_id()
+        param, ret = axcl.venc.get_rc_param(chn)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: get rc param of veChn {chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return ret
+
+        rc_key = next((key for key in param if key in VENC_RC_BITRATE_KEYS), None)
+        if rc_key is None or param[rc_key][VENC_RC_BITRATE_KEYS[rc_key]] == 0:
+            print(f"device {self.device:02x}: rc mode {param.get('rc_mode')} of veChn {chn} has no bitrate to control")
+            return 1
+
+        channel = _RateChannel(encoder, weight, param, rc_key)
+        with self._lock:
+            if chn in self.channels:
+                return axcl.AXCL_SUCC
+            self.channels[chn] = channel
+        encoder.register_observer(channel)
+        return axcl.AXCL_SUCC
+
+    def detach(self, encoder: AxcliteVenc, restore=True):
+        """
+        :param restore: restore the rc param of the encoder when attached
+        """
+        chn = encoder.get_chn_id()
+        with self._lock:
+            channel = self.channels.pop(chn, None)
+        if channel is None:
+            return
+
+        encoder.unregister_observer(channel)
+        if restore and (channel.bitrate != channel.nominal_kbps or channel.dst_fps != channel.nominal_fps):
+            ret = axcl.venc.set_rc_param(chn, channel.nominal)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: restore rc param of veChn {chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+
+    def set_budget(self, budget_kbps):
+        """
+        change the aggregate bitrate, such as the uplink is measured to change, applied at the next interval
+        """
+        self.budget_kbps = budget_kbps
+
+    def start(self):
+        if self.thread:
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self.control_worker, name='rate_controller')
+        self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def destroy(self):
+        self.stop()
+        with self._lock:
+            encoders = [channel.encoder for channel in self.channels.values()]
+        for encoder in encoders:
+            self.detach(encoder, restore=False)
+
+    def control_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        last = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            now = time.monotonic()
+            elapsed = now - last
+            last = now
+            with self._lock:
+                channels = list(self.channels.values())
+            if channels and elapsed > 0:
+                self._measure(channels, elapsed)
+                self._allocate(channels)
+                for channel in channels:
+                    self._apply(channel, now)
+
+        context.destroy()
+
+    def statistics(self):
+        with self._lock:
+            channels = list(self.channels.values())
+        return {
+            'budget_kbps': self.budget_kbps,
+            'kbps': round(sum(max(channel.kbps, 0) for channel in channels)),
+            'pressure': round(self.pressure, 2),
+            'congestions': self.congestions,
+            'channels': [{'chn': channel.chn, 'kbps': round(max(channel.kbps, 0)), 'target_kbps': round(channel.target_kbps),
+                          'bitrate': channel.bitrate, 'fps': round(channel.fps, 1), 'dst_fps': channel.dst_fps,
+                          'backlog': channel.backlog, 'changes': channel.changes, 'idrs': channel.idrs} for channel in channels]
+        }
+
+    def _measure(self, channels, elapsed):
+        congested = False
+        for channel in channels:
+            total, frames = channel.bytes, channel.frames
+            kbps = (total - channel.last_bytes) * 8 / elapsed / 1000
+            channel.fps = (frames - channel.last_frames) / elapsed
+            channel.last_bytes, channel.last_frames = total, frames
+            channel.kbps = kbps if channel.kbps < 0 else self.smoothing * kbps + (1 - self.smoothing) * channel.kbps
+
+            status, ret = axcl.venc.query_status(channel.chn)
+            if ret == axcl.AXCL_SUCC:
+                channel.backlog = status['left_stream_frames']
+                if channel.backlog >= self.backlog_frames:
+                    congested = True
+
+        # back off at once on congestion, recover by a quarter of step per interval
+        if congested:
+            self.congestions += 1
+            self.pressure = max(self.pressure * (1 - self.step), 0.1)
+        else:
+            self.pressure = min(1.0, self.pressure + self.step / 4)
+
+    def _allocate(self, channels):
+        budget = self.budget_kbps * self.headroom * self.pressure
+        pending = []
+        for channel in channels:
+            # a channel using most of its bitrate may use up to the configured one, otherwise (such as VBR of a
+            # static scene) it keeps what it would use at the configured bitrate
+            usage = channel.kbps / channel.bitrate
+            channel.demand = channel.nominal_kbps if usage >= 0.8 else channel.nominal_kbps * usage * 1.25
+            pending.append(channel)
+
+        while pending:
+            share = budget / sum(channel.weight for channel in pending)
+            satisfied = [channel for channel in pending if channel.demand <= share * channel.weight]
+            if not satisfied:
+                for channel in pending:
+                    channel.target_kbps = share * channel.weight
+                break
+            for channel in satisfied:
+                channel.target_kbps = channel.demand
+                budget -= channel.demand
+                pending.remove(channel)
+
+    def _apply(self, channel, now):
+        # frame rate is reduced once the target is below min bitrate, bits per frame are kept at the minimum
+        dst_fps = channel.nominal_fps
+        if channel.target_kbps < self.min_kbps:
+            dst_fps = max(min(self.min_fps, channel.nominal_fps), round(channel.nominal_fps * channel.target_kbps / self.min_kbps))
+        floor = self.min_kbps * dst_fps / channel.nominal_fps
+
+        # correct the encoder deviation from its set bitrate, limited to step per interval
+        bitrate = channel.target_kbps
+        if channel.kbps > 0:
+            bitrate *= min(2.0, max(0.5, channel.bitrate / channel.kbps))
+        bitrate = min(max(bitrate, channel.bitrate * (1 - self.step)), channel.bitrate * (1 + self.step))
+        bitrate = max(1, int(min(max(bitrate, floor), channel.nominal_kbps)))
+
+        if abs(bitrate - channel.bitrate) < channel.bitrate * self.deadband and dst_fps == channel.dst_fps:
+            return
+
+        param, ret = axcl.venc.get_rc_param(channel.chn)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: get rc param of veChn {channel.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return
+
+        rc = param[channel.rc_key]
+        nominal = channel.nominal[channel.rc_key]
+        rc[channel.bitrate_key] = bitrate
+        for key in ('long_term_max_bitrate', 'long_term_min_bitrate'):
+            if key in rc:
+                rc[key] = min(nominal[key], bitrate)
+        qp_delta = round(6 * math.log2(channel.nominal_kbps / bitrate))
+        for key in ('max_qp', 'max_iqp'):
+            if key in rc:
+                rc[key] = min(max(51, nominal[key]), nominal[key] + qp_delta)
+        param['frame_rate']['dst_frame_rate'] = dst_fps
+
+        ret = axcl.venc.set_rc_param(channel.chn, param)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: set veChn {channel.chn} bitrate {bitrate} kbps, {dst_fps} fps fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return
+
+        channel.bitrate = bitrate
+        channel.dst_fps = dst_fps
+        channel.changes += 1
+
+        # the new rate takes effect from a fresh GOP, changes are accumulated from the last IDR
+        ratio = max(abs(bitrate - channel.idr_bitrate) / channel.idr_bitrate, abs(dst_fps - channel.idr_fps) / channel.idr_fps)
+        if ratio >= self.idr_ratio and now - channel.last_idr >= self.idr_holdoff:
+            ret = axcl.venc.request_idr(channel.chn, 1)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: request IDR of veChn {channel.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            else:
+                channel.idrs += 1
+                channel.last_idr = now
+                channel.idr_bitrate = bitrate
+                channel.idr_fps = dst_fps
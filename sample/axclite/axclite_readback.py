@@ -0,0 +1,116 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import ctypes
+import numpy as np
+
+import axcl
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+
+
+class AxcliteFrameReader(AxcliteResource):
+    """
+    Read NV12 frames back to host as dense numpy arrays of shape (h * 3 / 2, w).
+
+    Stride padding is dropped on device by DMA 2D into a staging buffer, then the whole batch is
+    copied to host by one memcpy. Staging and host (pinned if possible) buffers are allocated once,
+    so returned arrays are views which are overwritten by the next read.
+    """
+    def __init__(self, width: int, height: int, max_batch: int = 1):
+        super().__init__(self.__class__.__name__)
+        self.width = width
+        self.height = height
+        self.max_batch = max_batch
+        self.frame_size = width * height * 3 // 2
+        self.host_ptr = 0
+        self.staging = device_mem_alloc(self.frame_size * max_batch)
+        if self.staging == 0:
+            raise RuntimeError(f"alloc staging buffer of {max_batch} x {self.frame_size} fail")
+
+        size = self.frame_size * max_batch
+        host_ptr, ret = axcl.rt.malloc_host(size)
+        if ret == axcl.AXCL_SUCC and host_ptr:
+            self.host_ptr = host_ptr
+            self.host = np.ctypeslib.as_array((ctypes.c_uint8 * size).from_address(host_ptr))
+        else:
+            self.host = np.empty(size, dtype=np.uint8)
+        self.host = self.host.reshape(max_batch, height * 3 // 2, width)
+
+    def destroy(self):
+        device_mem_free(self.staging)
+        self.staging = 0
+        if self.host_ptr:
+            self.host = None
+            axcl.rt.free_host(self.host_ptr)
+            self.host_ptr = 0
+
+    def read(self, frame: dict) -> np.ndarray:
+        """
+        :param frame: AX_VIDEO_FRAME_T dict, such as frame['video_frame'] from vdec
+        :return: (h * 3 / 2, w) uint8 array, None if failure
+        """
+        frames = self.read_batch([frame])
+        return None if frames is None else frames[0]
+
+    def read_batch(self, frames: list) -> np.ndarray:
+        """
+        :param frames: list of AX_VIDEO_FRAME_T dict, all frames should be width x height
+        :return: (n, h * 3 / 2, w) uint8 array, None if failure
+        """
+        n = len(frames)
+        if n == 0 or n > self.max_batch:
+            print(f"batch {n} is out of [1, {self.max_batch}]")
+            return None
+
+        for i, frame in enumerate(frames):
+            if frame['width'] != self.width or frame['height'] != self.height:
+                print(f"frame {frame['width']}x{frame['height']} is not {self.width}x{self.height}")
+                return None
+
+            ret = self._stage(frame, self.staging + i * self.frame_size)
+            if ret != axcl.AXCL_SUCC:
+                return None
+
+        ret = axcl.rt.memcpy(self.host.ctypes.data, self.staging, self.frame_size * n, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+        if ret != axcl.AXCL_SUCC:
+            print(f"copy {n} frames from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None
+
+        return self.host[:n]
+
+    def _stage(self, frame, dst):
+        stride = frame['pic_stride'][0]
+        y_addr = frame['phy_addr'][0]
+        uv_addr = frame['phy_addr'][1]
+        y_size = self.width * self.height
+
+        if stride == self.width and uv_addr in (0, y_addr + y_size):
+            # already dense
+            ret = axcl.dmadim.mem_copy(dst, y_addr, self.frame_size)
+        else:
+            ret = self._copy_2d(dst, y_addr, stride, self.height)
+            if ret == axcl.AXCL_SUCC:
+                uv_stride = frame['pic_stride'][1] if frame['pic_stride'][1] else stride
+                uv_addr = uv_addr if uv_addr else y_addr + stride * self.height
+                ret = self._copy_2d(dst + y_size, uv_addr, uv_stride, self.height // 2)
+
+        if ret != axcl.AXCL_SUCC:
+            print(f"remove stride padding of frame fail, ret = 0x{ret&0xFFFFFFFF:x}")
+        return ret
+
+    def _copy_2d(self, dst, src, stride, rows):
+        dim_desc = {
+            'n_tiles': [rows],
+            'src_info': {'phy_addr': src, 'img_w': self.width, 'stride': [stride]},
+            'dst_info': {'phy_addr': dst, 'img_w': self.width, 'stride': [self.width]}
+        }
+        return axcl.dmadim.mem_copy_xd(dim_desc, axcl.AX_DMADIM_2D)
@@ -0,0 +1,189 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import numpy as np
+
+import axcl
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+from axclite.axclite_utils import axclite_align_up, axclite_get_stride, axclite_get_image_size
+
+IVPS_STRIDE_ALIGN = 16
+# max boxes of one crop_resize_v2 call
+IVPS_MAX_CROP_NUM = 32
+# max rows of one DMA 2D copy, n_tiles is AX_U16
+DMADIM_MAX_ROWS = 0xFFFF
+
+_CROP_RESIZE_V2 = {
+    'vpp': axcl.ivps.crop_resize_v2_vpp,
+    'vgp': axcl.ivps.crop_resize_v2_vgp,
+    'tdp': axcl.ivps.crop_resize_v2_tdp
+}
+
+
+def axclite_clip_boxes(boxes, frame_width: int, frame_height: int, align: int = 2) -> np.ndarray:
+    """
+    convert N x 4 boxes of [x1, y1, x2, y2] to N x 4 rects of [x, y, w, h] clipped to the frame and aligned by align
+
+    :return: int32 array, empty boxes have zero width or height
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    x1 = np.clip(boxes[:, 0], 0, frame_width).astype(np.int32) & ~(align - 1)
+    y1 = np.clip(boxes[:, 1], 0, frame_height).astype(np.int32) & ~(align - 1)
+    x2 = np.clip(boxes[:, 2], 0, frame_width).astype(np.int32)
+    y2 = np.clip(boxes[:, 3], 0, frame_height).astype(np.int32)
+    w = np.maximum(x2 - x1, 0) & ~(align - 1)
+    h = np.maximum(y2 - y1, 0) & ~(align - 1)
+    return np.stack([x1, y1, w, h], axis=1)
+
+
+class AxcliteRoiBatch(AxcliteResource):
+    """
+    Crop and resize N boxes of one frame into a contiguous [N, H, W, C] batch tensor in one device buffer.
+
+    Boxes are split into several crop_resize_v2 calls if N exceeds max_crop_num. If width does not meet the
+    IVPS stride alignment, the batch is written to a staging buffer and packed densely by one DMA 2D copy.
+    """
+    def __init__(self, width: int, height: int, max_batch: int, engine='vpp', dst_format=axcl.AX_FORMAT_RGB888,
+                 letterbox=False, background_color=0x727272, max_crop_num=IVPS_MAX_CROP_NUM):
+        super().__init__(self.__class__.__name__)
+        if engine not in _CROP_RESIZE_V2:
+            raise ValueError(f"engine {engine} not support")
+
+        self.width = width
+        self.height = height
+        self.max_batch = max_batch
+        self.engine = engine
+        self.dst_format = dst_format
+        self.max_crop_num = max_crop_num
+        self.aspect_ratio = {
+            'aspect_ratio_mode': axcl.AX_IVPS_ASPECT_RATIO_AUTO if letterbox else axcl.AX_IVPS_ASPECT_RATIO_STRETCH,
+            'background_color': background_color,
+            'alignments': [axcl.AX_IVPS_ASPECT_RATIO_HORIZONTAL_CENTER, axcl.AX_IVPS_ASPECT_RATIO_VERTICAL_CENTER],
+            'rectangle': {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+        }
+
+        self.dense_stride = axclite_get_stride(width, dst_format)
+        self.image_size = axclite_get_image_size(self.dense_stride, height, dst_format)
+        self.stride = axclite_get_stride(axclite_align_up(width, IVPS_STRIDE_ALIGN), dst_format)
+        self.tile_size = axclite_get_image_size(self.stride, height, dst_format)
+
+        self.batch_addr = 0
+        self.own_batch = False
+        self.staging_addr = 0
+        if self.stride != self.dense_stride:
+            self.staging_addr = device_mem_alloc(self.tile_size * max_batch)
+            if self.staging_addr == 0:
+                raise RuntimeError(f"alloc staging buffer of {max_batch} x {self.tile_size} fail")
+
+    @property
+    def batch_size(self):
+        return self.image_size * self.max_batch
+
+    def bind(self, addr: int = 0, size: int = 0) -> int:
+        """
+        bind the batch buffer, such as a NPU input buffer from engine_get_input_buffer_by_index.
+        If addr is 0, a device buffer of max_batch images is allocated.
+        """
+        self._free_batch()
+        if addr == 0:
+            addr = device_mem_alloc(self.batch_size)
+            if addr == 0:
+                return 1
+            self.own_batch = True
+        elif size < self.batch_size:
+            print(f"batch buffer size {size} < {self.max_batch} x {self.image_size}")
+            return 1
+
+        self.batch_addr = addr
+        return axcl.AXCL_SUCC
+
+    def destroy(self):
+        self._free_batch()
+        device_mem_free(self.staging_addr)
+        self.staging_addr = 0
+
+    def _free_batch(self):
+        if self.own_batch:
+            device_mem_free(self.batch_addr)
+        self.batch_addr = 0
+        self.own_batch = False
+
+    def _dst(self, index):
+        base = (self.staging_addr if self.staging_addr else self.batch_addr) + index * self.tile_size
+        uv = base + self.stride * self.height if self.dst_format == axcl.AX_FORMAT_YUV420_SEMIPLANAR else 0
+        return {
+            'width': self.width,
+            'height': self.height,
+            'img_format': self.dst_format,
+            'pic_stride': [self.stride, self.stride, 0],
+            'phy_addr': [base, uv, 0],
+            'vir_addr': [0],
+            'frame_size': self.tile_size
+        }
+
+    def run(self, frame: dict, boxes, io: int = 0) -> tuple[np.ndarray, int]:
+        """
+        :param frame: AX_VIDEO_FRAME_T dict of source frame
+        :param boxes: N x 4 array of [x1, y1, x2, y2] in frame coordinates, boxes over max_batch are ignored
+        :param io: if not 0, engine_set_dynamic_batch_size(io, batch) is called
+        :return: (index, ret), index is N_valid array of box indexes in batch order, empty boxes are skipped
+        """
+        if self.batch_addr == 0:
+            print("roi batch buffer is not bound")
+            return None, 1
+
+        rects = axclite_clip_boxes(boxes, frame['width'], frame['height'])
+        index = np.flatnonzero((rects[:, 2] > 0) & (rects[:, 3] > 0))[:self.max_batch]
+        batch = len(index)
+        if batch == 0:
+            return index, axcl.AXCL_SUCC
+
+        crop = _CROP_RESIZE_V2[self.engine]
+        for start in range(0, batch, self.max_crop_num):
+            end = min(start + self.max_crop_num, batch)
+            box_list = [{'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h)} for x, y, w, h in rects[index[start:end]]]
+            dst_list = [self._dst(i) for i in range(start, end)]
+            ret = crop(frame, box_list, dst_list, self.aspect_ratio)
+            if ret != axcl.AXCL_SUCC:
+                print(f"crop resize v2 {self.engine} boxes [{start}, {end}) fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return index, ret
+
+        if self.staging_addr:
+            ret = self._remove_stride_padding(batch)
+            if ret != axcl.AXCL_SUCC:
+                return index, ret
+
+        if io:
+            ret = axcl.rt.engine_set_dynamic_batch_size(io, batch)
+            if ret != axcl.AXCL_SUCC:
+                print(f"set dynamic batch size {batch} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return index, ret
+
+        return index, axcl.AXCL_SUCC
+
+    def _remove_stride_padding(self, batch):
+        # tiles are contiguous, so the whole batch is rows of stride, copied by chunks of at most DMADIM_MAX_ROWS
+        rows_per_tile = self.height * 3 // 2 if self.dst_format == axcl.AX_FORMAT_YUV420_SEMIPLANAR else self.height
+        total_rows = rows_per_tile * batch
+        for start in range(0, total_rows, DMADIM_MAX_ROWS):
+            rows = min(DMADIM_MAX_ROWS, total_rows - start)
+            dim_desc = {
+                'n_tiles': [rows],
+                'src_info': {'phy_addr': self.staging_addr + start * self.stride, 'img_w': self.dense_stride, 'stride': [self.stride]},
+                'dst_info': {'phy_addr': self.batch_addr + start * self.dense_stride, 'img_w': self.dense_stride,
+                             'stride': [self.dense_stride]}
+            }
+            ret = axcl.dmadim.mem_copy_xd(dim_desc, axcl.AX_DMADIM_2D)
+            if ret != axcl.AXCL_SUCC:
+                print(f"roi batch remove stride padding of rows [{start}, {start + rows}) fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return ret
+        return axcl.AXCL_SUCC
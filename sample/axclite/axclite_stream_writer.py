@@ -0,0 +1,209 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import ctypes
+import os
+import threading
+import time
+from pathlib import Path
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+
+# fsync policies
+STREAM_FSYNC_NONE = 0      # leave it to OS
+STREAM_FSYNC_CLOSE = 1     # fsync once on close
+STREAM_FSYNC_INTERVAL = 2  # fsync every fsync_interval seconds and on close
+STREAM_FSYNC_IDR = 3       # fsync after each key frame is written and on close
+
+
+class AxcliteStreamWriter(AxcliteObserver, AxcliteResource):
+    """
+    Write encoded streams to a file without blocking the receive thread on disk IO.
+
+    Each packet is copied from pack['phy_addr'] into a host ring buffer (pinned if possible) by one memcpy,
+    so the stream can be released at once. A writer thread flushes the ring to the file, which is kept open,
+    by large coalesced writes once flush_size bytes are pending or flush_interval has passed.
+    If the ring is full the receive thread waits up to timeout, then the packet is dropped and counted.
+
+    usage:
+        writer = AxcliteStreamWriter(device, '/tmp/axcl/dump.h265')
+        encoder.register_observer(writer)
+        ...
+        encoder.stop()
+        writer.close()
+    """
+    def __init__(self, device, file_path, ring_size=0x800000, flush_size=0x100000, flush_interval=0.5,
+                 fsync=STREAM_FSYNC_CLOSE, fsync_interval=5, timeout=1.0):
+        """
+        :param ring_size: host ring buffer size, should be larger than the largest packet
+        :param flush_size: pending bytes to start a write
+        :param flush_interval: max seconds a packet stays in ring
+        :param fsync: STREAM_FSYNC_XXX
+        :param timeout: max seconds to wait for free ring space
+        """
+        AxcliteResource.__init__(self, self.__class__.__name__)
+        self.device = device
+        self.file_path = file_path
+        self.ring_size = ring_size
+        self.flush_size = min(flush_size, ring_size // 2)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.timeout = timeout
+        self.head = 0
+        self.tail = 0
+        self.sync_pos = -1
+        self.packets = 0
+        self.dropped = 0
+        self.written = 0
+        self.writes = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(file_path, 'wb', buffering=0)
+
+        self.host_ptr, ret = axcl.rt.malloc_host(ring_size)
+        if ret == axcl.AXCL_SUCC and self.host_ptr:
+            self.ring = (ctypes.c_uint8 * ring_size).from_address(self.host_ptr)
+        else:
+            self.host_ptr = 0
+            self.ring = (ctypes.c_uint8 * ring_size)()
+        self.ring_addr = ctypes.addressof(self.ring)
+        self.view = memoryview(self.ring).cast('B')
+
+        self.thread = threading.Thread(target=self.write_worker, name='stream_writer')
+        self.thread.start()
+
+    def update(self, data):
+        self.write_pack(data['pack'])
+
+    def write_pack(self, pack) -> bool:
+        """
+        copy one packet into ring, called from the receive thread before the stream is released
+        :return: False if the packet is dropped
+        """
+        def copy(pos, offset, size):
+            return axcl.rt.memcpy(self.ring_addr + pos, pack['phy_addr'] + offset, size, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+
+        return self._append(pack['len'], copy, pack.get('coding_type') == axcl.AX_VENC_INTRA_FRAME)
+
+    def write_frame(self, data, pts=0, key=False) -> bool:
+        """
+        copy one frame in host memory (bytes or memoryview) into ring
+        :return: False if the frame is dropped
+        """
+        def copy(pos, offset, size):
+            self.view[pos:pos + size] = data[offset:offset + size]
+            return axcl.AXCL_SUCC
+
+        return self._append(len(data), copy, key)
+
+    def _append(self, size, copy, key):
+        if size == 0:
+            return True
+
+        with self._cond:
+            if self.closed:
+                return False
+            if size > self.ring_size or not self._cond.wait_for(lambda: self.ring_size - (self.head - self.tail) >= size, self.timeout):
+                self.dropped += 1
+                print(f"device {self.device:02x}: {self.file_path}: ring is full, drop packet of {size} bytes")
+                return False
+            head = self.head
+
+        # only the producer moves head, writer never reads beyond it
+        pos = head % self.ring_size
+        first = min(size, self.ring_size - pos)
+        ret = copy(pos, 0, first)
+        if ret == axcl.AXCL_SUCC and first < size:
+            ret = copy(0, first, size - first)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: copy packet of {size} bytes from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            with self._cond:
+                self.dropped += 1
+            return False
+
+        with self._cond:
+            self.head = head + size
+            self.packets += 1
+            if self.fsync == STREAM_FSYNC_IDR and key:
+                self.sync_pos = self.head
+            if self.head - self.tail >= self.flush_size or self.sync_pos > self.tail:
+                self._cond.notify_all()
+        return True
+
+    def write_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        last_sync = time.monotonic()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.closed or self.head - self.tail >= self.flush_size or self.sync_pos > self.tail,
+                                    self.flush_interval)
+                head = self.head
+                tail = self.tail
+                sync = self.sync_pos > tail
+                closed = self.closed
+
+            if head > tail:
+                self._write(tail, head)
+                with self._cond:
+                    self.tail = head
+                    self._cond.notify_all()
+
+            now = time.monotonic()
+            if sync or (self.fsync == STREAM_FSYNC_INTERVAL and now - last_sync >= self.fsync_interval):
+                os.fsync(self.f.fileno())
+                last_sync = now
+
+            if closed:
+                break
+
+        context.destroy()
+
+    def _write(self, tail, head):
+        # at most two writes if data wraps around the end of ring
+        pos = tail % self.ring_size
+        size = head - tail
+        first = min(size, self.ring_size - pos)
+        self.f.write(self.view[pos:pos + first])
+        if first < size:
+            self.f.write(self.view[:size - first])
+            self.writes += 1
+        self.writes += 1
+        self.written += size
+
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        self.thread.join()
+
+        if self.fsync != STREAM_FSYNC_NONE:
+            os.fsync(self.f.fileno())
+        self.f.close()
+        self.view.release()
+        self.ring = None
+        if self.host_ptr:
+            axcl.rt.free_host(self.host_ptr)
+            self.host_ptr = 0
+
+    def destroy(self):
+        self.close()
+
+    def statistics(self):
+        return {'packets': self.packets, 'dropped': self.dropped, 'bytes': self.written, 'writes': self.writes}
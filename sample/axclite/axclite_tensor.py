@@ -0,0 +1,169 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import numpy as np
+
+import axcl
+from axcl.rt.axcl_rt_engine_type import *
+
+_NUMPY_DTYPES = {
+    AXCL_DATA_TYPE_INT8: np.int8,
+    AXCL_DATA_TYPE_UINT8: np.uint8,
+    AXCL_DATA_TYPE_INT16: np.int16,
+    AXCL_DATA_TYPE_UINT16: np.uint16,
+    AXCL_DATA_TYPE_INT32: np.int32,
+    AXCL_DATA_TYPE_UINT32: np.uint32,
+    AXCL_DATA_TYPE_INT64: np.int64,
+    AXCL_DATA_TYPE_UINT64: np.uint64,
+    AXCL_DATA_TYPE_FP16: np.float16,
+    AXCL_DATA_TYPE_FP32: np.float32,
+    AXCL_DATA_TYPE_FP64: np.float64,
+}
+
+# e2m1: sign, 2 bits exponent, 1 bit mantissa
+_FP4_TABLE = np.array([0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0,
+                       -0.0, -0.5, -1.0, -1.5, -2.0, -3.0, -4.0, -6.0], dtype=np.float32)
+
+
+def _build_fp8_table():
+    # e4m3fn: sign, 4 bits exponent (bias 7), 3 bits mantissa, no inf, S.1111.111 is nan
+    code = np.arange(256, dtype=np.uint32)
+    sign = np.where(code & 0x80, -1.0, 1.0).astype(np.float32)
+    exp = ((code >> 3) & 0xF).astype(np.int32)
+    man = (code & 0x7).astype(np.float32)
+    normal = (1.0 + man / 8.0) * np.exp2(exp - 7).astype(np.float32)
+    subnormal = (man / 8.0) * np.float32(2.0 ** -6)
+    table = sign * np.where(exp == 0, subnormal, normal).astype(np.float32)
+    table[(code & 0x7F) == 0x7F] = np.nan
+    return table
+
+
+_FP8_TABLE = _build_fp8_table()
+
+
+def axclite_element_count(dims):
+    count = 1
+    for d in dims:
+        count *= d
+    return count
+
+
+def axclite_unpack_nibbles(raw: np.ndarray, count: int, signed: bool) -> np.ndarray:
+    """
+    unpack 4 bits elements, low nibble first
+    """
+    out = np.empty(raw.size * 2, dtype=np.uint8)
+    out[0::2] = raw & 0x0F
+    out[1::2] = raw >> 4
+    out = out[:count]
+    if signed:
+        # sign extension of 4 bits
+        return ((out ^ 0x08).astype(np.int8) - 8).astype(np.int8)
+    return out
+
+
+def axclite_decode_tensor(raw: np.ndarray, dtype: int, dims, layout=AXCL_DATA_LAYOUT_NHWC,
+                          to_layout=None, scale=None, zero_point=0) -> np.ndarray:
+    """
+    decode raw bytes of a model tensor to numpy array
+
+    :param raw: np.uint8 array of the tensor bytes
+    :param dtype: axclrtEngineDataType of the tensor
+    :param dims: dims of the tensor from engine_get_output_dims
+    :param layout: axclrtEngineDataLayout of the tensor
+    :param to_layout: transpose 4 dims tensor to AXCL_DATA_LAYOUT_NHWC or AXCL_DATA_LAYOUT_NCHW, None keeps layout
+    :param scale: dequantize to float32 by (value - zero_point) * scale, scalar or array broadcastable to tensor
+    :param zero_point: zero point of dequantization
+    :return: numpy array, which is a view of raw for plain types and may be overwritten on next read
+    """
+    count = axclite_element_count(dims)
+
+    if dtype in _NUMPY_DTYPES:
+        np_dtype = np.dtype(_NUMPY_DTYPES[dtype])
+        arr = raw[:count * np_dtype.itemsize].view(np_dtype)
+    elif dtype == AXCL_DATA_TYPE_BF16:
+        arr = (raw[:count * 2].view(np.uint16).astype(np.uint32) << 16).view(np.float32)
+    elif dtype == AXCL_DATA_TYPE_INT4 or dtype == AXCL_DATA_TYPE_UINT4:
+        arr = axclite_unpack_nibbles(raw[:(count + 1) // 2], count, dtype == AXCL_DATA_TYPE_INT4)
+    elif dtype == AXCL_DATA_TYPE_FP4:
+        arr = _FP4_TABLE[axclite_unpack_nibbles(raw[:(count + 1) // 2], count, False)]
+    elif dtype == AXCL_DATA_TYPE_FP8:
+        arr = _FP8_TABLE[raw[:count]]
+    else:
+        raise ValueError(f"unsupported data type {dtype}")
+
+    arr = arr.reshape(dims)
+
+    if scale is not None:
+        arr = (arr.astype(np.float32) - np.float32(zero_point)) * np.asarray(scale, dtype=np.float32)
+
+    if to_layout is not None and to_layout != layout and arr.ndim == 4:
+        if to_layout == AXCL_DATA_LAYOUT_NCHW:
+            arr = arr.transpose(0, 3, 1, 2)
+        else:
+            arr = arr.transpose(0, 2, 3, 1)
+
+    return arr
+
+
+def axclite_get_output_meta(info: int, group: int, index: int) -> dict:
+    dtype, ret = axcl.rt.engine_get_output_data_type(info, index)
+    if ret != axcl.AXCL_SUCC:
+        return None
+
+    layout, ret = axcl.rt.engine_get_output_data_layout(info, index)
+    if ret != axcl.AXCL_SUCC:
+        return None
+
+    dims, ret = axcl.rt.engine_get_output_dims(info, group, index)
+    if ret != axcl.AXCL_SUCC:
+        return None
+
+    return {'name': axcl.rt.engine_get_output_name_by_index(info, index),
+            'dtype': dtype,
+            'layout': layout,
+            'dims': dims,
+            'size': axcl.rt.engine_get_output_size_by_index(info, group, index)}
+
+
+class AxcliteOutputReader(object):
+    """
+    Read model outputs back to host as typed numpy arrays.
+    Host buffers are allocated once and reused by each read.
+    """
+    def __init__(self, info: int, group: int = 0):
+        self.metas = []
+        self.buffers = []
+        for i in range(axcl.rt.engine_get_num_outputs(info)):
+            meta = axclite_get_output_meta(info, group, i)
+            if meta is None:
+                raise RuntimeError(f"get meta of output {i} fail")
+            self.metas.append(meta)
+            self.buffers.append(np.empty(meta['size'], dtype=np.uint8))
+
+    def read(self, io: int, index: int, to_layout=None, scale=None, zero_point=0) -> np.ndarray:
+        dev_mem, size, ret = axcl.rt.engine_get_output_buffer_by_index(io, index)
+        if ret != axcl.AXCL_SUCC or not dev_mem:
+            print(f"get output buffer {index} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None
+
+        buffer = self.buffers[index]
+        size = min(size, buffer.size)
+        ret = axcl.rt.memcpy(buffer.ctypes.data, dev_mem, size, axcl.AXCL_MEMCPY_DEVICE_TO_HOST)
+        if ret != axcl.AXCL_SUCC:
+            print(f"copy output {index} from device fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return None
+
+        meta = self.metas[index]
+        return axclite_decode_tensor(buffer, meta['dtype'], meta['dims'], meta['layout'], to_layout, scale, zero_point)
+
+    def read_all(self, io: int, to_layout=None) -> list:
+        return [self.read(io, i, to_layout) for i in range(len(self.metas))]
@@ -25,6 +25,30 @@ def axclite_align_down(x, align):
     return x & ~(align - 1)
 
 
+def axclite_is_error(ret: int, err) -> bool:
+    """
+    compare a return code with an axcl error constant, which is AX_S32 (such as AX_ERR_VENC_FLOW_END) or unsigned int
+    (such as AX_ERR_IVPS_FLOW_END), while return codes are signed int
+    """
+    return (ret & 0xFFFFFFFF) == (getattr(err, 'value', err) & 0xFFFFFFFF)
+
+
+def axclite_annexb_iter(data, start=0):
+    """
+    iterate NAL units of annexB data (bytes or bytearray) from start by bytes.find
+    :return: (pos, sc_len) of each NAL unit with its header byte in data, pos is the offset of start code
+             (00 00 01 or 00 00 00 01), so the NAL header is data[pos + sc_len]
+    """
+    length = len(data)
+    i = data.find(b'\x00\x00\x01', start)
+    while 0 <= i and i + 3 < length:
+        if i > 0 and data[i - 1] == 0x00:
+            yield i - 1, 4
+        else:
+            yield i, 3
+        i = data.find(b'\x00\x00\x01', i + 3)
+
+
 def axclite_memcmp(s1: ctypes.c_void_p, s2: ctypes.c_void_p, n: ctypes.c_size_t) -> int:
     try:
         if platform.system() == 'Windows':
@@ -12,11 +12,12 @@
 import copy
 import threading
 import time
+import traceback
 import axcl
 from axcl.utils.axcl_utils import bytes_to_ptr
 from axclite.axclite_context import AxcliteContext
 from axclite.axclite_resource import AxcliteResource
-from axclite.axclite_utils import axclite_align_up
+from axclite.axclite_utils import axclite_align_up, axclite_is_error
 from axclite.axclite_observer import AxcliteObserver, AxcliteSubject
 
 VDEC_STRIDE_ALIGN = 256
@@ -57,6 +58,10 @@ class AxcliteVdec(AxcliteResource):
         self.started = False
         self.recv_threads = []
         self.subjects = [AxcliteSubject(), AxcliteSubject(), AxcliteSubject()]
+        # set once every unlink channel gets the last frame after end of stream
+        self.eos = threading.Event()
+        self.eos_chns = set()
+        self.eos_sent = False
 
     def get_grp_id(self):
         return self.grp
@@ -89,7 +94,7 @@ class AxcliteVdec(AxcliteResource):
                     print(f"device {self.device:02x}: invalid chn pic_width: {w} or pic_height: {h}")
                     return False
 
-            num += 1
+                num += 1
 
         if num == 0:
             print(f"device {self.device:02x}: at least 1 chn should be enabled")
@@ -160,7 +165,7 @@ class AxcliteVdec(AxcliteResource):
                         'crop_x': attr['chn_attr'][i].get('crop_x', 0),
                         'crop_y': attr['chn_attr'][i].get('crop_y', 0)}
 
-            if chn_attr['crop_x'] > 0 or chn_attr['crop_x'] > 0:
+            if chn_attr['crop_x'] > 0 or chn_attr['crop_y'] > 0:
                 chn_attr['output_mode'] = axcl.AX_VDEC_OUTPUT_CROP
             else:
                 chn_attr['output_mode'] = axcl.AX_VDEC_OUTPUT_ORIGINAL if i == 0 else axcl.AX_VDEC_OUTPUT_SCALE
@@ -181,17 +186,21 @@ class AxcliteVdec(AxcliteResource):
                                                                 grp_attr['codec_type'])
             ret = axcl.vdec.set_chn_attr(self.grp, i, chn_attr)
             if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: set vdGrp {self.grp} vdChn {i} attr fail, ret = 0x{ret&0xFFFFFFFF:x}")
                 for j in range(i):
                     axcl.vdec.disable_chn(self.grp, j)
                 axcl.vdec.destroy_grp(self.grp)
                 self.grp = -1
+                return ret
 
             ret = axcl.vdec.enable_chn(self.grp, i)
             if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: enable vdGrp {self.grp} vdChn {i} fail, ret = 0x{ret&0xFFFFFFFF:x}")
                 for j in range(i):
                     axcl.vdec.disable_chn(self.grp, j)
                 axcl.vdec.destroy_grp(self.grp)
                 self.grp = -1
+                return ret
 
             print(f"device {self.device:02x}: vdGrp {self.grp} vdChn {i} is enabled")
 
@@ -217,7 +226,10 @@ class AxcliteVdec(AxcliteResource):
     def unregister_observer(self, chn, observer: AxcliteObserver):
         self.subjects[chn].unregister(observer)
 
-    def start(self):
+    def start(self, recv=True):
+        """
+        :param recv: start receive threads of enabled unlink channels, False if frames are received by AxcliteVdecHub
+        """
         if self.started:
             print(f"device {self.device:02x}: vdGrp {self.grp} is already started")
             return axcl.AXCL_SUCC
@@ -227,17 +239,21 @@ class AxcliteVdec(AxcliteResource):
         if ret != axcl.AXCL_SUCC:
             return ret
 
-        # start thread to receive decoded image
+        # set before starting threads, receive threads exit once started is False
+        self.started = True
+        self.eos.clear()
+        self.eos_chns.clear()
+        self.eos_sent = False
+
+        # start thread to receive decoded image of each enabled unlink channel
         self.recv_threads.clear()
-        for i in range(axcl.AX_DEC_MAX_CHN_NUM):
+        for i in range(axcl.AX_DEC_MAX_CHN_NUM if recv else 0):
             if self.attr['chn_attr'][i].get('enable', False) and not self.attr['chn_attr'][i].get('link', False):
                 timeout = self.attr['chn_attr'][i].get('recv_frame_timeout', 1000)
                 t = threading.Thread(target=self.recv_worker, args=(i, timeout), name="vdec_recv_{}_{}".format(self.grp, i))
                 self.recv_threads.append(t)
                 t.start()
-                break
 
-        self.started = True
         print(f"device {self.device:02x}: vdGrp {self.grp} is started")
         return axcl.AXCL_SUCC
 
@@ -261,7 +277,7 @@ class AxcliteVdec(AxcliteResource):
             retry += 1
             ret = axcl.vdec.reset_grp(self.grp)
             if ret != axcl.AXCL_SUCC:
-                if ret == axcl.AX_ERR_VDEC_BUSY:
+                if axclite_is_error(ret, axcl.AX_ERR_VDEC_BUSY):
                     print(f"device {self.device:02x}: vdGrp {self.grp} is busy, try again to reset")
                 else:
                     print(f"device {self.device:02x}: reset vdGrp {self.grp} fail, ret = 0x{ret&0xFFFFFFFF:x}, try again to reset")
@@ -292,8 +308,49 @@ class AxcliteVdec(AxcliteResource):
         if ret != axcl.AXCL_SUCC:
             return ret
 
+        if stream['end_of_stream']:
+            self.eos_sent = True
         return axcl.AXCL_SUCC
 
+    def end_of_stream(self, chn):
+        """
+        called once chn gets AX_ERR_VDEC_FLOW_END, eos is set when all unlink channels reach the end
+        """
+        self.eos_chns.add(chn)
+        if self.eos_chns.issuperset(self.unlink_chns()) and not self.eos.is_set():
+            print(f"device {self.device:02x}: vdGrp {self.grp} reaches end of stream")
+            self.eos.set()
+
+    def unlink_chns(self):
+        if self.attr is None:
+            return []
+        return [i for i in range(axcl.AX_DEC_MAX_CHN_NUM)
+                if self.attr['chn_attr'][i].get('enable', False) and not self.attr['chn_attr'][i].get('link', False)]
+
+    def wait_eos(self, timeout=None, interval=0.005) -> bool:
+        """
+        wait until the last frame after end of stream is got by all unlink channels, instead of polling query_status.
+        Frames of link channels never reach host, if all channels are linked, wait until query_status shows no frame
+        left by interval once end of stream is sent, or wait end of stream of the module linked to instead
+        :return: False if timeout
+        """
+        if self.grp < 0:
+            return True
+        if self.unlink_chns():
+            return self.eos.wait(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.eos.is_set():
+            if self.eos_sent:
+                status = self.query_status()
+                if status is None or status['left_stream_frames'] + sum(status['left_pics']) == 0:
+                    self.eos.set()
+                    break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
+
     def recv_worker(self, chn, timeout):
         # print(f"device {self.device:02x}: vdGrp {self.grp} vdChn {chn} recv worker +++")
         context = AxcliteContext()
@@ -302,16 +359,30 @@ class AxcliteVdec(AxcliteResource):
         while self.started:
             frame, ret = axcl.vdec.get_chn_frame(self.grp, chn, timeout)
             if ret != axcl.AXCL_SUCC:
+                if axclite_is_error(ret, axcl.AX_ERR_VDEC_FLOW_END):
+                    self.end_of_stream(chn)
+                    break
                 continue
 
-            if frame['video_frame']['blk_id'][0] == axcl.AX_INVALID_BLOCKID:
-                print(f"device {self.device:02x}: invalid frame of vdGrp {self.grp} vdChn {chn}: frame blkId[0] == {axcl.AX_INVALID_BLOCKID}")
-            elif frame['video_frame']['width'] == 0 or frame['video_frame']['height'] == 0:
-                print(f"device {self.device:02x}: invalid frame width {frame['video_frame']['width']} or height {frame['video_frame']['height']} of vdGrp {self.grp} vdChn {chn}")
-            else:
-                self.subjects[chn].notify(frame)
-
-            axcl.vdec.release_chn_frame(self.grp, chn, frame)
+            self.dispatch(chn, frame)
 
         context.destroy()
         # print(f"device {self.device:02x}: vdGrp {self.grp} vdChn {chn} recv worker ---")
+
+    def dispatch(self, chn, frame):
+        """
+        notify observers of chn and release the frame
+        """
+        if frame['video_frame']['blk_id'][0] == axcl.AX_INVALID_BLOCKID:
+            print(f"device {self.device:02x}: invalid frame of vdGrp {self.grp} vdChn {chn}: frame blkId[0] == {axcl.AX_INVALID_BLOCKID}")
+        elif frame['video_frame']['width'] == 0 or frame['video_frame']['height'] == 0:
+            print(f"device {self.device:02x}: invalid frame width {frame['video_frame']['width']} or height {frame['video_frame']['height']} of vdGrp {self.grp} vdChn {chn}")
+        else:
+            try:
+                self.subjects[chn].notify(frame)
+            except Exception:
+                # VB block of the frame goes back to the chn pool even if an observer raises, and recv goes on
+                print(f"device {self.device:02x}: observer of vdGrp {self.grp} vdChn {chn} fail")
+                print(traceback.format_exc())
+
+        axcl.vdec.release_chn_frame(self.grp, chn, frame)
@@ -0,0 +1,172 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import threading
+import time
+from queue import Queue, Empty
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_utils import axclite_is_error
+
+
+class AxcliteVdecHub(AxcliteResource):
+    """
+    Receive decoded frames of all attached groups by axcl.vdec.select_grp from one or a few threads
+    instead of one thread per group and channel.
+    Frames are dispatched to the observers registered on each AxcliteVdec.
+
+    usage:
+        decoder.start(recv=False)
+        hub.attach(decoder)
+        hub.start()
+    """
+    def __init__(self, device, workers=1, timeout=100):
+        """
+        :param workers: 1: select thread gets frames itself, n > 1: groups are served by n worker threads by grp % n
+        :param timeout: timeout of select_grp in ms
+        """
+        super().__init__(self.__class__.__name__)
+        self.device = device
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.decoders = {}
+        self.started = False
+        self.select_thread = None
+        self.worker_threads = []
+        self.queues = []
+        self.pending = set()
+        self.unknown = set()
+        self._lock = threading.Lock()
+
+    def attach(self, decoder: AxcliteVdec):
+        with self._lock:
+            self.decoders[decoder.get_grp_id()] = decoder
+
+    def detach(self, decoder: AxcliteVdec):
+        with self._lock:
+            self.decoders.pop(decoder.get_grp_id(), None)
+
+    def start(self):
+        if self.started:
+            return axcl.AXCL_SUCC
+
+        self.started = True
+        self.pending.clear()
+        self.unknown.clear()
+        self.queues = [Queue() for _ in range(self.workers)] if self.workers > 1 else []
+        self.worker_threads = []
+        for i in range(len(self.queues)):
+            t = threading.Thread(target=self.dispatch_worker, args=(i,), name=f"vdec_hub_{i}")
+            self.worker_threads.append(t)
+            t.start()
+
+        self.select_thread = threading.Thread(target=self.select_worker, name="vdec_hub_select")
+        self.select_thread.start()
+        print(f"device {self.device:02x}: vdec hub is started, {self.workers} workers")
+        return axcl.AXCL_SUCC
+
+    def stop(self):
+        if not self.started:
+            return axcl.AXCL_SUCC
+
+        self.started = False
+        self.select_thread.join()
+        for t in self.worker_threads:
+            t.join()
+        self.worker_threads.clear()
+        print(f"device {self.device:02x}: vdec hub is stopped")
+        return axcl.AXCL_SUCC
+
+    def destroy(self):
+        self.stop()
+
+    def drain(self, grp, chn, num):
+        with self._lock:
+            decoder = self.decoders.get(grp)
+        if decoder is None:
+            return
+
+        # at least one frame is ready, get without blocking
+        for _ in range(max(1, num)):
+            frame, ret = axcl.vdec.get_chn_frame(grp, chn, 0)
+            if ret != axcl.AXCL_SUCC:
+                if axclite_is_error(ret, axcl.AX_ERR_VDEC_FLOW_END):
+                    decoder.end_of_stream(chn)
+                break
+            decoder.dispatch(chn, frame)
+
+    def select_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        while self.started:
+            grp_set, ret = axcl.vdec.select_grp(self.timeout)
+            if ret != axcl.AXCL_SUCC:
+                if not axclite_is_error(ret, axcl.AX_ERR_VDEC_TIMED_OUT):
+                    # vdec select fails at once on errors such as lost device, wait a select period before retrying
+                    print(f"device {self.device:02x}: select vdec grp fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                    time.sleep(self.timeout / 1000)
+                continue
+
+            served = 0
+            skipped = 0
+            for i in range(grp_set['grp_count']):
+                chn_set = grp_set['chn_set'][i]
+                grp = chn_set['grp']
+                with self._lock:
+                    attached = grp in self.decoders
+                if not attached:
+                    # select_grp is device wide, frames of groups not attached here are left to their owner
+                    if grp not in self.unknown:
+                        self.unknown.add(grp)
+                        print(f"device {self.device:02x}: vdGrp {grp} is ready but not attached to vdec hub, skipped")
+                    skipped += 1
+                    continue
+
+                for j in range(chn_set['chn_count']):
+                    chn = chn_set['chn'][j]
+                    num = chn_set['chn_frame_num'][j]
+                    if not self.queues:
+                        self.drain(grp, chn, num)
+                        served += 1
+                        continue
+
+                    with self._lock:
+                        if (grp, chn) in self.pending:
+                            continue
+                        self.pending.add((grp, chn))
+                    self.queues[grp % self.workers].put((grp, chn, num))
+                    served += 1
+
+            if served == 0:
+                # select_grp returns at once while skipped groups or pending channels keep frames
+                time.sleep(self.timeout / 1000 if skipped else 0.001)
+
+        context.destroy()
+
+    def dispatch_worker(self, index):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        queue = self.queues[index]
+        while self.started:
+            try:
+                grp, chn, num = queue.get(timeout=self.timeout / 1000)
+            except Empty:
+                continue
+
+            with self._lock:
+                self.pending.discard((grp, chn))
+            self.drain(grp, chn, num)
+
+        context.destroy()
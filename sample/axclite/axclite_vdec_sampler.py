@@ -0,0 +1,143 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import axcl
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_vdec_scheduler import axclite_annexb_frame_type, VDEC_FRAME_KEY
+from axclite.axclite_utils import axclite_annexb_iter
+
+# sampling modes
+VDEC_SAMPLE_IDR = 0    # IDR (IRAP for h265) frames only
+VDEC_SAMPLE_INTRA = 1  # IDR and non-IDR I frames of h264
+
+H264_SLICE_TYPE_I = 2
+H264_SLICE_TYPE_SI = 4
+
+
+def _read_ue(data, bit):
+    """
+    read unsigned exp-golomb code from bit offset, return (value, next bit offset)
+    """
+    zeros = 0
+    while not (data[bit >> 3] >> (7 - (bit & 7))) & 1:
+        zeros += 1
+        bit += 1
+    bit += 1
+    value = 0
+    for _ in range(zeros):
+        value = (value << 1) | ((data[bit >> 3] >> (7 - (bit & 7))) & 1)
+        bit += 1
+    return (1 << zeros) - 1 + value, bit
+
+
+def axclite_h264_is_intra(data) -> bool:
+    """
+    True if the first slice of an h264 annexB frame is IDR, I or SI
+    """
+    head = bytes(data[:4096])
+    for pos, sc_len in axclite_annexb_iter(head):
+        nal = pos + sc_len
+        nal_type = head[nal] & 0x1F
+        if nal_type == 5:
+            return True
+        if nal_type == 1:
+            # remove emulation prevention bytes of slice header
+            rbsp = head[nal + 1:nal + 33].replace(b'\x00\x00\x03', b'\x00\x00')
+            try:
+                _, bit = _read_ue(rbsp, 0)
+                slice_type, _ = _read_ue(rbsp, bit)
+            except IndexError:
+                return False
+            return slice_type % 5 in (H264_SLICE_TYPE_I, H264_SLICE_TYPE_SI)
+    return False
+
+
+class AxcliteVdecSampler(object):
+    """
+    Sampling front-end of AxcliteVdec for thumbnailing and indexing.
+
+    Only key frames (or I frames) are sent to the decoder, optionally one of every N of them and no more
+    often than interval. Sampled frames are sent with user_data of the source frame index, decoder returns
+    it with pts in the output frame, so output frames are mapped back to source index and pts by lookup().
+    """
+    def __init__(self, decoder: AxcliteVdec, mode=VDEC_SAMPLE_IDR, every_n=1, interval=0):
+        """
+        :param every_n: send one of every n key frames, such as every n GOPs for VDEC_SAMPLE_IDR
+        :param interval: min pts interval in microseconds between two sampled frames, 0 is disabled
+        """
+        self.decoder = decoder
+        self.h264 = decoder.attr['grp_attr'].get('codec_type', axcl.PT_H264) == axcl.PT_H264
+        self.mode = mode if self.h264 else VDEC_SAMPLE_IDR
+        self.every_n = max(1, every_n)
+        self.interval = interval
+        self.source_index = 0
+        self.candidates = 0
+        self.sent = 0
+        self.last_pts = None
+
+    def configure(self) -> int:
+        """
+        switch the group to decode I frames only, it is harmless to keep IPB mode if not supported
+        """
+        grp = self.decoder.get_grp_id()
+        grp_param, ret = axcl.vdec.get_grp_param(grp)
+        if ret != axcl.AXCL_SUCC:
+            return ret
+
+        grp_param['vdec_video_param']['vdec_mode'] = axcl.VIDEO_DEC_MODE_I
+        ret = axcl.vdec.set_grp_param(grp, grp_param)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.decoder.device:02x}: vdGrp {grp} does not support I only decode mode, ret = 0x{ret&0xFFFFFFFF:x}")
+        return ret
+
+    def _is_candidate(self, data):
+        if self.mode == VDEC_SAMPLE_INTRA:
+            return axclite_h264_is_intra(data)
+        return axclite_annexb_frame_type(data, self.h264) == VDEC_FRAME_KEY
+
+    def send(self, data, pts, timeout=1000) -> bool:
+        """
+        send one annexB frame of source, or None for end of stream
+        :return: True if the frame is sent to decoder
+        """
+        if data is None or len(data) == 0:
+            self.decoder.send_stream(None, 0)
+            return True
+
+        index = self.source_index
+        self.source_index += 1
+        if not self._is_candidate(data):
+            return False
+
+        self.candidates += 1
+        if (self.candidates - 1) % self.every_n != 0:
+            return False
+        if self.interval > 0 and self.last_pts is not None and pts - self.last_pts < self.interval:
+            return False
+
+        ret = self.decoder.send_stream(data, pts, index, timeout)
+        if ret != axcl.AXCL_SUCC:
+            return False
+
+        self.last_pts = pts
+        self.sent += 1
+        return True
+
+    def lookup(self, video_frame: dict):
+        """
+        :param video_frame: frame['video_frame'] of output frame
+        :return: (source index, source pts)
+        """
+        return video_frame['user_data'], video_frame['pts']
+
+    def statistics(self):
+        return {'source_frames': self.source_index, 'key_frames': self.candidates, 'sent': self.sent,
+                'reduction': self.source_index / self.sent if self.sent else 0}
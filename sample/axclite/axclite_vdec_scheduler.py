@@ -0,0 +1,207 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import threading
+import time
+import axcl
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_utils import axclite_annexb_iter, axclite_is_error
+
+# overload policies
+VDEC_POLICY_BLOCK = 0         # never drop, block in send_stream as before
+VDEC_POLICY_DROP_NON_REF = 1  # drop non-reference frames
+VDEC_POLICY_DROP_TO_IDR = 2   # drop non-reference frames, over hard limit drop all frames until next IDR
+
+# frame types
+VDEC_FRAME_KEY = 0
+VDEC_FRAME_REF = 1
+VDEC_FRAME_NON_REF = 2
+
+# errors of a non blocking send_stream when the input fifo is full
+_FIFO_FULL_ERRORS = (axcl.AX_ERR_VDEC_BUF_FULL, axcl.AX_ERR_VDEC_QUEUE_FULL, axcl.AX_ERR_VDEC_TIMED_OUT)
+
+
+def axclite_annexb_frame_type(data, h264: bool) -> int:
+    """
+    type of an annexB frame from the first VCL NAL
+    """
+    if not hasattr(data, 'find'):
+        # memoryview, VCL NAL is expected in the head
+        data = bytes(data[:4096])
+
+    for pos, sc_len in axclite_annexb_iter(data):
+        head = data[pos + sc_len]
+        if h264:
+            nal_type = head & 0x1F
+            if nal_type == 5:
+                return VDEC_FRAME_KEY
+            if 1 <= nal_type <= 4:
+                # nal_ref_idc
+                return VDEC_FRAME_REF if head & 0x60 else VDEC_FRAME_NON_REF
+        else:
+            nal_type = (head >> 1) & 0x3F
+            if 16 <= nal_type <= 23:
+                return VDEC_FRAME_KEY
+            if nal_type < 16:
+                # TRAIL_N, TSA_N, STSA_N, RADL_N, RASL_N and RSV_VCL_N are even
+                return VDEC_FRAME_NON_REF if nal_type % 2 == 0 else VDEC_FRAME_REF
+    return VDEC_FRAME_REF
+
+
+class AxcliteVdecInput(object):
+    """
+    input of one group, created by AxcliteVdecScheduler.add
+    """
+    def __init__(self, scheduler, decoder: AxcliteVdec, priority, policy, high, low, high_bytes):
+        self.scheduler = scheduler
+        self.decoder = decoder
+        self.priority = priority
+        self.policy = policy
+        self.high = high
+        self.low = low
+        self.high_bytes = high_bytes
+        self.h264 = decoder.attr['grp_attr'].get('codec_type', axcl.PT_H264) == axcl.PT_H264
+        self.overloaded = False
+        self.wait_idr = False
+        self.left_frames = 0
+        self.left_bytes = 0
+        self.last_query = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def _update_level(self, interval):
+        now = time.monotonic()
+        if now - self.last_query >= interval:
+            status = self.decoder.query_status()
+            if status:
+                self.left_frames = status['left_stream_frames']
+                self.left_bytes = status['left_stream_bytes']
+            self.last_query = now
+
+        if self.overloaded:
+            if self.left_frames <= self.low and (self.high_bytes == 0 or self.left_bytes <= self.high_bytes // 2):
+                self.overloaded = False
+                self.scheduler.update_overload(self, False)
+        elif self.left_frames >= self.high or (self.high_bytes > 0 and self.left_bytes >= self.high_bytes):
+            self.overloaded = True
+            self.scheduler.update_overload(self, True)
+
+    def send(self, data, pts, user_data=0):
+        """
+        send one annexB frame, or None for end of stream
+        while droppable, frames are sent without blocking and dropped if the input fifo is full, other errors are returned
+        :return: (sent, ret), sent is False if the frame is dropped by policy
+        """
+        if data is None or len(data) == 0:
+            return True, self.decoder.send_stream(data, pts, user_data)
+
+        self._update_level(self.scheduler.interval)
+
+        frame_type = axclite_annexb_frame_type(data, self.h264)
+        if frame_type == VDEC_FRAME_KEY:
+            self.wait_idr = False
+
+        droppable = self.policy != VDEC_POLICY_BLOCK and (self.overloaded or self.scheduler.is_preempted(self))
+        if self.wait_idr or (droppable and self._should_drop(frame_type)):
+            self.dropped += 1
+            return False, axcl.AXCL_SUCC
+
+        # non blocking while droppable, frame is dropped if input fifo is full
+        timeout = 0 if droppable else self.scheduler.timeout
+        ret = self.decoder.send_stream(data, pts, user_data, timeout)
+        if ret != axcl.AXCL_SUCC:
+            if droppable and any(axclite_is_error(ret, err) for err in _FIFO_FULL_ERRORS):
+                # reference chain is broken by a dropped key or reference frame, resume at next IDR
+                self.wait_idr = True
+                self.dropped += 1
+                return False, axcl.AXCL_SUCC
+            return False, ret
+
+        self.sent += 1
+        self.left_frames += 1
+        self.left_bytes += len(data)
+        return True, axcl.AXCL_SUCC
+
+    def _should_drop(self, frame_type):
+        if frame_type == VDEC_FRAME_NON_REF:
+            return True
+
+        if self.policy == VDEC_POLICY_DROP_TO_IDR and frame_type == VDEC_FRAME_REF and self.left_frames >= self.high * 2:
+            # reference chain is broken, resume at next IDR
+            self.wait_idr = True
+            return True
+
+        return False
+
+    def statistics(self):
+        return {'grp': self.decoder.get_grp_id(), 'priority': self.priority, 'sent': self.sent, 'dropped': self.dropped,
+                'left_frames': self.left_frames, 'left_bytes': self.left_bytes, 'overloaded': self.overloaded}
+
+
+class AxcliteVdecScheduler(object):
+    """
+    Flow control of VDEC inputs by watermarks of left stream frames (and bytes) in the input fifo.
+
+    When the input level of a group reaches the high watermark it is overloaded until the level falls to the
+    low watermark. Overloaded groups, and groups with lower priority than an overloaded group, drop frames by
+    their policy instead of blocking, so a busy box degrades by frame rate instead of building latency.
+    """
+    def __init__(self, high=8, low=4, high_bytes=0, interval=0.02, timeout=1000):
+        """
+        :param high: high watermark of left stream frames
+        :param low: low watermark of left stream frames
+        :param high_bytes: high watermark of left stream bytes, 0 is disabled
+        :param interval: min interval in seconds of query_status, local counters are used between two queries
+        :param timeout: timeout of send_stream in ms for groups which are neither overloaded nor preempted
+        """
+        self.high = high
+        self.low = low
+        self.high_bytes = high_bytes
+        self.interval = interval
+        self.timeout = timeout
+        self.inputs = []
+        self.overloaded = {}
+        self._lock = threading.Lock()
+
+    def add(self, decoder: AxcliteVdec, priority=0, policy=VDEC_POLICY_DROP_NON_REF, high=None, low=None, high_bytes=None) -> AxcliteVdecInput:
+        """
+        :param priority: larger is more important
+        """
+        stream = AxcliteVdecInput(self, decoder, priority, policy,
+                                  self.high if high is None else high,
+                                  self.low if low is None else low,
+                                  self.high_bytes if high_bytes is None else high_bytes)
+        with self._lock:
+            self.inputs.append(stream)
+        return stream
+
+    def remove(self, stream: AxcliteVdecInput):
+        with self._lock:
+            if stream in self.inputs:
+                self.inputs.remove(stream)
+            self.overloaded.pop(stream, None)
+
+    def update_overload(self, stream, overloaded):
+        with self._lock:
+            if overloaded:
+                self.overloaded[stream] = stream.priority
+            else:
+                self.overloaded.pop(stream, None)
+
+    def is_preempted(self, stream) -> bool:
+        """
+        True if any group with higher priority is overloaded
+        """
+        return any(priority > stream.priority for priority in list(self.overloaded.values()))
+
+    def statistics(self):
+        with self._lock:
+            return [stream.statistics() for stream in self.inputs]
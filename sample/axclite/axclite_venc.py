@@ -10,11 +10,29 @@
 #
 # ******************************************************************************
 import copy
+import time
+import traceback
 import axcl
 import threading
 from axclite.axclite_resource import AxcliteResource
 from axclite.axclite_context import AxcliteContext
 from axclite.axclite_observer import AxcliteObserver, AxcliteSubject
+from axclite.axclite_utils import axclite_is_error
+
+# fields of venc_attr fixed once the channel is created
+_CREATE_FIELDS = ('type', 'max_pic_width', 'max_pic_height', 'mem_source', 'buf_size', 'strm_bit_depth', 'link_mode',
+                  'in_fifo_depth', 'out_fifo_depth', 'attr_h264e', 'attr_h265e', 'attr_mjpege', 'attr_jpege')
+# fields of venc_attr set by set_chn_attr once receiving is stopped
+_RESTART_FIELDS = ('pic_width_src', 'pic_height_src', 'crop_cfg', 'profile', 'level', 'tier', 'flag', 'stop_wait_time')
+
+
+def _merge_dict(dst: dict, src: dict) -> dict:
+    for key, value in src.items():
+        if isinstance(value, dict) and isinstance(dst.get(key), dict):
+            _merge_dict(dst[key], value)
+        else:
+            dst[key] = copy.deepcopy(value)
+    return dst
 
 
 class AxcliteVenc(AxcliteResource):
@@ -58,6 +76,8 @@ class AxcliteVenc(AxcliteResource):
         self.started = False
         self.recv_thread = None
         self.subject = AxcliteSubject()
+        # set once get_stream returns AX_ERR_VENC_FLOW_END after end of stream flows from the source
+        self.eos = threading.Event()
 
     def get_chn_id(self):
         return self.chn
@@ -117,7 +137,7 @@ class AxcliteVenc(AxcliteResource):
         chn_attr = attr
         chn_attr['venc_attr']['type'] = attr['venc_attr'].get('type', axcl.PT_H264)
         chn_attr['venc_attr']['max_pic_width'] = attr['venc_attr'].get('max_pic_width', chn_attr['venc_attr']['pic_width_src'])
-        chn_attr['venc_attr']['max_pic_height'] = attr['venc_attr'].get('max_pic_width', chn_attr['venc_attr']['pic_height_src'])
+        chn_attr['venc_attr']['max_pic_height'] = attr['venc_attr'].get('max_pic_height', chn_attr['venc_attr']['pic_height_src'])
         chn_attr['venc_attr']['mem_source'] = attr['venc_attr'].get('mem_source', axcl.AX_MEMORY_SOURCE_CMM)
         buf_size = chn_attr['venc_attr'].get('buf_size', 0)
         if buf_size == 0:
@@ -155,7 +175,10 @@ class AxcliteVenc(AxcliteResource):
     def unregister_observer(self, observer: AxcliteObserver):
         self.subject.unregister(observer)
 
-    def start(self):
+    def start(self, recv=True):
+        """
+        :param recv: start receive thread, False if streams are collected by AxcliteVencHub
+        """
         if self.started:
             print(f"device {self.device:02x}: veChn {self.chn} is already started")
             return axcl.AXCL_SUCC
@@ -164,10 +187,14 @@ class AxcliteVenc(AxcliteResource):
         if ret != axcl.AXCL_SUCC:
             return ret
 
-        self.recv_thread = threading.Thread(target=self.recv_worker)
-        self.recv_thread.start()
-
+        # set before starting thread, receive thread exits once started is False
         self.started = True
+        self.eos.clear()
+
+        self.recv_thread = None
+        if recv:
+            self.recv_thread = threading.Thread(target=self.recv_worker)
+            self.recv_thread.start()
 
         print(f"device {self.device:02x}: veChn {self.chn} is started")
         return axcl.AXCL_SUCC
@@ -187,7 +214,8 @@ class AxcliteVenc(AxcliteResource):
         if ret != axcl.AXCL_SUCC:
             return ret
 
-        self.recv_thread.join()
+        if self.recv_thread:
+            self.recv_thread.join()
 
         print(f"device {self.device:02x}: veChn {self.chn} is stopped")
         return axcl.AXCL_SUCC
@@ -195,6 +223,133 @@ class AxcliteVenc(AxcliteResource):
     def send_frame(self, frame: dict, timeout: int):
         return axcl.venc.send_frame(self.chn, frame, timeout)
 
+    def end_of_stream(self):
+        if not self.eos.is_set():
+            print(f"device {self.device:02x}: veChn {self.chn} reaches end of stream")
+            self.eos.set()
+
+    def wait_eos(self, timeout=None) -> bool:
+        """
+        wait until the last stream after end of stream is got and notified to observers, such as a linked VDEC
+        sent end of stream or a frame of is_end_of_stream is sent
+        :return: False if timeout
+        """
+        return self.eos.wait(timeout)
+
+    def reconfigure(self, attr: dict = None, rc_param: dict = None, vui_param: dict = None, slice_split: dict = None,
+                    drain_timeout=0.5):
+        """
+        apply changes to the channel in place, observers such as stream writers and muxers keep receiving streams
+            1. fields of _CREATE_FIELDS, or picture size beyond max_pic_width/height, need the channel recreated,
+               nothing is applied and 1 is returned
+            2. fields of _RESTART_FIELDS and gop_attr are set by set_chn_attr, once receiving is stopped, queued
+               frames are drained by at most drain_timeout seconds and the channel is reset, and then receiving
+               is started again. Frames sent meanwhile are rejected
+            3. rc_attr, rc_param, vui_param and slice_split are set live, IDR is requested once vui or slice is
+               changed so the new parameter sets take effect at once
+        :param attr: part of channel attr, such as {'venc_attr': {'pic_width_src': 1280, 'pic_height_src': 720}},
+                     merged into the current attr
+        :param rc_param: part of rc param, merged into get_rc_param
+        :param vui_param: part of vui param, merged into get_vui_param
+        :param slice_split: slice split param, such as {'split': True, 'lcu_line_num': 4}
+        """
+        if self.chn < 0:
+            print(f"device {self.device:02x}: veChn is not created yet")
+            return 1
+
+        chn_attr = copy.deepcopy(self.chn_attr)
+        _merge_dict(chn_attr, attr or {})
+        venc_attr = chn_attr['venc_attr']
+        changed = [key for key in venc_attr if venc_attr[key] != self.chn_attr['venc_attr'].get(key)]
+        recreate = [key for key in changed if key in _CREATE_FIELDS]
+        if recreate:
+            print(f"device {self.device:02x}: veChn {self.chn} needs to be recreated to change {recreate}")
+            return 1
+        if venc_attr['pic_width_src'] > venc_attr['max_pic_width'] or venc_attr['pic_height_src'] > venc_attr['max_pic_height']:
+            print(f"device {self.device:02x}: veChn {self.chn} needs to be recreated for {venc_attr['pic_width_src']}x{venc_attr['pic_height_src']} "
+                  f"beyond max {venc_attr['max_pic_width']}x{venc_attr['max_pic_height']}")
+            return 1
+
+        restart = any(key in _RESTART_FIELDS for key in changed) or chn_attr['gop_attr'] != self.chn_attr['gop_attr']
+        if restart:
+            ret = self._restart(chn_attr, drain_timeout)
+            if ret != axcl.AXCL_SUCC:
+                return ret
+        elif chn_attr['rc_attr'] != self.chn_attr['rc_attr']:
+            # rc_attr shares keys with rc param
+            rc_param = _merge_dict(copy.deepcopy(attr['rc_attr']), rc_param or {})
+
+        if rc_param:
+            ret = self._set_param(axcl.venc.get_rc_param, axcl.venc.set_rc_param, rc_param, 'rc param')
+            if ret != axcl.AXCL_SUCC:
+                return ret
+            for key in chn_attr['rc_attr']:
+                if key in rc_param:
+                    chn_attr['rc_attr'][key] = copy.deepcopy(rc_param[key])
+        self.chn_attr = chn_attr
+
+        idr = False
+        if vui_param:
+            ret = self._set_param(axcl.venc.get_vui_param, axcl.venc.set_vui_param, vui_param, 'vui param')
+            if ret != axcl.AXCL_SUCC:
+                return ret
+            idr = True
+        if slice_split:
+            ret = self._set_param(axcl.venc.get_slice_split, axcl.venc.set_slice_split, slice_split, 'slice split')
+            if ret != axcl.AXCL_SUCC:
+                return ret
+            idr = True
+
+        if idr and not restart and self.started:
+            ret = axcl.venc.request_idr(self.chn, 1)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: request IDR of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return ret
+
+        print(f"device {self.device:02x}: veChn {self.chn} is reconfigured{' by restart' if restart else ''}")
+        return axcl.AXCL_SUCC
+
+    def _restart(self, chn_attr, drain_timeout):
+        if self.started:
+            ret = axcl.venc.stop_recv_frame(self.chn)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: stop veChn {self.chn} receiving fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return ret
+
+            # frames already received are encoded and got by observers before reset
+            deadline = time.monotonic() + drain_timeout
+            while time.monotonic() < deadline:
+                status, ret = axcl.venc.query_status(self.chn)
+                if ret != axcl.AXCL_SUCC or (status['left_pics'] == 0 and status['left_stream_frames'] == 0):
+                    break
+                time.sleep(0.005)
+
+            ret = axcl.venc.reset_chn(self.chn)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: reset veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+
+        ret = axcl.venc.set_chn_attr(self.chn, chn_attr)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: set attr of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+
+        if self.started:
+            r = axcl.venc.start_recv_frame(self.chn, {'recv_pic_num': -1})
+            if r != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: start veChn {self.chn} receiving fail, ret = 0x{r&0xFFFFFFFF:x}")
+                return r
+        return ret
+
+    def _set_param(self, getter, setter, param, name):
+        current, ret = getter(self.chn)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: get {name} of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            return ret
+
+        ret = setter(self.chn, _merge_dict(current, param))
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: set {name} of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+        return ret
+
     def recv_worker(self):
         # print(f"device {self.device:02x}: veChn {self.chn} on device {self.device} recv worker +++")
         context = AxcliteContext()
@@ -203,13 +358,24 @@ class AxcliteVenc(AxcliteResource):
         while self.started:
             stream, ret = axcl.venc.get_stream(self.chn, -1)
             if ret != axcl.AXCL_SUCC:
-                if ret == axcl.AX_ERR_VENC_FLOW_END:
+                if axclite_is_error(ret, axcl.AX_ERR_VENC_FLOW_END):
+                    self.end_of_stream()
                     break
                 continue
 
-            self.subject.notify(stream)
-
-            axcl.venc.release_stream(self.chn, stream)
+            self.dispatch(stream)
 
         context.destroy()
         # print(f"device {self.device:02x}: veChn {self.chn} on device {self.device} recv worker ---")
+
+    def dispatch(self, stream):
+        """
+        notify observers and release the stream
+        """
+        try:
+            self.subject.notify(stream)
+        except Exception:
+            # a stream left unreleased fills the venc output fifo and stalls the channel
+            print(f"device {self.device:02x}: observer of veChn {self.chn} fail")
+            print(traceback.format_exc())
+        axcl.venc.release_stream(self.chn, stream)
@@ -0,0 +1,162 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import threading
+import time
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_utils import axclite_is_error
+
+
+class AxcliteVencHub(AxcliteResource):
+    """
+    Collect encoded streams of many channels by axcl.venc.select_grp from a few threads instead of one
+    blocking get_stream thread per channel.
+    Each worker thread owns one select group, a channel is added to the group with the fewest channels,
+    so streams of a channel are always drained by the same thread in order.
+    Streams are dispatched to the observers registered on each AxcliteVenc.
+
+    usage:
+        encoder.start(recv=False)
+        hub.attach(encoder)
+        hub.start()
+        ...
+        hub.detach(encoder)
+        encoder.stop()
+    """
+    def __init__(self, device, workers=1, timeout=100, base_grp=0):
+        """
+        :param workers: number of select groups and threads
+        :param timeout: timeout of select_grp in ms
+        :param base_grp: select group id of the first worker, groups base_grp ~ base_grp + workers - 1 are used
+        """
+        super().__init__(self.__class__.__name__)
+        if base_grp < 0 or base_grp + workers > axcl.MAX_VENC_GRP_NUM:
+            raise ValueError(f"select groups {base_grp} ~ {base_grp + workers - 1} out of [0, {axcl.MAX_VENC_GRP_NUM})")
+
+        self.device = device
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.base_grp = base_grp
+        self.encoders = {}
+        self.groups = [set() for _ in range(self.workers)]
+        self.started = False
+        self.threads = []
+        self._lock = threading.Lock()
+        # held while a group is drained, so a detached channel is never got after detach returns
+        self._grp_locks = [threading.Lock() for _ in range(self.workers)]
+
+    def attach(self, encoder: AxcliteVenc):
+        chn = encoder.get_chn_id()
+        with self._lock:
+            if chn in self.encoders:
+                return axcl.AXCL_SUCC
+            index = min(range(self.workers), key=lambda i: len(self.groups[i]))
+
+        with self._grp_locks[index]:
+            ret = axcl.venc.select_grp_add_chn(self.base_grp + index, chn)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: add veChn {chn} to select group {self.base_grp + index} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                return ret
+
+            with self._lock:
+                self.groups[index].add(chn)
+                self.encoders[chn] = (encoder, index)
+        return axcl.AXCL_SUCC
+
+    def detach(self, encoder: AxcliteVenc):
+        chn = encoder.get_chn_id()
+        with self._lock:
+            item = self.encoders.get(chn)
+        if item is None:
+            return axcl.AXCL_SUCC
+
+        index = item[1]
+        with self._grp_locks[index]:
+            ret = axcl.venc.select_grp_delete_chn(self.base_grp + index, chn)
+            with self._lock:
+                self.groups[index].discard(chn)
+                self.encoders.pop(chn, None)
+        return ret
+
+    def start(self):
+        if self.started:
+            return axcl.AXCL_SUCC
+
+        self.started = True
+        self.threads = []
+        for i in range(self.workers):
+            t = threading.Thread(target=self.select_worker, args=(i,), name=f"venc_hub_{i}")
+            self.threads.append(t)
+            t.start()
+
+        print(f"device {self.device:02x}: venc hub is started, {self.workers} select groups")
+        return axcl.AXCL_SUCC
+
+    def stop(self):
+        if not self.started:
+            return axcl.AXCL_SUCC
+
+        self.started = False
+        for t in self.threads:
+            t.join()
+        self.threads.clear()
+        print(f"device {self.device:02x}: venc hub is stopped")
+        return axcl.AXCL_SUCC
+
+    def destroy(self):
+        self.stop()
+        with self._lock:
+            self.encoders.clear()
+            for group in self.groups:
+                group.clear()
+        for i in range(self.workers):
+            axcl.venc.select_clear_grp(self.base_grp + i)
+
+    def drain(self, encoder: AxcliteVenc, chn):
+        # at least one stream is ready, get without blocking until output fifo is empty
+        while True:
+            stream, ret = axcl.venc.get_stream(chn, 0)
+            if ret != axcl.AXCL_SUCC:
+                if axclite_is_error(ret, axcl.AX_ERR_VENC_FLOW_END):
+                    encoder.end_of_stream()
+                break
+            encoder.dispatch(stream)
+
+    def select_worker(self, index):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        grp = self.base_grp + index
+        while self.started:
+            if not self.groups[index]:
+                time.sleep(self.timeout / 1000)
+                continue
+
+            status, ret = axcl.venc.select_grp(grp, self.timeout)
+            if ret != axcl.AXCL_SUCC:
+                if not axclite_is_error(ret, axcl.AX_ERR_VENC_TIMEOUT):
+                    # the error repeats while channels stay in this select group, wait one period before retrying
+                    print(f"device {self.device:02x}: select venc grp {grp} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+                    time.sleep(self.timeout / 1000)
+                continue
+
+            with self._grp_locks[index]:
+                for i in range(status['total_chn_num']):
+                    chn = status['chn_index'][i]
+                    with self._lock:
+                        item = self.encoders.get(chn)
+                    if item:
+                        self.drain(item[0], chn)
+
+        context.destroy()
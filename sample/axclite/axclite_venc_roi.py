@@ -0,0 +1,259 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import copy
+import threading
+import axcl
+from axclite.axclite_resource import AxcliteResource
+from axclite.axclite_observer import AxcliteObserver
+from axclite.axclite_utils import axclite_align_up, axclite_align_down
+from axclite.axclite_rate_controller import VENC_RC_BITRATE_KEYS
+
+
+def _iou(a, b):
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+class _RoiSlot(object):
+    def __init__(self, index):
+        self.index = index
+        self.box = None     # smoothed [x1, y1, x2, y2] of the tracked object, None if the slot is free
+        self.hits = 0
+        self.misses = 0
+        self.area = None    # (x, y, width, height) set to encoder, None if disabled
+
+
+class AxcliteVencRoi(AxcliteObserver, AxcliteResource):
+    """
+    Map detection boxes of each frame to the ROI slots of one encode channel by axcl.venc.set_roi_attr.
+
+    Each slot tracks one object, boxes are matched to the slots by IoU, so an object keeps its slot index:
+        1. a matched slot is smoothed by EWMA, an unmatched box takes the free slot of lowest index, the largest
+           boxes win if there are more boxes than slots
+        2. a slot is enabled after min_hits matched frames, and is kept hold_frames after its object is lost,
+           so one-frame false positives and misses never flicker the ROI
+        3. the region is expanded by margin, aligned outward to align (16 of macroblock by default) and padded
+           by one more block, it is kept as long as it still covers the object and is not twice larger, so
+           jitter of boxes and slow motion do not update the encoder
+    set_roi_attr is called only for slots whose region or enable state changed.
+
+    Registered as an observer of the encoder, output bytes per frame are counted. The first calibrate_frames
+    are encoded without ROI as the baseline, then the rc bitrate is scaled by bitrate_ratio, so the background
+    takes fewer bits and objects are kept sharp by roi_qp. statistics() reports the bitrate saved against
+    the baseline.
+
+    usage:
+        roi = AxcliteVencRoi(device, encoder.get_chn_id(), 1920, 1080, bitrate_ratio=0.6, calibrate_frames=120)
+        encoder.register_observer(roi)
+        ...
+        roi.set_boxes(boxes)    # N x 4 of [x1, y1, x2, y2] per detected frame
+        ...
+        roi.destroy()
+    """
+    def __init__(self, device, chn, width, height, roi_qp=-8, abs_qp=False, slots=axcl.MAX_VENC_ROI_NUM, align=16,
+                 margin=0.1, smoothing=0.5, match_iou=0.3, min_hits=2, hold_frames=15, bitrate_ratio=1.0,
+                 calibrate_frames=0, fps=30):
+        """
+        :param roi_qp: QP delta of ROI if abs_qp is False, otherwise QP of ROI
+        :param slots: number of ROI slots used, from index 0
+        :param align: alignment of regions in pixels
+        :param margin: ratio of box size the region is expanded by on each side
+        :param smoothing: EWMA weight of the latest box
+        :param match_iou: min IoU of a box to its slot
+        :param min_hits: matched frames before a slot is enabled
+        :param hold_frames: missed frames before a slot is disabled
+        :param bitrate_ratio: ratio rc bitrate is scaled by once calibrated, 1.0 keeps bitrate
+        :param calibrate_frames: frames encoded without ROI as the baseline of bitrate saved
+        :param fps: frame rate to report kbps
+        """
+        AxcliteResource.__init__(self, self.__class__.__name__)
+        self.device = device
+        self.chn = chn
+        self.width = width
+        self.height = height
+        self.roi_qp = roi_qp
+        self.abs_qp = abs_qp
+        self.align = align
+        self.margin = margin
+        self.smoothing = smoothing
+        self.match_iou = match_iou
+        self.min_hits = min_hits
+        self.hold_frames = hold_frames
+        self.bitrate_ratio = bitrate_ratio
+        self.calibrate_frames = calibrate_frames
+        self.fps = fps
+        self.slots = [_RoiSlot(i) for i in range(min(slots, axcl.MAX_VENC_ROI_NUM))]
+
+        self.calibrated = calibrate_frames == 0
+        self.rc_param = None
+        # [frames, bytes] of baseline and managed by ROI
+        self.counters = [[0, 0], [0, 0]]
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def update(self, data):
+        with self._lock:
+            counter = self.counters[self.calibrated]
+            counter[0] += 1
+            counter[1] += data['pack']['len']
+
+    def set_boxes(self, boxes) -> int:
+        """
+        :param boxes: N x 4 of [x1, y1, x2, y2] in frame coordinates of one frame, extra columns are ignored
+        :return: 0 if all changed slots are set
+        """
+        rects = []
+        for box in boxes:
+            x1, y1 = max(0.0, float(box[0])), max(0.0, float(box[1]))
+            x2, y2 = min(float(self.width), float(box[2])), min(float(self.height), float(box[3]))
+            if x2 > x1 and y2 > y1:
+                rects.append([x1, y1, x2, y2])
+        rects.sort(key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True)
+
+        # greedy matching by IoU
+        pairs = sorted(((_iou(slot.box, rect), slot.index, i) for slot in self.slots if slot.box
+                        for i, rect in enumerate(rects)), reverse=True)
+        matched_slots = set()
+        matched_rects = set()
+        for iou, index, i in pairs:
+            if iou < self.match_iou:
+                break
+            if index in matched_slots or i in matched_rects:
+                continue
+            matched_slots.add(index)
+            matched_rects.add(i)
+            slot = self.slots[index]
+            slot.box = [self.smoothing * n + (1 - self.smoothing) * o for n, o in zip(rects[i], slot.box)]
+            slot.hits += 1
+            slot.misses = 0
+
+        for slot in self.slots:
+            if slot.box and slot.index not in matched_slots:
+                slot.misses += 1
+                if slot.misses > self.hold_frames:
+                    slot.box = None
+
+        free = [slot for slot in self.slots if slot.box is None]
+        for i, rect in enumerate(rects):
+            if not free:
+                break
+            if i not in matched_rects:
+                slot = free.pop(0)
+                slot.box = rect
+                slot.hits = 1
+                slot.misses = 0
+
+        if not self.calibrated:
+            with self._lock:
+                if self.counters[0][0] < self.calibrate_frames:
+                    return axcl.AXCL_SUCC
+                self.calibrated = True
+        if self.bitrate_ratio != 1.0 and self.rc_param is None:
+            self._scale_bitrate()
+
+        ret = axcl.AXCL_SUCC
+        for slot in self.slots:
+            area = self._region(slot)
+            if area == slot.area:
+                continue
+            r = self._set_slot(slot.index, area or slot.area, area is not None)
+            if r != axcl.AXCL_SUCC:
+                ret = r
+                continue
+            slot.area = area
+            self.updates += 1
+        return ret
+
+    def destroy(self):
+        for slot in self.slots:
+            if slot.area:
+                self._set_slot(slot.index, slot.area, False)
+                slot.area = None
+            slot.box = None
+        if self.rc_param:
+            ret = axcl.venc.set_rc_param(self.chn, self.rc_param)
+            if ret != axcl.AXCL_SUCC:
+                print(f"device {self.device:02x}: restore rc param of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self.rc_param = None
+
+    def statistics(self):
+        with self._lock:
+            (base_frames, base_bytes), (roi_frames, roi_bytes) = self.counters
+        base_kbps = base_bytes * 8 * self.fps / base_frames / 1000 if base_frames else 0
+        roi_kbps = roi_bytes * 8 * self.fps / roi_frames / 1000 if roi_frames else 0
+        saved = base_kbps - roi_kbps if base_frames and roi_frames else 0
+        return {'rois': sum(1 for slot in self.slots if slot.area), 'updates': self.updates,
+                'baseline_kbps': round(base_kbps), 'roi_kbps': round(roi_kbps), 'saved_kbps': round(saved),
+                'saved_ratio': round(saved / base_kbps, 3) if base_kbps else 0}
+
+    def _region(self, slot):
+        if slot.box is None or slot.hits < self.min_hits:
+            return None
+
+        x1, y1, x2, y2 = slot.box
+        mx = (x2 - x1) * self.margin
+        my = (y2 - y1) * self.margin
+        x1 = axclite_align_down(max(0, int(x1 - mx)), self.align)
+        y1 = axclite_align_down(max(0, int(y1 - my)), self.align)
+        x2 = min(axclite_align_up(int(x2 + mx + 0.5), self.align), self.width)
+        y2 = min(axclite_align_up(int(y2 + my + 0.5), self.align), self.height)
+        # a new region is padded by one block, so an object moving slowly stays covered for some frames
+        area = (max(0, x1 - self.align), max(0, y1 - self.align))
+        area += (min(x2 + self.align, self.width) - area[0], min(y2 + self.align, self.height) - area[1])
+
+        # keep the current region while it covers the object and is not twice larger
+        if slot.area:
+            x, y, w, h = slot.area
+            if x <= x1 and y <= y1 and x + w >= x2 and y + h >= y2 and w * h <= area[2] * area[3] * 2:
+                return slot.area
+        return area
+
+    def _set_slot(self, index, area, enable):
+        x, y, w, h = area
+        roi_attr = {
+            'index': index,
+            'enable': enable,
+            'abs_qp': self.abs_qp,
+            'roi_qp': self.roi_qp,
+            'roi_area': {'x': x, 'y': y, 'width': w, 'height': h}
+        }
+        ret = axcl.venc.set_roi_attr(self.chn, roi_attr)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: set roi {index} {'on' if enable else 'off'} {area} of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+        return ret
+
+    def _scale_bitrate(self):
+        param, ret = axcl.venc.get_rc_param(self.chn)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: get rc param of veChn {self.chn} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self.bitrate_ratio = 1.0
+            return
+
+        rc_key = next((key for key in param if key in VENC_RC_BITRATE_KEYS), None)
+        if rc_key is None:
+            print(f"device {self.device:02x}: rc mode {param.get('rc_mode')} of veChn {self.chn} has no bitrate to scale")
+            self.bitrate_ratio = 1.0
+            return
+
+        rc_param = copy.deepcopy(param)
+        bitrate_key = VENC_RC_BITRATE_KEYS[rc_key]
+        param[rc_key][bitrate_key] = max(1, int(param[rc_key][bitrate_key] * self.bitrate_ratio))
+        ret = axcl.venc.set_rc_param(self.chn, param)
+        if ret != axcl.AXCL_SUCC:
+            print(f"device {self.device:02x}: scale bitrate of veChn {self.chn} by {self.bitrate_ratio} fail, ret = 0x{ret&0xFFFFFFFF:x}")
+            self.bitrate_ratio = 1.0
+            return
+        self.rc_param = rc_param
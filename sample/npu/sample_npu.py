@@ -183,9 +183,15 @@ def main(vnpu, file, warmup, repeat):
         "parallel_run": 0,
     }
 
+    # prepare io once, then run repeatedly without dict to structure conversion
+    c_io = axcl.npu.prepare_io(io)
+    if c_io is None:
+        print("engine prepare io failed")
+        on_release(vnpu, handle, io)
+
     # warmup
     for i in range(warmup):
-        ret = axcl.npu.run_sync_v2(handle, ctx, io)
+        ret = axcl.npu.run_sync_v2(handle, ctx, c_io)
         if 0 != ret:
             print(f"engine run sync failed, ret = 0x{ret&0xFFFFFFFF:x}")
             on_release(vnpu, handle, io)
@@ -194,7 +200,7 @@ def main(vnpu, file, warmup, repeat):
     time_costs = []
     for i in range(repeat):
         t = time.time()
-        ret = axcl.npu.run_sync_v2(handle, ctx, io)
+        ret = axcl.npu.run_sync_v2(handle, ctx, c_io)
         time_costs.append(time.time() - t)
         if 0 != ret:
             print(f"engine run sync failed, ret = 0x{ret&0xFFFFFFFF:x}")
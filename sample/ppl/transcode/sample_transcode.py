@@ -12,7 +12,6 @@
 import argparse
 import os
 import sys
-import time
 import traceback
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,24 +28,25 @@ from axclite.axclite_venc import AxcliteVenc
 from axclite.axclite_ivps import AxcliteIvps
 from axclite.axclite_utils import axclite_align_up
 from axclite.axclite_observer import AxcliteObserver
-from axclite.axclite_file import AxcliteStoreFileFromDevice
+from axclite.axclite_stream_writer import AxcliteStreamWriter
+from axclite.axclite_mp4_muxer import AxcliteMp4Muxer
 from vdec.simple_annexb_split import SimpleAnnexbSplit
 from axclite.axclite_resource import axclite_resource_manager
 
 
 class VencObserver(AxcliteObserver):
-    def __init__(self, dump_path, dump_file):
+    def __init__(self, writer):
         self.seq_num = 0
-        self.dump_path = dump_path
-        self.dump_file = dump_file
+        self.writer = writer
 
     def update(self, data):
         self.seq_num += 1
         pack = data['pack']
         # print(f"seq_num {pack['seq_num']:05d}: len: {pack['len']}, type: {pack['type']}, pts: {pack['pts']}, phy_addr: 0x{pack['phy_addr']:x}")
 
-        if self.dump_file:
-            AxcliteStoreFileFromDevice(pack['phy_addr'], pack['len'], self.dump_path, self.dump_file, False if self.seq_num == 1 else True)
+        # payload is copied to host by raw stream writer or mp4 muxer, stream is released at once
+        if self.writer:
+            self.writer.write_pack(pack)
 
 
 def create_vdec_instance(device: int, codec: str, width: int, height: int) -> object:
@@ -172,11 +172,26 @@ def create_ivps_instance(device: int, width: int, height: int) -> object:
     return obj
 
 
-def main(device: int, input_file: str, codec: str, width: int, height: int, fps: int, dump: int):
+def main(device: int, input_file: str, codec: str, width: int, height: int, fps: int, dump: int, container='raw'):
     streamer = SimpleAnnexbSplit(device)
     if not streamer.open(input_file, codec, fps):
         return
 
+    if sys.platform.startswith('win'):
+        dump_path = os.path.dirname(os.path.abspath(input_file))
+    else:
+        dump_path = "/tmp/axcl"
+
+    # writer is registered first, so it is closed after venc is destroyed (FILO)
+    dump_file = "dump_transcode.{}".format('h265' if container == 'raw' else 'mp4')
+    writer = None
+    if dump:
+        if container == 'raw':
+            writer = AxcliteStreamWriter(device, os.path.join(dump_path, dump_file))
+        else:
+            writer = AxcliteMp4Muxer(device, os.path.join(dump_path, dump_file), axcl.PT_H265, width, height, fps, fragmented=container == 'fmp4')
+        axclite_resource_manager.register(writer)
+
     # create video decoder object
     vdec = create_vdec_instance(device, codec, width, height)
     axclite_resource_manager.register(vdec)
@@ -185,13 +200,7 @@ def main(device: int, input_file: str, codec: str, width: int, height: int, fps:
     venc = create_venc_instance(device, 'h265', width, height, fps)
     axclite_resource_manager.register(venc)
 
-    if sys.platform.startswith('win'):
-        dump_path = os.path.dirname(os.path.abspath(input_file))
-    else:
-        dump_path = "/tmp/axcl"
-
-    dump_file = "dump_transcode.{}".format('h265')
-    venc.register_observer(VencObserver(dump_path if dump else None, dump_file if dump else None))
+    venc.register_observer(VencObserver(writer))
 
     """
         The decoder only supports downscaling by chn1 or chn2 and cannot scale up.
@@ -221,16 +230,13 @@ def main(device: int, input_file: str, codec: str, width: int, height: int, fps:
 
     streamer.start(on_recv_nal_frame, None)
 
-    # wait streamer and decoder eof
+    # wait streamer eof, end of stream flows from vdec through ivps, the last stream is written once venc reaches it
     streamer.join()
-    while True:
-        status = vdec.query_status()
-        if status:
-            if 0 == (status['left_stream_frames'] + status['left_pics'][0] + status['left_pics'][1] + status['left_pics'][2]):
-                print(f"device {device:02x}: total recv frames {status['recv_stream_frames']}, decoded {status['decode_stream_frames']}")
-                break
-
-        time.sleep(2)
+    if not venc.wait_eos(10):
+        print(f"device {device:02x}: wait end of stream of veChn {venc.get_chn_id()} timeout")
+    status = vdec.query_status()
+    if status:
+        print(f"device {device:02x}: total recv frames {status['recv_stream_frames']}, decoded {status['decode_stream_frames']}")
 
     # unlink all
     AxcliteMSys().unlink_all()
@@ -245,7 +251,7 @@ def main(device: int, input_file: str, codec: str, width: int, height: int, fps:
     axclite_resource_manager.destroy()
 
     if dump:
-        print(f"device {device:02x}: {os.path.join(dump_path, dump_file)} is saved")
+        print(f"device {device:02x}: {os.path.join(dump_path, dump_file)} is saved, {writer.statistics()}")
 
 
 if __name__ == '__main__':
@@ -261,6 +267,7 @@ if __name__ == '__main__':
     parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
     parser.add_argument('--fps', type=int, default=30)
     parser.add_argument('--dump', type=int, default=0, help='dump encoded NAL stream, 0: no dump 1: dump')
+    parser.add_argument('--container', choices=['raw', 'mp4', 'fmp4'], default='raw', help='dump as raw annexB, mp4 with moov at end or fragmented mp4')
     parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
     parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
 
@@ -285,7 +292,7 @@ if __name__ == '__main__':
                     device.destroy()
                 else:
                     # invoke main function
-                    main(device.device_id, input_file, codec, width, height, fps, dump)
+                    main(device.device_id, input_file, codec, width, height, fps, dump, args.container)
 
                     # de-initialize modules
                     AxcliteMSys().deinit()
@@ -0,0 +1,165 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VDEC, AXCL_LITE_VENC, AXCL_LITE_IVPS
+from axclite.axclite_graph import AxcliteGraph, axclite_compile_graph
+from axclite.axclite_utils import axclite_align_up
+from axclite.axclite_stream_writer import AxcliteStreamWriter
+from vdec.simple_annexb_split import SimpleAnnexbSplit
+
+
+def transcode_spec(codec: str, width: int, height: int, fps: int) -> dict:
+    """
+    decode -> resize -> encode h265, constants are given by name as they would be in a YAML or JSON file
+    """
+    rc = {'gop': fps * 2, 'stat_time': 0, 'bitrate': 4096, 'max_qp': 51, 'min_qp': 10, 'max_iqp': 51, 'min_iqp': 10,
+          'max_iprop': 40, 'min_iprop': 10, 'intra_qp_delta': -2, 'idr_qp_delta_range': 0}
+    return {
+        'nodes': {
+            'dec': {'type': 'vdec', 'attr': {
+                'grp_attr': {'codec_type': 'PT_H264' if codec == 'h264' else 'PT_H265', 'max_pic_width': width, 'max_pic_height': height,
+                             'output_order': 'AX_VDEC_OUTPUT_ORDER_DEC', 'display_mode': 'AX_VDEC_DISPLAY_MODE_PLAYBACK'},
+                'chn_attr': [
+                    {'enable': False},
+                    {'enable': True, 'pic_width': width, 'pic_height': height,
+                     'compress_info': {'compress_mode': 'AX_COMPRESS_MODE_LOSSY', 'compress_level': 4},
+                     'output_fifo_depth': 4, 'frame_buf_cnt': 8},
+                    {'enable': False}
+                ]
+            }},
+            'resize': {'type': 'ivps', 'attr': {
+                'grp_attr': {'in_fifo_depth': 4},
+                'filters': [{
+                    'engaged': True, 'out_fifo_depth': 4, 'engine': 'AX_IVPS_ENGINE_VPP',
+                    'dst_pic_width': width, 'dst_pic_height': height,
+                    'dst_pic_stride': axclite_align_up(width, 256),  # VENC FBC stride should be aligned to 256
+                    'dst_pic_format': 'AX_FORMAT_YUV420_SEMIPLANAR',
+                    'compression_info': {'compress_mode': 'AX_COMPRESS_MODE_LOSSY', 'compress_level': 4},
+                    'frame_buf_num': 4
+                }]
+            }},
+            'enc': {'type': 'venc', 'attr': {
+                'venc_attr': {'type': 'PT_H265', 'pic_width_src': width, 'pic_height_src': height,
+                              'profile': 'AX_VENC_HEVC_MAIN_PROFILE', 'level': 'AX_VENC_HEVC_LEVEL_5_1',
+                              'tier': 'AX_VENC_HEVC_MAIN_TIER', 'in_fifo_depth': 4, 'out_fifo_depth': 4, 'flag': 0},
+                'rc_attr': {'rc_mode': 'AX_VENC_RC_MODE_H265CBR', 'first_frame_start_qp': -1,
+                            'frame_rate': {'src_frame_rate': fps, 'dst_frame_rate': fps},
+                            'h265_cbr_rc_attr': rc},
+                'gop_attr': {'gop_mode': 'AX_VENC_GOPMODE_NORMALP'}
+            }}
+        },
+        # links set chn link flags and venc link mode
+        'links': [['dec:1', 'resize'], ['resize:0', 'enc']]
+    }
+
+
+def main(device: int, input_file: str, codec: str, width: int, height: int, fps: int, streams: int, dump: int):
+    plan = axclite_compile_graph(transcode_spec(codec, width, height, fps))
+    if plan is None:
+        return
+
+    dump_path = os.path.dirname(os.path.abspath(input_file)) if sys.platform.startswith('win') else "/tmp/axcl"
+    jobs = []
+    for i in range(streams):
+        streamer = SimpleAnnexbSplit(device)
+        if not streamer.open(input_file, codec, fps):
+            break
+
+        graph = AxcliteGraph(f"stream{i}")
+        writer = None
+        if graph.create(plan, device) != axcl.AXCL_SUCC:
+            streamer.close()
+            graph.destroy()
+            break
+        if dump:
+            writer = AxcliteStreamWriter(device, os.path.join(dump_path, f"dump_transcode_graph_{i}.h265"))
+            graph.node('enc').register_observer(writer)
+        jobs.append((graph, streamer, writer))
+
+    def on_recv_nal_frame(seq_num, frame, pts, userdata):
+        userdata.send_stream(frame, pts)
+
+    if len(jobs) == streams:
+        begin = time.monotonic()
+        for graph, streamer, _ in jobs:
+            if graph.start() == axcl.AXCL_SUCC:
+                streamer.start(on_recv_nal_frame, graph.node('dec'))
+
+        # wait streamer eof and end of stream through each graph
+        for graph, streamer, _ in jobs:
+            streamer.join()
+            graph.wait_eos(10)
+        elapsed = time.monotonic() - begin
+
+        for graph, _, _ in jobs:
+            graph.stop()
+            print(f"device {device:02x}: {graph.label} {graph.statistics()}")
+        print(f"device {device:02x}: {len(jobs)} streams transcoded in {elapsed:.2f} s")
+
+    for graph, streamer, writer in jobs:
+        streamer.close()
+        graph.destroy()
+        if writer:
+            writer.close()
+            print(f"device {device:02x}: {writer.file_path} is saved, {writer.statistics()}")
+
+
+if __name__ == '__main__':
+    print(f"============== sample transcode graph started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='transcode sample by graph: decode -> resize -> encode of N streams, each built from one compiled spec',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.h264 --width 1920 --height 1080 h264 --streams 4'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--streams', type=int, default=2, help='number of graphs transcoding the input in parallel')
+    parser.add_argument('--dump', type=int, default=0, help='dump encoded NAL stream, 0: no dump 1: dump')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VDEC | AXCL_LITE_VENC | AXCL_LITE_IVPS)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, max(1, args.fps), max(1, args.streams),
+                         args.dump)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample transcode graph exited ==============")
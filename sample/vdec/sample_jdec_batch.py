@@ -0,0 +1,81 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import glob
+import os
+import sys
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_JDEC, AXCL_LITE_IVPS
+from axclite.axclite_jdec import AxcliteJpegDecoder
+from axclite.axclite_file import AxcliteStoreFileFromDevice
+
+
+def main(device: int, paths: list, max_width: int, max_height: int, decoders: int, readers: int, resize, max_dump_num: int):
+    dump_path = "/tmp/axcl"
+
+    def on_decoded(index, path, frame, userdata):
+        if frame and index < max_dump_num:
+            dump_file = "jdec_{}_{}x{}.nv12.yuv".format(os.path.splitext(os.path.basename(path))[0], frame['pic_stride'][0], frame['height'])
+            AxcliteStoreFileFromDevice(frame['phy_addr'][0], frame['frame_size'], dump_path, dump_file)
+
+    decoder = AxcliteJpegDecoder(device, max_width, max_height, decoders, readers, resize)
+    decoder.decode_files(paths, on_decoded)
+    decoder.destroy()
+
+
+if __name__ == '__main__':
+    print(f"============== sample jdec batch started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='batch jpeg decode sample: decode all jpeg files of a directory and report images/s',
+        epilog=f'eg: {os.path.basename(__file__)} -i /data/images --max-width 3840 --max-height 2160 --resize 640x640'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='directory of jpeg files')
+    parser.add_argument('--max-width', type=int, default=3840, help='max width of jpeg')
+    parser.add_argument('--max-height', type=int, default=2160, help='max height of jpeg')
+    parser.add_argument('--decoders', type=int, default=2, help='in-flight decodes')
+    parser.add_argument('--readers', type=int, default=4, help='file reader threads')
+    parser.add_argument('--resize', type=str, default=None, help='resize to WxH by IVPS, such as 640x640')
+    parser.add_argument('--dump', type=int, default=0, help='dump number of decoded nv12 images to /tmp/axcl')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    paths = sorted(glob.glob(os.path.join(args.input, '*.jpg')) + glob.glob(os.path.join(args.input, '*.jpeg')))
+    resize = tuple(int(v) for v in args.resize.lower().split('x')) if args.resize else None
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_JDEC | AXCL_LITE_IVPS if resize else AXCL_LITE_JDEC)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, paths, args.max_width, args.max_height, args.decoders, args.readers, resize, args.dump)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample jdec batch exited ==============")
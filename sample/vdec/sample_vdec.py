@@ -12,7 +12,6 @@
 import argparse
 import os
 import sys
-import time
 import traceback
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,10 +24,13 @@ from axclite.axclite_device import AxcliteDevice
 from axclite.axclite_system import axclite_system
 from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VDEC
 from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_auto_vdec import AxcliteAutoVdec
 from axclite.axclite_utils import axclite_align_up
 from axclite.axclite_observer import AxcliteObserver
 from axclite.axclite_file import AxcliteStoreFileFromDevice
 from vdec.simple_annexb_split import SimpleAnnexbSplit
+from vdec.simple_container_demux import SimpleContainerDemux
+from axclite.axclite_vdec_sampler import AxcliteVdecSampler
 
 
 class VdecObserver(AxcliteObserver):
@@ -38,6 +40,7 @@ class VdecObserver(AxcliteObserver):
         self.chn = chn
         self.dump_path = dump_path
         self.dump_file = dump_file
+        self.saved = set()
 
     def update(self, data):
         self.seq_num += 1
@@ -50,15 +53,30 @@ class VdecObserver(AxcliteObserver):
         """
 
         if self.max_dump_num < 0 or self.seq_num <= self.max_dump_num:
-            AxcliteStoreFileFromDevice(frame['phy_addr'][0], frame['frame_size'], self.dump_path, self.dump_file, False if self.seq_num == 1 else True)
-
-
-def main(device: int, input_file: str, codec: str, width: int, height: int, fps: int, max_dump_num: int):
-    streamer = SimpleAnnexbSplit(device)
-    if not streamer.open(input_file, codec, fps):
-        return
+            # size follows the stream if dump file is not given, one file per resolution
+            dump_file = self.dump_file or "dump_chn{}_decoded_{}x{}.nv12.yuv".format(self.chn, frame['pic_stride'][0], frame['height'])
+            AxcliteStoreFileFromDevice(frame['phy_addr'][0], frame['frame_size'], self.dump_path, dump_file, dump_file in self.saved)
+            self.saved.add(dump_file)
+
+
+def main(device: int, input_file: str, codec: str, width: int, height: int, fps: int, max_dump_num: int, scale=None, key_every=0):
+    if os.path.splitext(input_file)[1].lower() in ['.mp4', '.mov', '.m4v', '.mkv']:
+        # container carries real pts, pace by pts if fps > 0
+        streamer = SimpleContainerDemux(device)
+        if not streamer.open(input_file, realtime=fps > 0):
+            return
+
+        if streamer.codec != codec:
+            print(f"device {device:02x}: codec {codec} is overridden by {streamer.codec} of {input_file}")
+            codec = streamer.codec
+    else:
+        streamer = SimpleAnnexbSplit(device)
+        if not streamer.open(input_file, codec, fps):
+            return
 
-    decoder = AxcliteVdec()
+    # resolution is parsed from stream if width or height is not given
+    auto = width == 0 or height == 0
+    decoder = AxcliteAutoVdec() if auto else AxcliteVdec()
 
     attr = {
         'grp_attr': {
@@ -75,6 +93,15 @@ def main(device: int, input_file: str, codec: str, width: int, height: int, fps:
         ]
     }
 
+    if auto:
+        # frame_buf_cnt is derived from reference frames of stream
+        attr['chn_attr'][1].pop('frame_buf_cnt')
+
+    if scale:
+        # second output of the same decode, e.g. 640x360 for detector besides full size
+        attr['chn_attr'][2] = {'enable': True, 'link': False, 'pic_width': scale[0], 'pic_height': scale[1],
+                               'output_fifo_depth': 4, 'frame_buf_cnt': 8, 'recv_frame_timeout': 1000}
+
     # register observer for enabled and unlink channel
     observers = [None for _ in range(axcl.AX_VDEC_MAX_CHN_NUM)]
     if sys.platform.startswith('win'):
@@ -85,39 +112,56 @@ def main(device: int, input_file: str, codec: str, width: int, height: int, fps:
     dump_file = [None for _ in range(axcl.AX_VDEC_MAX_CHN_NUM)]
     for i in range(len(attr['chn_attr'])):
         if attr['chn_attr'][i]['enable'] and not attr['chn_attr'][i]['link']:
-            dump_file[i] = "dump_chn{}_decoded_{}x{}.nv12.yuv".format(i, axclite_align_up(width, 256), height)
+            chn_width = attr['chn_attr'][i]['pic_width']
+            chn_height = attr['chn_attr'][i]['pic_height']
+            if not auto:
+                dump_file[i] = "dump_chn{}_decoded_{}x{}.nv12.yuv".format(i, axclite_align_up(chn_width, 256), chn_height)
             observers[i] = VdecObserver(i, max_dump_num, dump_path, dump_file[i])
             decoder.register_observer(i, observers[i])
 
     # create video decoder
     if decoder.create(attr, device) == axcl.AXCL_SUCC:
+        # decode one of every key_every key frames only, such as thumbnailing
+        sampler = None
+        if key_every > 0:
+            sampler = AxcliteVdecSampler(decoder, every_n=key_every)
+            if not auto:
+                # group of AxcliteAutoVdec is created later, it keeps IPB decode mode
+                sampler.configure()
+
         # start video decoder
         decoder.start()
 
         # start streaming
         def on_recv_nal_frame(seq_num, frame, pts, userdata):
-            decoder.send_stream(frame, pts)
+            if sampler:
+                sampler.send(frame, pts)
+            else:
+                decoder.send_stream(frame, pts)
 
         streamer.start(on_recv_nal_frame, None)
 
-        # wait all NALs have been decoded
+        # wait all NALs have been decoded, end of stream is sent by streamer and the last frame is got by observers
         streamer.join()
-        while True:
-            status = decoder.query_status()
-            if status:
-                if 0 == (status['left_stream_frames'] + status['left_pics'][0] + status['left_pics'][1] + status['left_pics'][2]):
-                    print(f"device {device:02x}: total recv frames {status['recv_stream_frames']}, decoded {status['decode_stream_frames']}")
-                    break
+        if not decoder.wait_eos(10):
+            print(f"device {device:02x}: wait end of stream of vdGrp {decoder.get_grp_id()} timeout")
+        status = decoder.query_status() if decoder.get_grp_id() >= 0 else None
+        if status:
+            print(f"device {device:02x}: total recv frames {status['recv_stream_frames']}, decoded {status['decode_stream_frames']}")
 
-            time.sleep(2)
+        if sampler:
+            print(f"device {device:02x}: sampling {sampler.statistics()}")
+        if auto:
+            print(f"device {device:02x}: stream {decoder.statistics()}")
 
         # stop and destroy video decoder
         decoder.stop()
         decoder.destroy()
 
     for i in range(axcl.AX_VDEC_MAX_CHN_NUM):
-        if dump_file[i]:
-            print(f"device {device:02x}: {os.path.join(dump_path, dump_file[i])} is saved")
+        if observers[i]:
+            for saved in sorted(observers[i].saved):
+                print(f"device {device:02x}: {os.path.join(dump_path, saved)} is saved")
 
     streamer.close()
 
@@ -129,11 +173,13 @@ if __name__ == '__main__':
         description='decode sample: decode h264/h265 raw annexB stream to nv12.yuv images',
         epilog=f'eg: {os.path.basename(__file__)} -i input.h264 --width 1920 --height 1080 h264 --fps 30 --dump 10'
     )
-    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file')
-    parser.add_argument('--width', type=int, required=True, help='width')
-    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file, or mp4, mov, mkv file')
+    parser.add_argument('--width', type=int, default=0, help='width, 0: parse from stream')
+    parser.add_argument('--height', type=int, default=0, help='height, 0: parse from stream')
     parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
     parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--scale', type=str, default=None, help='enable second output channel of WxH, such as 640x360')
+    parser.add_argument('--key-every', type=int, default=0, help='decode one of every N key frames only. 0: decode all frames')
     parser.add_argument('--dump', type=int, default=0, help='dump number of decode nv12 image from device. 0: no dump, -1: dump all')
     parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
     parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
@@ -147,6 +193,7 @@ if __name__ == '__main__':
     width = args.width
     height = args.height
     dump = args.dump
+    scale = tuple(int(v) for v in args.scale.lower().split('x')) if args.scale else None
 
     try:
         with axclite_system(json):
@@ -159,7 +206,7 @@ if __name__ == '__main__':
                     device.destroy()
                 else:
                     # invoke main function
-                    main(device.device_id, input_file, codec, width, height, fps, dump)
+                    main(device.device_id, input_file, codec, width, height, fps, dump, scale, args.key_every)
 
                     # de-initialize sys and video decoder module
                     AxcliteMSys().deinit()
@@ -0,0 +1,181 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VDEC
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_vdec_hub import AxcliteVdecHub
+from axclite.axclite_observer import AxcliteObserver
+from vdec.simple_annexb_split import SimpleAnnexbSplit
+
+
+class CountObserver(AxcliteObserver):
+    def __init__(self):
+        self.count = 0
+
+    def update(self, data):
+        self.count += 1
+
+
+def load_frames(device, input_file, codec):
+    frames = []
+
+    def on_recv_nal_frame(seq_num, frame, pts, userdata):
+        if frame:
+            frames.append((bytes(frame), pts))
+
+    streamer = SimpleAnnexbSplit(device)
+    if not streamer.open(input_file, codec, 0):
+        return frames
+
+    streamer.start(on_recv_nal_frame, None)
+    streamer.join()
+    streamer.close()
+    return frames
+
+
+def feed_worker(device, decoders, frames):
+    context = AxcliteContext()
+    context.create(device)
+
+    # round robin all groups with the same stream
+    for frame, pts in frames:
+        for decoder in decoders:
+            decoder.send_stream(frame, pts)
+
+    for decoder in decoders:
+        decoder.send_stream(None, 0)
+
+    context.destroy()
+
+
+def benchmark(device: int, frames: list, codec: str, width: int, height: int, grp_num: int, mode: str, workers: int):
+    """
+    decode the same stream by grp_num groups, frames are received by one thread per group (thread) or by AxcliteVdecHub (hub)
+    """
+    attr = {
+        'grp_attr': {
+            'codec_type': axcl.PT_H264 if codec == 'h264' else axcl.PT_H265,
+            'max_pic_width': width,
+            'max_pic_height': height,
+            'output_order': axcl.AX_VDEC_OUTPUT_ORDER_DEC,
+            'display_mode': axcl.AX_VDEC_DISPLAY_MODE_PLAYBACK
+        },
+        'chn_attr': [
+            {'enable': False},
+            {'enable': True, 'link': False, 'pic_width': width, 'pic_height': height, 'output_fifo_depth': 4, 'frame_buf_cnt': 8, 'recv_frame_timeout': 1000},
+            {'enable': False}
+        ]
+    }
+
+    decoders = []
+    observers = []
+    for i in range(grp_num):
+        decoder = AxcliteVdec()
+        if decoder.create(attr, device) != axcl.AXCL_SUCC:
+            break
+        observer = CountObserver()
+        decoder.register_observer(1, observer)
+        decoders.append(decoder)
+        observers.append(observer)
+
+    hub = AxcliteVdecHub(device, workers) if mode == 'hub' else None
+    if len(decoders) == grp_num:
+        for decoder in decoders:
+            decoder.start(recv=hub is None)
+            if hub:
+                hub.attach(decoder)
+        if hub:
+            hub.start()
+
+        total = len(frames) * grp_num
+        cpu = time.process_time()
+        begin = time.monotonic()
+
+        feeder = threading.Thread(target=feed_worker, args=(device, decoders, frames), name='vdec_feed')
+        feeder.start()
+        feeder.join()
+
+        # wait all frames decoded, at most 5 seconds after feeding
+        deadline = time.monotonic() + 5
+        while sum(o.count for o in observers) < total and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        elapsed = time.monotonic() - begin
+        cpu = time.process_time() - cpu
+        decoded = sum(o.count for o in observers)
+        print(f"device {device:02x}: {mode:6s} {grp_num:2d} groups: {decoded}/{total} frames, {decoded / elapsed:.1f} fps, "
+              f"cpu {cpu / elapsed * 100:.1f}%, cpu per stream {cpu / elapsed * 100 / grp_num:.2f}%")
+
+        if hub:
+            hub.stop()
+        for decoder in decoders:
+            decoder.stop()
+
+    for decoder in decoders:
+        decoder.destroy()
+
+
+if __name__ == '__main__':
+    print(f"============== sample vdec hub started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='benchmark host cpu of receiving decoded frames by one thread per group or by select_grp hub',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.h264 --width 1920 --height 1080 h264 --groups 1 8 32'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--groups', type=int, nargs='+', default=[1, 8, 32], help='number of groups to benchmark')
+    parser.add_argument('--mode', choices=['thread', 'hub', 'both'], default='both', help='receive mode')
+    parser.add_argument('--workers', type=int, default=1, help='worker threads of hub')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    modes = ['thread', 'hub'] if args.mode == 'both' else [args.mode]
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VDEC, max_vdec_grp=max(32, max(args.groups)))
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    frames = load_frames(device.device_id, args.input, args.codec)
+                    for grp_num in args.groups:
+                        for mode in modes:
+                            benchmark(device.device_id, frames, args.codec, args.width, args.height, grp_num, mode, args.workers)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample vdec hub exited ==============")
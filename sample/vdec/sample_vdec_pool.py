@@ -0,0 +1,154 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_context import AxcliteContext
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VDEC
+from axclite.axclite_vdec import AxcliteVdec
+from axclite.axclite_codec_pool import AxcliteCodecPool
+from axclite.axclite_observer import AxcliteObserver
+from vdec.sample_vdec_hub import load_frames
+
+
+class CountObserver(AxcliteObserver):
+    def __init__(self, total):
+        self.count = 0
+        self.total = total
+        self.event = threading.Event()
+
+    def update(self, data):
+        self.count += 1
+        if self.count >= self.total:
+            self.event.set()
+
+
+def decode_clip(decoder, frames):
+    """
+    decode one clip, return number of decoded frames
+    """
+    observer = CountObserver(len(frames))
+    decoder.register_observer(0, observer)
+    decoder.start()
+    for frame, pts in frames:
+        decoder.send_stream(frame, pts)
+    decoder.send_stream(None, 0)
+    observer.event.wait(5)
+    return observer.count
+
+
+def job_worker(device, pool, codec_type, width, height, frames, jobs, results):
+    context = AxcliteContext()
+    context.create(device)
+
+    attr = {
+        'grp_attr': {'codec_type': codec_type, 'max_pic_width': width, 'max_pic_height': height,
+                     'output_order': axcl.AX_VDEC_OUTPUT_ORDER_DEC, 'display_mode': axcl.AX_VDEC_DISPLAY_MODE_PLAYBACK},
+        'chn_attr': [
+            {'enable': True, 'link': False, 'pic_width': width, 'pic_height': height, 'output_fifo_depth': 4, 'frame_buf_cnt': 8, 'recv_frame_timeout': 1000},
+            {'enable': False},
+            {'enable': False}
+        ]
+    }
+
+    for _ in range(jobs):
+        if pool:
+            decoder = pool.lease_vdec(codec_type, width, height)
+            if decoder is None:
+                break
+            results.append(decode_clip(decoder, frames))
+            pool.release(decoder)
+        else:
+            decoder = AxcliteVdec()
+            if decoder.create(attr, device) != axcl.AXCL_SUCC:
+                break
+            results.append(decode_clip(decoder, frames))
+            decoder.stop()
+            decoder.destroy()
+
+    context.destroy()
+
+
+def main(device: int, input_file: str, codec: str, width: int, height: int, jobs: int, concurrency: int, clip_frames: int):
+    frames = load_frames(device, input_file, codec)[:clip_frames]
+    codec_type = axcl.PT_H264 if codec == 'h264' else axcl.PT_H265
+
+    for mode in ['create', 'pool']:
+        pool = None
+        if mode == 'pool':
+            pool = AxcliteCodecPool(device)
+            pool.add_vdec(codec_type, width, height, concurrency)
+
+        results = []
+        begin = time.monotonic()
+        threads = [threading.Thread(target=job_worker, args=(device, pool, codec_type, width, height, frames, jobs // concurrency, results))
+                   for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - begin
+
+        print(f"device {device:02x}: {mode:6s} {len(results)} clips of {len(frames)} frames, {len(results) / elapsed:.1f} clips/s, "
+              f"{sum(results)} frames decoded")
+        if pool:
+            pool.destroy()
+
+
+if __name__ == '__main__':
+    print(f"============== sample vdec pool started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='benchmark short clip jobs: create and destroy a vdec group per clip vs leasing warm groups from pool',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.h264 --width 1920 --height 1080 h264 --jobs 100 --clip-frames 30'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file, starts with IDR')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--jobs', type=int, default=100, help='number of clips to decode')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent jobs, which is the number of warm groups')
+    parser.add_argument('--clip-frames', type=int, default=30, help='frames of each clip from the head of input')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VDEC, max_vdec_grp=max(32, args.concurrency))
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, args.jobs, max(1, args.concurrency), args.clip_frames)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample vdec pool exited ==============")
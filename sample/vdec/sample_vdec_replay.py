@@ -0,0 +1,163 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VDEC
+from axclite.axclite_auto_vdec import AxcliteAutoVdec
+from axclite.axclite_vdec_hub import AxcliteVdecHub
+from axclite.axclite_observer import AxcliteObserver
+from vdec.simple_annexb_split import SimpleAnnexbSplit
+from vdec.simple_container_demux import SimpleContainerDemux
+from vdec.simple_pacer import SimplePtsPacer
+
+
+class CountObserver(AxcliteObserver):
+    def __init__(self):
+        self.count = 0
+
+    def update(self, data):
+        self.count += 1
+
+
+def open_streamer(device, pacer, input_file, codec, fps):
+    if os.path.splitext(input_file)[1].lower() in ['.mp4', '.mov', '.m4v', '.mkv']:
+        streamer = SimpleContainerDemux(device, pacer)
+        if not streamer.open(input_file, realtime=True):
+            return None, None
+        return streamer, streamer.codec
+
+    streamer = SimpleAnnexbSplit(device, pacer)
+    if not streamer.open(input_file, codec, fps):
+        return None, None
+    return streamer, codec
+
+
+def main(device: int, inputs: list, codec: str, fps: int, stream_num: int, workers: int, interval: int):
+    """
+    replay stream_num streams at real-time rate, inputs are assigned round robin.
+    All streams are paced by one SimplePtsPacer and decoded frames are received by one AxcliteVdecHub.
+    """
+    pacer = SimplePtsPacer(device, workers)
+    hub = AxcliteVdecHub(device)
+    streamers = []
+    decoders = []
+    observers = []
+
+    for i in range(stream_num):
+        streamer, stream_codec = open_streamer(device, pacer, inputs[i % len(inputs)], codec, fps)
+        if streamer is None:
+            break
+
+        attr = {
+            'grp_attr': {
+                'codec_type': axcl.PT_H264 if stream_codec == 'h264' else axcl.PT_H265,
+                'output_order': axcl.AX_VDEC_OUTPUT_ORDER_DEC,
+                'display_mode': axcl.AX_VDEC_DISPLAY_MODE_PREVIEW
+            },
+            'chn_attr': [
+                {'enable': False},
+                {'enable': True, 'link': False, 'output_fifo_depth': 4},
+                {'enable': False}
+            ]
+        }
+        decoder = AxcliteAutoVdec(hub)
+        observer = CountObserver()
+        decoder.register_observer(1, observer)
+        decoder.create(attr, device)
+        decoder.start(recv=False)
+        streamers.append(streamer)
+        decoders.append(decoder)
+        observers.append(observer)
+
+    if len(streamers) == stream_num:
+        def on_recv_nal_frame(seq_num, frame, pts, decoder):
+            decoder.send_stream(frame, pts)
+
+        hub.start()
+        pacer.start()
+        begin = time.monotonic()
+        for streamer, decoder in zip(streamers, decoders):
+            streamer.start(on_recv_nal_frame, decoder)
+
+        # report until all streams are sent
+        while not all(streamer.paced.done.is_set() for streamer in streamers):
+            time.sleep(interval)
+            elapsed = time.monotonic() - begin
+            print(f"device {device:02x}: {elapsed:.0f}s, decoded {sum(o.count for o in observers) / elapsed:.1f} fps, "
+                  f"lateness {pacer.statistics()}")
+
+        for streamer in streamers:
+            streamer.join()
+
+        worst = sorted((streamer.paced.statistics() for streamer in streamers), key=lambda v: -v['max_ms'])
+        print(f"device {device:02x}: {stream_num} streams, lateness {pacer.statistics()}")
+        for stats in worst[:5]:
+            print(f"device {device:02x}: worst {stats}")
+
+        pacer.stop()
+        hub.stop()
+
+    for decoder in decoders:
+        decoder.stop()
+        decoder.destroy()
+
+    for streamer in streamers:
+        streamer.close()
+
+
+if __name__ == '__main__':
+    print(f"============== sample vdec replay started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='load test: replay many recorded streams at real-time rate and report pacing lateness',
+        epilog=f'eg: {os.path.basename(__file__)} -i cam0.h264 cam1.mp4 h264 --fps 25 --streams 64'
+    )
+    parser.add_argument('-i', '--input', type=str, nargs='+', required=True, help='raw annexB h264 or h265 stream files, or mp4, mov, mkv files')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='codec of raw annexB stream files')
+    parser.add_argument('--fps', type=int, default=30, help='frame rate of raw annexB stream files')
+    parser.add_argument('--streams', type=int, default=16, help='number of streams to replay')
+    parser.add_argument('--workers', type=int, default=4, help='delivery threads of pacer')
+    parser.add_argument('--interval', type=int, default=5, help='report interval in seconds')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VDEC, max_vdec_grp=max(32, args.streams))
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, max(1, args.fps), args.streams, args.workers, args.interval)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample vdec replay exited ==============")
@@ -11,33 +11,85 @@
 # ******************************************************************************
 import os
 import time
-import copy
 from queue import Queue
 import threading
 from axclite.axclite_context import AxcliteContext
+from axclite.axclite_utils import axclite_annexb_iter
+from vdec.simple_pacer import SimplePtsPacer
 
 
-def find_start_codes(data):
-    start_codes = []
+def find_start_codes(data, start=0):
+    """
+    find offsets of start codes (00 00 01 or 00 00 00 01) in data from start
+    """
+    return [pos for pos, _ in axclite_annexb_iter(data, start)]
+
+
+def start_code_len(nal):
+    return 4 if nal[2] == 0x00 else 3
 
-    length = len(data)
-    if length <= 4:
-        return start_codes
 
-    i = 0
-    while i < length - 3:
-        if data[i] == 0x00 and data[i + 1] == 0x00:
-            if data[i + 2] == 0x01:
-                start_codes.append(i)
-                i += 3
-                continue
-            elif data[i + 2] == 0x00 and data[i + 3] == 0x01:
-                start_codes.append(i)
-                i += 4
-                continue
-        i += 1
+class AnnexbNalScanner(object):
+    """
+    Incremental annexB NAL scanner.
+    Each chunk is scanned once from the previous position, complete NAL units are returned as zero-copy
+    memoryviews of one writable block per chunk, so they can be sent to VDEC by address directly.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        # buffer[0] is the start code of pending NAL if sc_len > 0
+        self.sc_len = 0
+        self.scan_pos = 0
+
+    def reset(self):
+        self.buffer = bytearray()
+        self.sc_len = 0
+        self.scan_pos = 0
+
+    def feed(self, chunk) -> list:
+        self.buffer += chunk
+        # back off 3 bytes in case of start code across two chunks
+        start = max(self.scan_pos - 3, self.sc_len)
+        self.scan_pos = len(self.buffer)
+
+        start_codes = find_start_codes(self.buffer, start)
+        if not start_codes:
+            if self.sc_len == 0:
+                # drop leading garbage but keep tail bytes which may be a partial start code
+                del self.buffer[:-4]
+                self.scan_pos = len(self.buffer)
+            return []
+
+        if self.sc_len > 0:
+            start_codes.insert(0, 0)
+        if len(start_codes) < 2:
+            self._compact(start_codes[0])
+            return []
+
+        first = start_codes[0]
+        last = start_codes[-1]
+        block = memoryview(self.buffer[first:last])
+        nals = [block[start_codes[i] - first:start_codes[i + 1] - first] for i in range(len(start_codes) - 1)]
+        self._compact(last)
+        return nals
+
+    def flush(self):
+        """
+        return the last NAL at eof
+        """
+        nal = None
+        if self.sc_len > 0 and len(self.buffer) > self.sc_len:
+            nal = memoryview(self.buffer)
+        self.buffer = bytearray()
+        self.sc_len = 0
+        self.scan_pos = 0
+        return nal
 
-    return start_codes
+    def _compact(self, pos):
+        if pos > 0:
+            del self.buffer[:pos]
+            self.scan_pos -= pos
+        self.sc_len = start_code_len(self.buffer)
 
 
 class SimpleAnnexbSplit(object):
@@ -50,8 +102,10 @@ class SimpleAnnexbSplit(object):
         1. This is just an example and should not be used in official applications.
            It is recommended to use av (https://pyav.org/) or FFmpeg instead.
         2. For input frame mode, SPS, PPS (or VPS) should be combined with the IDR frame before being sent to the VDEC.
+        3. If fps > 0, frames are released at 1/fps intervals in decode order by a SimplePtsPacer, which can be
+           shared by many splitters and should be started by the caller. A private pacer is used if none is given.
     """
-    def __init__(self, device: int):
+    def __init__(self, device: int, pacer: SimplePtsPacer = None):
         self.queue = Queue()
         self.h264 = False
         self.chunk_size = 8192
@@ -62,19 +116,21 @@ class SimpleAnnexbSplit(object):
         self.pps = None
         self.vps = None
         self.seq_num = 0
-        self.next_tick = 0
         self.interval = 0
         self.pts = 0
         self.callback = None
         self.userdata = None
         self.device = device
         self.stop = True
+        self.pacer = pacer
+        self.own_pacer = False
+        self.paced = None
 
     def open(self, file_path, codec='h264', fps=30, chunk_size=0x10000):
         """
         :param file_path: raw h264 or h265 stream file in annex B format, such as 00 00 00 01 27 ...
         :param codec: 'h264' or 'h265'
-        :param fps: delay 1/fps seconds between two frames to simulate frame control
+        :param fps: release frames at 1/fps seconds interval to simulate frame control
         :param chunk_size: chunk size to read from file each time
         :return: True success, False failure
         """
@@ -107,17 +163,35 @@ class SimpleAnnexbSplit(object):
         self.vps = b''
         self.queue.queue.clear()
         self.seq_num = 0
-        self.next_tick = 0
+        self.pts = 0
         self.callback = callback
         self.userdata = userdata
         self.split_thread = threading.Thread(target=self.split_worker, name='split_annexb')
-        self.dispatch_thread = threading.Thread(target=self.dispatch_work, name='disp_annexb')
+        if self.interval > 0:
+            # frames are delivered by pacer at their pts instead of dispatch thread
+            if self.pacer is None:
+                self.pacer = SimplePtsPacer(self.device, workers=1)
+                self.own_pacer = True
+                self.pacer.start()
+            self.paced = self.pacer.add(self.on_paced)
+            self.dispatch_thread = None
+        else:
+            self.paced = None
+            self.dispatch_thread = threading.Thread(target=self.dispatch_work, name='disp_annexb')
         self.split_thread.start()
-        self.dispatch_thread.start()
+        if self.dispatch_thread:
+            self.dispatch_thread.start()
 
     def join(self):
         self.split_thread.join()
-        self.dispatch_thread.join()
+        if self.dispatch_thread:
+            self.dispatch_thread.join()
+        if self.paced:
+            self.paced.wait()
+            if self.own_pacer:
+                self.pacer.stop()
+                self.pacer = None
+                self.own_pacer = False
 
     def stop(self):
         self.stop = True
@@ -138,79 +212,47 @@ class SimpleAnnexbSplit(object):
             context.destroy()
             print(f"device {self.device:02x}: dispatch NAL end")
 
+    def on_paced(self, item, userdata):
+        if item is None:
+            self.callback(self.seq_num, None, self.pts, self.userdata)
+            print(f"device {self.device:02x}: dispatch NAL end")
+        else:
+            seq_num, frame, pts = item
+            self.callback(seq_num, frame, pts, self.userdata)
+
     def push(self, frame):
         self.seq_num += 1
 
-        if frame:
-            self.queue.put((self.seq_num, frame))
-
-            """
-            Simulate frame rate control.
-            if now is behind than next, sleep(next - now)
-            if now is forward  to next, do nothing
-
-            # 1          2          3          4          5          6          7  us
-              | interval |
-              |----------|----------|----------|----------|----------|----------|
-                  ^    next2                 next4              ^                  us
-                  ^                                             ^
-                 now2                                          now4                us
-            """
-            if self.interval > 0:
-                now = time.monotonic_ns() // 1000
-                if self.seq_num == 1:
-                    self.next_tick = now + self.interval
-                else:
-                    if now < self.next_tick:
-                        us = self.next_tick - now
-                        time.sleep(us / 1000000)
-                    '''
-                        print(f"seq_num {self.seq_num:05d}: now = {int(now)}, target = {int(self.next_tick)}, sleep = {int(us)}")
-                    else:
-                        print(f"seq_num {self.seq_num:05d}: now = {int(now)}, target = {int(self.next_tick)}, delay = {int(now - self.next_tick)}")
-                    '''
-                    self.next_tick += self.interval
+        if self.paced:
+            if frame:
+                self.pts += self.interval
+                self.pacer.submit(self.paced, self.pts, (self.seq_num, frame, self.pts))
+            else:
+                self.pacer.submit(self.paced, self.pts, None)
         else:
             self.queue.put((self.seq_num, frame))
 
     def split_worker(self):
-        buffer = b''
+        scanner = AnnexbNalScanner()
         while not self.stop:
             chunk = self.f.read(self.chunk_size)
             if not chunk:
                 # eof
-                if buffer:
-                    self.push(buffer)
+                nal = scanner.flush()
+                if nal:
+                    self.joint(nal, start_code_len(nal))
 
                 # stop dispatcher
                 self.push(None)
                 print(f"device {self.device:02x}: reach annexB stream eof")
                 break
 
-            buffer += chunk
-
-            start_codes = find_start_codes(buffer)
-            if len(start_codes) < 2:
-                continue
-
-            end = 0
-            for i in range(len(start_codes) - 1):
-                start = start_codes[i]
-                if buffer[start:start + 4] == b'\x00\x00\x00\x01':
-                    sc_len = 4
-                else:
-                    sc_len = 3
-
-                beg = start
-                end = start_codes[i + 1]
-                nal = buffer[beg:end]
-                if len(nal) > 1:
-                    self.joint(nal, sc_len)
+            for nal in scanner.feed(chunk):
+                if len(nal) > start_code_len(nal):
+                    self.joint(nal, start_code_len(nal))
                 else:
                     raise Exception(f"device {self.device:02x}: invalid frame len {len(nal)}")
 
-            buffer = buffer[end:]
-
     def joint(self, frame, sc_len):
         if self.h264:
             SPS = 7
@@ -227,9 +269,9 @@ class SimpleAnnexbSplit(object):
 
         if self.h264:
             if type == SPS:
-                self.sps = copy.deepcopy(frame)
+                self.sps = bytes(frame)
             elif type == PPS:
-                self.pps = copy.deepcopy(frame)
+                self.pps = bytes(frame)
             elif type == IDR:
                 # joint SPS, PPS and IDR
                 if self.sps and self.pps:
@@ -242,11 +284,11 @@ class SimpleAnnexbSplit(object):
                 self.push(frame)
         else:
             if type == VPS:
-                self.vps = copy.deepcopy(frame)
+                self.vps = bytes(frame)
             elif type == SPS:
-                self.sps = copy.deepcopy(frame)
+                self.sps = bytes(frame)
             elif type == PPS:
-                self.pps = copy.deepcopy(frame)
+                self.pps = bytes(frame)
             elif type == IDR:
                 # joint VPS, SPS, PPS and IDR
                 if self.vps or self.sps or self.pps:
@@ -266,13 +308,36 @@ class SimpleAnnexbSplit(object):
                 self.push(frame)
 
 
+def benchmark_nal_scanner(file_path, chunk_size=0x10000):
+    """
+    measure the NAL scanning throughput in MB/s, file IO is not included
+    """
+    with open(file_path, 'rb') as f:
+        chunks = list(iter(lambda: f.read(chunk_size), b''))
+
+    size = sum(len(chunk) for chunk in chunks)
+    scanner = AnnexbNalScanner()
+    count = 0
+    begin = time.perf_counter()
+    for chunk in chunks:
+        count += len(scanner.feed(chunk))
+    if scanner.flush():
+        count += 1
+    elapsed = time.perf_counter() - begin
+
+    print(f"{file_path}: {size} bytes, {count} NALs, {elapsed:.3f}s, {size / 1048576 / elapsed:.1f} MB/s")
+    return count
+
+
 if __name__ == "__main__":
-    def on_recv_nal_frame(seq_num, frame, pts, userdata):
-        if frame:
-            print(f"seq_num {seq_num}: pts {pts}, len {len(frame)}")
-
-    splitter = SimpleAnnexbSplit()
-    splitter.open('D:/bangkok_30952_1920x1080_30fps_gop60_4Mbps.h264', 'h264', fps=0)
-    splitter.start(on_recv_nal_frame, None)
-    splitter.stop()
-    splitter.close()
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='benchmark of annexB NAL scanner',
+        epilog='eg: (in sample directory) python -m vdec.simple_annexb_split -i input.h265 --chunk 65536'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input raw annexB h264 or h265 stream file')
+    parser.add_argument('--chunk', type=int, default=0x10000, help='chunk size to read from file each time')
+    args = parser.parse_args()
+
+    benchmark_nal_scanner(args.input, args.chunk)
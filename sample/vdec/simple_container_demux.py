@@ -0,0 +1,721 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import heapq
+import mmap
+import os
+import struct
+import threading
+from axclite.axclite_context import AxcliteContext
+from vdec.simple_pacer import SimplePtsPacer
+
+START_CODE = b'\x00\x00\x00\x01'
+
+# ISO BMFF sample entries
+_MP4_CODECS = {b'avc1': 'h264', b'avc3': 'h264', b'hvc1': 'h265', b'hev1': 'h265'}
+
+# matroska codec ids
+_MKV_CODECS = {b'V_MPEG4/ISO/AVC': 'h264', b'V_MPEGH/ISO/HEVC': 'h265'}
+
+# max frames a matroska block may be reordered by, decode time stamps are estimated from pts within it
+MKV_REORDER_DEPTH = 4
+
+# matroska element ids
+MKV_EBML = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_NUMBER = 0xD7
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_CODEC_PRIVATE = 0x63A2
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+MKV_TIMECODE = 0xE7
+MKV_SIMPLE_BLOCK = 0xA3
+MKV_BLOCK_GROUP = 0xA0
+MKV_BLOCK = 0xA1
+MKV_REFERENCE_BLOCK = 0xFB
+
+
+def iter_boxes(buf, start, end):
+    """
+    iterate ISO BMFF boxes in buf[start:end], yield (type, payload start, box end)
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, = struct.unpack_from('>I', buf, pos)
+        box_type = bytes(buf[pos + 4:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                break
+            size, = struct.unpack_from('>Q', buf, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            # truncated box, such as a fragment still being written
+            break
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def find_box(buf, start, end, path):
+    for box_type, payload, box_end in iter_boxes(buf, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            return find_box(buf, payload, box_end, path[1:])
+    return None
+
+
+def read_ebml_id(buf, pos):
+    first = buf[pos]
+    length = 1
+    while length <= 4 and not (first & (0x80 >> (length - 1))):
+        length += 1
+    if length > 4:
+        raise ValueError(f"invalid EBML id at {pos}")
+    return int.from_bytes(buf[pos:pos + length], 'big'), length
+
+
+def read_ebml_size(buf, pos):
+    """
+    :return: (value, length, unknown), unknown is True if all value bits are 1
+    """
+    first = buf[pos]
+    length = 1
+    while length <= 8 and not (first & (0x80 >> (length - 1))):
+        length += 1
+    if length > 8:
+        raise ValueError(f"invalid EBML size at {pos}")
+    value = int.from_bytes(buf[pos:pos + length], 'big') & ((1 << (7 * length)) - 1)
+    return value, length, value == (1 << (7 * length)) - 1
+
+
+def parse_avcc(record):
+    """
+    parse AVCDecoderConfigurationRecord, return (nal_length_size, [sps, pps ...])
+    """
+    nal_length_size = (record[4] & 0x03) + 1
+    param_sets = []
+    pos = 5
+    for n in range(2):
+        # sps count is 5 bits, pps count is 8 bits
+        count = record[pos] & (0x1F if n == 0 else 0xFF)
+        pos += 1
+        for _ in range(count):
+            size, = struct.unpack_from('>H', record, pos)
+            param_sets.append(bytes(record[pos + 2:pos + 2 + size]))
+            pos += 2 + size
+    return nal_length_size, param_sets
+
+
+def parse_hvcc(record):
+    """
+    parse HEVCDecoderConfigurationRecord, return (nal_length_size, [vps, sps, pps ...])
+    """
+    nal_length_size = (record[21] & 0x03) + 1
+    param_sets = []
+    num_arrays = record[22]
+    pos = 23
+    for _ in range(num_arrays):
+        count, = struct.unpack_from('>H', record, pos + 1)
+        pos += 3
+        for _ in range(count):
+            size, = struct.unpack_from('>H', record, pos)
+            param_sets.append(bytes(record[pos + 2:pos + 2 + size]))
+            pos += 2 + size
+    return nal_length_size, param_sets
+
+
+class SimpleContainerDemux(object):
+    """
+     Simple streaming demuxer of MP4/MOV (including fragmented MP4) and Matroska H.264/H.265 video tracks:
+        1. File is read through mmap, samples are located by the sample table or movie fragments (moof),
+           Matroska blocks by walking the clusters.
+        2. AVCC/HVCC length prefixed samples are converted to annexB frames. SPS, PPS (and VPS) of the codec
+           configuration record are injected before IDR (IRAP) frames which have no inband parameter sets.
+        3. Frames are delivered in decode order with the presentation time stamp in microseconds. Decode time
+           stamps are taken from the container for MP4; Matroska has none, the sorted pts of a window of
+           MKV_REORDER_DEPTH frames are used instead.
+
+        Note:
+        1. Only the first video track is demuxed. Edit lists and laced matroska blocks are not supported.
+        2. The callback has the same signature as SimpleAnnexbSplit, so it can feed AxcliteVdec.send_stream directly.
+        3. In realtime mode frames are released at their dts by a SimplePtsPacer, which can be shared by many
+           demuxers and should be started by the caller. A private pacer is used if none is given.
+    """
+    def __init__(self, device: int, pacer: SimplePtsPacer = None):
+        self.device = device
+        self.f = None
+        self.mm = None
+        self.format = None
+        self.codec = None
+        self.width = 0
+        self.height = 0
+        self.timescale = 1000
+        self.track_id = 0
+        self.nal_length_size = 4
+        self.param_sets = b''
+        self.samples = []
+        self.trex = {}
+        self.mkv_timecode_scale = 1000000
+        self.mkv_cluster_pos = 0
+        self.realtime = False
+        self.running = False
+        self.thread = None
+        self.callback = None
+        self.userdata = None
+        self.pacer = pacer
+        self.own_pacer = False
+        self.paced = None
+        self.seq_num = 0
+
+    def open(self, file_path, realtime=False):
+        """
+        :param file_path: mp4, mov or mkv file
+        :param realtime: deliver frames paced by dts, otherwise as fast as possible
+        :return: True success, False failure
+        """
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            print(f"{file_path} not exist or empty file")
+            return False
+
+        try:
+            self.f = open(file_path, 'rb')
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception as e:
+            print(f"open {file_path} fail, {e}")
+            self.close()
+            return False
+
+        self.realtime = realtime
+        try:
+            if self.mm[:4] == b'\x1a\x45\xdf\xa3':
+                self.format = 'mkv'
+                self._open_mkv()
+            else:
+                self.format = 'mp4'
+                self._open_mp4()
+        except (ValueError, IndexError, struct.error) as e:
+            print(f"parse {file_path} fail, {e}")
+            self.codec = None
+
+        if self.codec is None:
+            print(f"{file_path}: no h264 or h265 track found")
+            self.close()
+            return False
+
+        print(f"{file_path}: {self.format} {self.codec} {self.width}x{self.height}")
+        return True
+
+    def close(self):
+        if self.mm:
+            self.mm.close()
+            self.mm = None
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    def start(self, callback, userdata):
+        """
+        :param callback: callback(seq_num, frame, pts, userdata), frame is None at end of stream
+        """
+        self.callback = callback
+        self.userdata = userdata
+        self.running = True
+        self.paced = None
+        if self.realtime:
+            if self.pacer is None:
+                self.pacer = SimplePtsPacer(self.device, workers=1)
+                self.own_pacer = True
+                self.pacer.start()
+            self.paced = self.pacer.add(self.on_paced)
+        self.thread = threading.Thread(target=self.demux_worker, name='demux')
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+        if self.paced:
+            self.paced.wait()
+            if self.own_pacer:
+                self.pacer.stop()
+                self.pacer = None
+                self.own_pacer = False
+
+    def stop(self):
+        self.running = False
+
+    def demux_worker(self):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        seq_num = 0
+        try:
+            for frame, pts, dts in self.frames():
+                if not self.running:
+                    break
+
+                seq_num += 1
+                if self.paced:
+                    # paced in decode order, pts is reordered by B frames
+                    if not self.pacer.submit(self.paced, dts, (seq_num, frame, pts)):
+                        break
+                else:
+                    self.callback(seq_num, frame, pts, self.userdata)
+
+            self.seq_num = seq_num + 1
+            if self.paced:
+                self.pacer.submit(self.paced, 0, None)
+            else:
+                self.callback(self.seq_num, None, 0, self.userdata)
+        finally:
+            context.destroy()
+            print(f"device {self.device:02x}: demux end, {seq_num} frames")
+
+    def on_paced(self, item, userdata):
+        if item is None:
+            self.callback(self.seq_num, None, 0, self.userdata)
+        else:
+            seq_num, frame, pts = item
+            self.callback(seq_num, frame, pts, self.userdata)
+
+    def frames(self):
+        """
+        generator of (annexB frame, pts, dts) in decode order, time stamps are in microseconds
+        """
+        if self.format == 'mkv':
+            samples = self._mkv_samples()
+        else:
+            samples = self._mp4_samples()
+
+        for offset, size, pts, dts in samples:
+            frame = self._to_annexb(memoryview(self.mm)[offset:offset + size])
+            if frame:
+                yield frame, pts, dts
+
+    def _is_irap(self, head):
+        if self.codec == 'h264':
+            return (head & 0x1F) == 5
+        return 16 <= ((head >> 1) & 0x3F) <= 23
+
+    def _is_param_set(self, head):
+        if self.codec == 'h264':
+            return (head & 0x1F) in (7, 8)
+        return 32 <= ((head >> 1) & 0x3F) <= 34
+
+    def _to_annexb(self, sample):
+        parts = []
+        irap = False
+        inband = False
+        pos = 0
+        n = len(sample)
+        length_size = self.nal_length_size
+        while pos + length_size <= n:
+            size = int.from_bytes(sample[pos:pos + length_size], 'big')
+            pos += length_size
+            if size == 0 or pos + size > n:
+                break
+
+            head = sample[pos]
+            irap = irap or self._is_irap(head)
+            inband = inband or self._is_param_set(head)
+            parts.append(START_CODE)
+            parts.append(sample[pos:pos + size])
+            pos += size
+
+        if irap and not inband:
+            parts.insert(0, self.param_sets)
+
+        # writable, so it can be sent by address without copy
+        return bytearray().join(parts)
+
+    def _set_config(self, codec, record):
+        if codec == 'h264':
+            self.nal_length_size, param_sets = parse_avcc(record)
+        else:
+            self.nal_length_size, param_sets = parse_hvcc(record)
+        self.param_sets = b''.join(START_CODE + ps for ps in param_sets)
+        self.codec = codec
+
+    def _open_mp4(self):
+        mm = self.mm
+        moov = find_box(mm, 0, len(mm), [b'moov'])
+        if moov is None:
+            raise ValueError("moov not found")
+
+        for box_type, payload, box_end in iter_boxes(mm, moov[0], moov[1]):
+            if box_type == b'trak' and self.codec is None:
+                self._parse_trak(payload, box_end)
+            elif box_type == b'mvex':
+                for trex_type, trex, _ in iter_boxes(mm, payload, box_end):
+                    if trex_type == b'trex':
+                        track_id, _, duration, size, flags = struct.unpack_from('>5I', mm, trex + 4)
+                        self.trex[track_id] = (duration, size, flags)
+
+    def _parse_trak(self, start, end):
+        mm = self.mm
+        hdlr = find_box(mm, start, end, [b'mdia', b'hdlr'])
+        if hdlr is None or mm[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+            return
+
+        stbl = find_box(mm, start, end, [b'mdia', b'minf', b'stbl'])
+        stsd = find_box(mm, stbl[0], stbl[1], [b'stsd']) if stbl else None
+        if stsd is None:
+            return
+
+        for entry_type, entry, entry_end in iter_boxes(mm, stsd[0] + 8, stsd[1]):
+            codec = _MP4_CODECS.get(entry_type)
+            if codec is None:
+                continue
+            config = find_box(mm, entry + 78, entry_end, [b'avcC' if codec == 'h264' else b'hvcC'])
+            if config is None:
+                continue
+            self._set_config(codec, memoryview(mm)[config[0]:config[1]])
+            self.width, self.height = struct.unpack_from('>HH', mm, entry + 24)
+            break
+        else:
+            return
+
+        tkhd = find_box(mm, start, end, [b'tkhd'])
+        self.track_id, = struct.unpack_from('>I', mm, tkhd[0] + (20 if mm[tkhd[0]] == 1 else 12))
+        mdhd = find_box(mm, start, end, [b'mdia', b'mdhd'])
+        self.timescale, = struct.unpack_from('>I', mm, mdhd[0] + (20 if mm[mdhd[0]] == 1 else 12))
+        self.samples = self._parse_stbl(stbl[0], stbl[1])
+
+    def _parse_stbl(self, start, end):
+        mm = self.mm
+        boxes = {box_type: (payload, box_end) for box_type, payload, box_end in iter_boxes(mm, start, end)}
+
+        if b'stsz' not in boxes or b'stts' not in boxes or b'stsc' not in boxes:
+            return []
+
+        # sample sizes
+        payload = boxes[b'stsz'][0]
+        sample_size, count = struct.unpack_from('>II', mm, payload + 4)
+        if count == 0:
+            return []
+        sizes = [sample_size] * count if sample_size else list(struct.unpack_from(f'>{count}I', mm, payload + 12))
+
+        # chunk offsets
+        if b'co64' in boxes:
+            payload = boxes[b'co64'][0]
+            chunk_count, = struct.unpack_from('>I', mm, payload + 4)
+            chunks = struct.unpack_from(f'>{chunk_count}Q', mm, payload + 8)
+        else:
+            payload = boxes[b'stco'][0]
+            chunk_count, = struct.unpack_from('>I', mm, payload + 4)
+            chunks = struct.unpack_from(f'>{chunk_count}I', mm, payload + 8)
+
+        # sample to chunk
+        payload = boxes[b'stsc'][0]
+        entry_count, = struct.unpack_from('>I', mm, payload + 4)
+        stsc = struct.unpack_from(f'>{entry_count * 3}I', mm, payload + 8)
+        offsets = []
+        for i in range(entry_count):
+            first_chunk = stsc[i * 3] - 1
+            last_chunk = stsc[(i + 1) * 3] - 1 if i + 1 < entry_count else chunk_count
+            per_chunk = stsc[i * 3 + 1]
+            for chunk in range(first_chunk, last_chunk):
+                offset = chunks[chunk]
+                for _ in range(per_chunk):
+                    if len(offsets) == count:
+                        break
+                    offsets.append(offset)
+                    offset += sizes[len(offsets) - 1]
+
+        # decode time
+        payload = boxes[b'stts'][0]
+        entry_count, = struct.unpack_from('>I', mm, payload + 4)
+        stts = struct.unpack_from(f'>{entry_count * 2}I', mm, payload + 8)
+        dts = []
+        t = 0
+        for i in range(entry_count):
+            for _ in range(stts[i * 2]):
+                dts.append(t)
+                t += stts[i * 2 + 1]
+
+        # composition offsets
+        cts = [0] * count
+        if b'ctts' in boxes:
+            payload = boxes[b'ctts'][0]
+            fmt = 'i' if mm[payload] == 1 else 'I'
+            entry_count, = struct.unpack_from('>I', mm, payload + 4)
+            ctts = struct.unpack_from(f'>{entry_count * 2}{fmt}', mm, payload + 8)
+            k = 0
+            for i in range(entry_count):
+                for _ in range(ctts[i * 2]):
+                    if k < count:
+                        cts[k] = ctts[i * 2 + 1]
+                        k += 1
+
+        count = min(count, len(offsets), len(dts))
+        return [(offsets[i], sizes[i], (dts[i] + cts[i]) * 1000000 // self.timescale, dts[i] * 1000000 // self.timescale)
+                for i in range(count)]
+
+    def _mp4_samples(self):
+        yield from self.samples
+
+        # movie fragments
+        mm = self.mm
+        dts = 0
+        for box_type, payload, box_end in iter_boxes(mm, 0, len(mm)):
+            if box_type != b'moof':
+                continue
+            moof = payload - 8
+            data_end = None
+            for traf_type, traf, traf_end in iter_boxes(mm, payload, box_end):
+                if traf_type == b'traf':
+                    samples, dts, data_end = self._parse_traf(moof, traf, traf_end, dts, data_end)
+                    yield from samples
+
+    def _parse_traf(self, moof, start, end, dts, data_end):
+        """
+        :param data_end: end of sample data of the previous traf in the moof, None for the first traf
+        :return: (samples, dts, data_end), trafs of other tracks are walked for their data end only
+        """
+        mm = self.mm
+        tfhd = find_box(mm, start, end, [b'tfhd'])
+        if tfhd is None:
+            return [], dts, data_end
+
+        pos = tfhd[0]
+        flags = int.from_bytes(mm[pos + 1:pos + 4], 'big')
+        track_id, = struct.unpack_from('>I', mm, pos + 4)
+        own = track_id == self.track_id
+
+        default_duration, default_size, default_flags = self.trex.get(track_id, (0, 0, 0))
+        pos += 8
+        if flags & 0x01:
+            # base-data-offset-present
+            base, = struct.unpack_from('>Q', mm, pos)
+            pos += 8
+        elif flags & 0x020000 or data_end is None:
+            # default-base-is-moof, which is also the default of the first traf
+            base = moof
+        else:
+            # data of this traf follows the data of the previous traf
+            base = data_end
+        if flags & 0x02:
+            pos += 4
+        if flags & 0x08:
+            default_duration, = struct.unpack_from('>I', mm, pos)
+            pos += 4
+        if flags & 0x10:
+            default_size, = struct.unpack_from('>I', mm, pos)
+            pos += 4
+        if flags & 0x20:
+            default_flags, = struct.unpack_from('>I', mm, pos)
+
+        samples = []
+        data_pos = base
+        decode_time = dts if own else 0
+        for box_type, payload, _ in iter_boxes(mm, start, end):
+            if box_type == b'tfdt':
+                fmt = '>Q' if mm[payload] == 1 else '>I'
+                decode_time, = struct.unpack_from(fmt, mm, payload + 4)
+            elif box_type == b'trun':
+                version = mm[payload]
+                trun_flags = int.from_bytes(mm[payload + 1:payload + 4], 'big')
+                count, = struct.unpack_from('>I', mm, payload + 4)
+                pos = payload + 8
+                if trun_flags & 0x01:
+                    data_offset, = struct.unpack_from('>i', mm, pos)
+                    data_pos = base + data_offset
+                    pos += 4
+                if trun_flags & 0x04:
+                    pos += 4
+                for _ in range(count):
+                    duration = default_duration
+                    size = default_size
+                    cto = 0
+                    if trun_flags & 0x100:
+                        duration, = struct.unpack_from('>I', mm, pos)
+                        pos += 4
+                    if trun_flags & 0x200:
+                        size, = struct.unpack_from('>I', mm, pos)
+                        pos += 4
+                    if trun_flags & 0x400:
+                        pos += 4
+                    if trun_flags & 0x800:
+                        cto, = struct.unpack_from('>i' if version == 1 else '>I', mm, pos)
+                        pos += 4
+                    if own:
+                        samples.append((data_pos, size, (decode_time + cto) * 1000000 // self.timescale,
+                                        decode_time * 1000000 // self.timescale))
+                    data_pos += size
+                    decode_time += duration
+
+        return samples, decode_time if own else dts, data_pos
+
+    def _open_mkv(self):
+        mm = self.mm
+        end = len(mm)
+        pos = 0
+        track_found = False
+        while pos < end:
+            eid, id_len = read_ebml_id(mm, pos)
+            size, size_len, unknown = read_ebml_size(mm, pos + id_len)
+            data = pos + id_len + size_len
+            if eid == MKV_SEGMENT:
+                # enter segment
+                pos = data
+                continue
+            if eid == MKV_CLUSTER:
+                break
+            if unknown:
+                raise ValueError(f"unknown size of element 0x{eid:x}")
+
+            if eid == MKV_INFO:
+                for child, child_data, child_size in self._mkv_children(data, data + size):
+                    if child == MKV_TIMECODE_SCALE:
+                        self.mkv_timecode_scale = int.from_bytes(mm[child_data:child_data + child_size], 'big')
+            elif eid == MKV_TRACKS and not track_found:
+                for child, child_data, child_size in self._mkv_children(data, data + size):
+                    if child == MKV_TRACK_ENTRY and self._parse_mkv_track(child_data, child_data + child_size):
+                        track_found = True
+                        break
+            pos = data + size
+
+        self.mkv_cluster_pos = pos
+
+    def _mkv_children(self, start, end):
+        pos = start
+        while pos < end:
+            eid, id_len = read_ebml_id(self.mm, pos)
+            size, size_len, _ = read_ebml_size(self.mm, pos + id_len)
+            data = pos + id_len + size_len
+            yield eid, data, size
+            pos = data + size
+
+    def _parse_mkv_track(self, start, end):
+        mm = self.mm
+        number = 0
+        track_type = 0
+        codec = None
+        private = None
+        for eid, data, size in self._mkv_children(start, end):
+            if eid == MKV_TRACK_NUMBER:
+                number = int.from_bytes(mm[data:data + size], 'big')
+            elif eid == MKV_TRACK_TYPE:
+                track_type = int.from_bytes(mm[data:data + size], 'big')
+            elif eid == MKV_CODEC_ID:
+                codec = _MKV_CODECS.get(bytes(mm[data:data + size]).rstrip(b'\x00'))
+            elif eid == MKV_CODEC_PRIVATE:
+                private = memoryview(mm)[data:data + size]
+            elif eid == MKV_VIDEO:
+                for child, child_data, child_size in self._mkv_children(data, data + size):
+                    if child == MKV_PIXEL_WIDTH:
+                        self.width = int.from_bytes(mm[child_data:child_data + child_size], 'big')
+                    elif child == MKV_PIXEL_HEIGHT:
+                        self.height = int.from_bytes(mm[child_data:child_data + child_size], 'big')
+
+        if track_type != 1 or codec is None or private is None:
+            return False
+
+        self.track_id = number
+        self._set_config(codec, private)
+        return True
+
+    def _mkv_samples(self):
+        """
+        blocks with dts, the smallest pts of a window of MKV_REORDER_DEPTH + 1 blocks in decode order is the dts of
+        the oldest block, which equals the real dts of a constant frame rate stream reordered within the window
+        """
+        window = []
+        heap = []
+        for offset, size, pts in self._mkv_blocks():
+            window.append((offset, size, pts))
+            heapq.heappush(heap, pts)
+            if len(window) > MKV_REORDER_DEPTH:
+                offset, size, pts = window.pop(0)
+                yield offset, size, pts, heapq.heappop(heap)
+        for offset, size, pts in window:
+            yield offset, size, pts, heapq.heappop(heap)
+
+    def _mkv_blocks(self):
+        mm = self.mm
+        end = len(mm)
+        pos = self.mkv_cluster_pos
+        cluster_timecode = 0
+        while pos < end:
+            try:
+                eid, id_len = read_ebml_id(mm, pos)
+                size, size_len, unknown = read_ebml_size(mm, pos + id_len)
+            except (ValueError, IndexError):
+                break
+            data = pos + id_len + size_len
+            if eid == MKV_CLUSTER or eid == MKV_SEGMENT:
+                # enter cluster, which may have unknown size in live stream
+                pos = data
+                continue
+            if unknown or data + size > end:
+                break
+
+            if eid == MKV_TIMECODE:
+                cluster_timecode = int.from_bytes(mm[data:data + size], 'big')
+            elif eid == MKV_SIMPLE_BLOCK:
+                sample = self._parse_mkv_block(data, size, cluster_timecode)
+                if sample:
+                    yield sample
+            elif eid == MKV_BLOCK_GROUP:
+                for child, child_data, child_size in self._mkv_children(data, data + size):
+                    if child == MKV_BLOCK:
+                        sample = self._parse_mkv_block(child_data, child_size, cluster_timecode)
+                        if sample:
+                            yield sample
+            pos = data + size
+
+    def _parse_mkv_block(self, start, size, cluster_timecode):
+        mm = self.mm
+        track, track_len, _ = read_ebml_size(mm, start)
+        if track != self.track_id:
+            return None
+
+        timecode, flags = struct.unpack_from('>hB', mm, start + track_len)
+        if flags & 0x06:
+            print(f"device {self.device:02x}: laced block is not supported, skipped")
+            return None
+
+        header = track_len + 3
+        pts = (cluster_timecode + timecode) * self.mkv_timecode_scale // 1000
+        return start + header, size - header, pts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='dump frames of h264/h265 track in mp4, mov or mkv file',
+        epilog='eg: (in sample directory) python -m vdec.simple_container_demux -i input.mp4 -o output.h264'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input mp4, mov or mkv file')
+    parser.add_argument('-o', '--output', type=str, default=None, help='output raw annexB stream file')
+    args = parser.parse_args()
+
+    demux = SimpleContainerDemux(0)
+    if demux.open(args.input):
+        out = open(args.output, 'wb') if args.output else None
+        count = 0
+        for frame, pts, dts in demux.frames():
+            count += 1
+            if out:
+                out.write(frame)
+        if out:
+            out.close()
+        print(f"{args.input}: {count} frames")
+        demux.close()
@@ -0,0 +1,239 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from queue import Queue
+from axclite.axclite_context import AxcliteContext
+
+
+class SimplePacedStream(object):
+    """
+    stream of SimplePtsPacer, created by SimplePtsPacer.add
+    """
+    def __init__(self, index, callback, userdata, max_pending):
+        self.index = index
+        self.callback = callback
+        self.userdata = userdata
+        self.pending = threading.Semaphore(max_pending)
+        self.done = threading.Event()
+        self.origin = None
+        self.last_pts = 0
+        self.last_deadline = 0
+        self.frames = 0
+        self.late = 0
+        self.lateness_sum = 0
+        self.lateness_max = 0
+
+    def wait(self, timeout=None) -> bool:
+        """
+        wait until end of stream is delivered
+        """
+        return self.done.wait(timeout)
+
+    def statistics(self):
+        return {'stream': self.index, 'frames': self.frames, 'late': self.late,
+                'mean_ms': self.lateness_sum / self.frames / 1000 if self.frames else 0,
+                'max_ms': self.lateness_max / 1000}
+
+
+class SimplePtsPacer(object):
+    """
+    Release frames of many streams at their time stamp deadlines by one timer thread instead of a sleep per frame
+    in each stream thread.
+
+    Frames are submitted in decode order with a decode order time stamp, such as the dts of a container or
+    the frame interval of an elementary stream, pts reordered by B frames would hold a P frame until its later
+    pts and release the B frames behind it in a burst. The first time stamp of a stream is mapped to the time it
+    is submitted, later frames are due at the same offset from it. Deadlines never go backwards in a stream. Due frames are delivered by worker threads, stream index % workers,
+    so a callback blocked in send_stream delays its own worker only.
+
+    Lateness is the time from deadline to callback, it is counted per stream and percentiles of the last
+    frames of all streams are reported by statistics().
+    """
+    def __init__(self, device, workers=4, max_pending=16, late_threshold=5000, history=100000):
+        """
+        :param workers: delivery threads
+        :param max_pending: max frames of one stream waiting in pacer, submit blocks above it
+        :param late_threshold: frames delivered later than it in microseconds are counted as late
+        :param history: number of the latest lateness samples kept for percentiles
+        """
+        self.device = device
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.late_threshold = late_threshold
+        self.heap = []
+        self.counter = itertools.count()
+        self.streams = 0
+        self.lateness = deque(maxlen=history)
+        self.running = False
+        self.timer_thread = None
+        self.worker_threads = []
+        self.queues = []
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.queues = [Queue() for _ in range(self.workers)]
+        self.worker_threads = []
+        for i in range(self.workers):
+            t = threading.Thread(target=self.deliver_worker, args=(i,), name=f"pacer_{i}")
+            self.worker_threads.append(t)
+            t.start()
+
+        self.timer_thread = threading.Thread(target=self.timer_worker, name='pacer_timer')
+        self.timer_thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.timer_thread.join()
+        for t in self.worker_threads:
+            t.join()
+        self.worker_threads.clear()
+
+        # frames left in heap are never delivered
+        for _, _, stream, _ in self.heap:
+            stream.done.set()
+        self.heap.clear()
+
+    def add(self, callback, userdata=None) -> SimplePacedStream:
+        """
+        :param callback: callback(item, userdata), item is None at end of stream
+        """
+        with self._lock:
+            stream = SimplePacedStream(self.streams, callback, userdata, self.max_pending)
+            self.streams += 1
+        return stream
+
+    def submit(self, stream: SimplePacedStream, pts, item) -> bool:
+        """
+        queue item to be delivered at pts, or end of stream if item is None, which is delivered right after
+        the last frame. Blocks while max_pending frames of the stream are waiting.
+        :param pts: decode order time stamp (dts) in microseconds
+        :return: False if pacer is stopped
+        """
+        while not stream.pending.acquire(timeout=0.1):
+            if not self.running:
+                self._abort(stream, item)
+                return False
+
+        now = time.monotonic_ns() // 1000
+        if item is None:
+            deadline = stream.last_deadline
+        else:
+            if stream.origin is None or pts < stream.last_pts - 1000000:
+                # first frame, or pts is restarted such as looped file
+                stream.origin = max(now, stream.last_deadline) - pts
+            deadline = max(stream.origin + pts, stream.last_deadline)
+            stream.last_pts = pts
+        stream.last_deadline = deadline
+
+        with self._cond:
+            if not self.running:
+                stream.pending.release()
+                self._abort(stream, item)
+                return False
+            seq = next(self.counter)
+            heapq.heappush(self.heap, (deadline, seq, stream, item))
+            if self.heap[0][1] == seq:
+                # new earliest deadline
+                self._cond.notify()
+        return True
+
+    @staticmethod
+    def _abort(stream, item):
+        if item is None:
+            # nothing will be delivered, do not block stream.wait
+            stream.done.set()
+
+    def timer_worker(self):
+        while True:
+            with self._cond:
+                if not self.running:
+                    break
+
+                if not self.heap:
+                    self._cond.wait()
+                    continue
+
+                delay = self.heap[0][0] - time.monotonic_ns() // 1000
+                if delay > 0:
+                    self._cond.wait(delay / 1000000)
+                    continue
+
+                deadline, _, stream, item = heapq.heappop(self.heap)
+
+            self.queues[stream.index % self.workers].put((deadline, stream, item))
+
+        # wake up workers
+        for queue in self.queues:
+            queue.put(None)
+
+    def deliver_worker(self, index):
+        context = AxcliteContext()
+        context.create(self.device)
+
+        queue = self.queues[index]
+        while True:
+            job = queue.get()
+            if job is None:
+                break
+
+            deadline, stream, item = job
+            if item is not None:
+                lateness = max(0, time.monotonic_ns() // 1000 - deadline)
+                stream.frames += 1
+                stream.lateness_sum += lateness
+                stream.lateness_max = max(stream.lateness_max, lateness)
+                if lateness > self.late_threshold:
+                    stream.late += 1
+                self.lateness.append(lateness)
+
+            try:
+                stream.callback(item, stream.userdata)
+            except Exception:
+                # keep delivering other streams of this worker
+                print(f"device {self.device:02x}: callback of pacer stream {stream.index} fail")
+                print(traceback.format_exc())
+            finally:
+                stream.pending.release()
+                if item is None:
+                    stream.done.set()
+
+        context.destroy()
+
+    def statistics(self):
+        """
+        lateness in ms of the latest frames of all streams
+        """
+        samples = sorted(self.lateness)
+        n = len(samples)
+        if n == 0:
+            return {'frames': 0}
+
+        def percentile(p):
+            return samples[min(n - 1, int(n * p / 100))] / 1000
+
+        return {'frames': n, 'mean_ms': sum(samples) / n / 1000, 'p50_ms': percentile(50), 'p99_ms': percentile(99),
+                'max_ms': samples[-1] / 1000, 'late': sum(1 for v in samples if v > self.late_threshold)}
@@ -0,0 +1,112 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import random
+import sys
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_JENC, AXCL_LITE_IVPS
+from axclite.axclite_memory import device_mem_alloc, device_mem_free
+from axclite.axclite_jenc import AxcliteJpegEncoder
+
+
+def main(device: int, image_file: str, width: int, height: int, count: int, boxes_per_frame: int, thumb, quality: int,
+         encoders: int, max_dump_num: int):
+    size = width * height * 3 // 2
+    with open(image_file, 'rb') as f:
+        img = f.read(size)
+    if len(img) < size:
+        print(f"device {device:02x}: no image in {image_file}")
+        return
+
+    buf = device_mem_alloc(size)
+    if buf == 0:
+        return
+    axcl.rt.memcpy(buf, axcl.utils.bytes_to_ptr(img), size, axcl.AXCL_MEMCPY_HOST_TO_DEVICE)
+
+    # the same image stands for decoded frames, random boxes stand for detected objects
+    frames = [{
+        'width': width, 'height': height, 'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+        'pic_stride': [width, width, 0], 'phy_addr': [buf, buf + width * height, 0], 'vir_addr': [0], 'frame_size': size
+    } for _ in range((count + boxes_per_frame - 1) // boxes_per_frame)]
+
+    tasks = []
+    for i in range(count):
+        w = random.randint(32, width // 4)
+        h = random.randint(32, height // 4)
+        task = {
+            'frame': frames[i // boxes_per_frame],
+            'box': (random.randrange(0, width - w, 2), random.randrange(0, height - h, 2), w, h),
+            'size': thumb,
+            'quality': quality
+        }
+        if i < max_dump_num:
+            task['path'] = os.path.join("/tmp/axcl", f"snapshot_{i}.jpg")
+        tasks.append(task)
+
+    encoder = AxcliteJpegEncoder(device, thumb[0], thumb[1], encoders)
+    results = encoder.snapshot(tasks)
+    print(f"device {device:02x}: {sum(1 for r in results if r is None)} failed")
+    encoder.destroy()
+
+    device_mem_free(buf)
+
+
+if __name__ == '__main__':
+    print(f"============== sample jenc batch started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='batch jpeg snapshot sample: crop and resize random boxes of an nv12 image into jpeg thumbnails and report snapshots/s',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.nv12.yuv --width 1920 --height 1080 --count 1000 --thumb 128x128'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input nv12 yuv file')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('--count', type=int, default=1000, help='number of snapshots')
+    parser.add_argument('--boxes', type=int, default=16, help='boxes per frame')
+    parser.add_argument('--thumb', type=str, default='128x128', help='thumbnail size WxH')
+    parser.add_argument('--quality', type=int, default=90, help='jpeg q factor, 1 ~ 99')
+    parser.add_argument('--encoders', type=int, default=2, help='in-flight encodes')
+    parser.add_argument('--dump', type=int, default=0, help='dump number of snapshots to /tmp/axcl')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    thumb = tuple(int(v) for v in args.thumb.lower().split('x'))
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_JENC | AXCL_LITE_IVPS)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.width, args.height, args.count, max(1, args.boxes), thumb, args.quality,
+                         max(1, args.encoders), args.dump)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample jenc batch exited ==============")
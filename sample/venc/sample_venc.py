@@ -10,6 +10,7 @@
 #
 # ******************************************************************************
 import argparse
+import copy
 import os
 import sys
 import time
@@ -25,47 +26,30 @@ from axclite.axclite_device import AxcliteDevice
 from axclite.axclite_system import axclite_system
 from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VENC
 from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_venc_hub import AxcliteVencHub
 from axclite.axclite_pool import AxclitePool
 from axclite.axclite_observer import AxcliteObserver
-from axclite.axclite_file import AxcliteStoreFileFromDevice
+from axclite.axclite_stream_writer import AxcliteStreamWriter
+from axclite.axclite_mp4_muxer import AxcliteMp4Muxer
 
 
 class VencObserver(AxcliteObserver):
-    def __init__(self, dump_path, dump_file):
+    def __init__(self, writer):
         self.seq_num = 0
-        self.dump_path = dump_path
-        self.dump_file = dump_file
+        self.writer = writer
 
     def update(self, data):
         self.seq_num += 1
         pack = data['pack']
         # print(f"seq_num {pack['seq_num']:05d}: len: {pack['len']}, type: {pack['type']}, pts: {pack['pts']}, phy_addr: 0x{pack['phy_addr']:x}")
 
-        if self.dump_file:
-            AxcliteStoreFileFromDevice(pack['phy_addr'], pack['len'], self.dump_path, self.dump_file, False if self.seq_num == 1 else True)
+        # payload is copied to host by raw stream writer or mp4 muxer, stream is released at once
+        if self.writer:
+            self.writer.write_pack(pack)
 
 
-def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, dump: int):
-    if not os.path.exists(image_file):
-        print(f"device {device:02x}: {image_file} not exist")
-        return
-
-    size = int(width * height * 1.5)
-    image_num = os.path.getsize(image_file) // size
-    if image_num < 1:
-        print(f"device {device:02x}: no image in {image_file}")
-        return
-
-    if sys.platform.startswith('win'):
-        dump_path = os.path.dirname(os.path.abspath(image_file))
-    else:
-        dump_path = "/tmp/axcl"
-
-    dump_file = "dump_encoded.{}".format(codec)
-    observer = VencObserver(dump_path, dump_file)
-    encoder = AxcliteVenc()
-    encoder.register_observer(observer)
-    attr = {
+def venc_attr(codec: str, width: int, height: int, fps: int) -> dict:
+    return {
         'venc_attr': {
             'link_mode': axcl.AX_VENC_UNLINK_MODE,
             'type': axcl.PT_H264 if codec == 'h264' else axcl.PT_H265,
@@ -117,21 +101,68 @@ def main(device: int, image_file: str, codec: str, width: int, height: int, fps:
         }
     }
 
-    # create video encoder
-    if axcl.AXCL_SUCC != encoder.create(attr, device):
+
+def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, dump: int, channels=1, hub_workers=0, container='raw'):
+    if not os.path.exists(image_file):
+        print(f"device {device:02x}: {image_file} not exist")
+        return
+
+    size = int(width * height * 1.5)
+    image_num = os.path.getsize(image_file) // size
+    if image_num < 1:
+        print(f"device {device:02x}: no image in {image_file}")
         return
 
+    if sys.platform.startswith('win'):
+        dump_path = os.path.dirname(os.path.abspath(image_file))
+    else:
+        dump_path = "/tmp/axcl"
+
+    ext = codec if container == 'raw' else 'mp4'
+    dump_files = ["dump_encoded.{}".format(ext) if i == 0 else "dump_encoded_{}.{}".format(i, ext) for i in range(channels)]
+    attr = venc_attr(codec, width, height, fps)
+
+    # create video encoders, the same images are encoded by each channel
+    encoders = []
+    writers = []
+    if dump:
+        for dump_file in dump_files:
+            if container == 'raw':
+                writers.append(AxcliteStreamWriter(device, os.path.join(dump_path, dump_file)))
+            else:
+                writers.append(AxcliteMp4Muxer(device, os.path.join(dump_path, dump_file), attr['venc_attr']['type'], width, height, fps,
+                                               fragmented=container == 'fmp4'))
+    for i in range(channels):
+        encoder = AxcliteVenc()
+        encoder.register_observer(VencObserver(writers[i] if dump else None))
+        if axcl.AXCL_SUCC != encoder.create(copy.deepcopy(attr), device):
+            break
+        encoders.append(encoder)
+
     # create device pool to hold nv12 yuv image
     pool = AxclitePool()
-    if axcl.AX_INVALID_POOLID == pool.create(size, 8, 'nv12'):
-        encoder.destroy()
+    if len(encoders) != channels or axcl.AX_INVALID_POOLID == pool.create(size, 8, 'nv12'):
+        for encoder in encoders:
+            encoder.destroy()
+        for writer in writers:
+            writer.close()
         return
 
-    # start video encoder
-    if axcl.AXCL_SUCC != encoder.start():
-        pool.destroy()
-        encoder.destroy()
-        return
+    # start video encoders, streams of all channels are collected by select groups of hub instead of one thread per channel
+    hub = AxcliteVencHub(device, hub_workers) if hub_workers > 0 else None
+    for encoder in encoders:
+        if axcl.AXCL_SUCC != encoder.start(recv=hub is None):
+            pool.destroy()
+            for e in encoders:
+                e.stop()
+                e.destroy()
+            for writer in writers:
+                writer.close()
+            return
+        if hub:
+            hub.attach(encoder)
+    if hub:
+        hub.start()
 
     with open(image_file, 'rb') as f:
         seq_num = 0
@@ -166,17 +197,24 @@ def main(device: int, image_file: str, codec: str, width: int, height: int, fps:
                     'mod_id': axcl.AX_ID_VENC,
                     'is_end_of_stream': False
                 }
-                encoder.send_frame(frame, -1)
+                for encoder in encoders:
+                    encoder.send_frame(frame, -1)
 
                 pool.release_blk(blk_id)
 
     time.sleep(2)
-    encoder.stop()
-    encoder.destroy()
+    if hub:
+        for encoder in encoders:
+            hub.detach(encoder)
+        hub.destroy()
+    for encoder in encoders:
+        encoder.stop()
+        encoder.destroy()
     pool.destroy()
 
-    if dump:
-        print(f"device {device:02x}: {os.path.join(dump_path, dump_file)} is saved")
+    for dump_file, writer in zip(dump_files, writers):
+        writer.close()
+        print(f"device {device:02x}: {os.path.join(dump_path, dump_file)} is saved, {writer.statistics()}")
 
 
 if __name__ == '__main__':
@@ -192,6 +230,9 @@ if __name__ == '__main__':
     parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
     parser.add_argument('--fps', type=int, default=30)
     parser.add_argument('--dump', type=int, default=0, help='dump encoded NAL stream, 0: no dump 1: dump')
+    parser.add_argument('--channels', type=int, default=1, help='number of channels encoding the same input')
+    parser.add_argument('--container', choices=['raw', 'mp4', 'fmp4'], default='raw', help='dump as raw annexB, mp4 with moov at end or fragmented mp4')
+    parser.add_argument('--hub', type=int, default=0, help='collect streams by N select threads, 0: one receive thread per channel')
     parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
     parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
 
@@ -220,7 +261,7 @@ if __name__ == '__main__':
                     device.destroy()
                 else:
                     # invoke main function
-                    main(device.device_id, input_file, codec, width, height, fps, dump)
+                    main(device.device_id, input_file, codec, width, height, fps, dump, max(1, args.channels), args.hub, args.container)
 
                     # de-initialize sys and video decoder module
                     AxcliteMSys().deinit()
@@ -0,0 +1,168 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VENC
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_pool import AxclitePool
+from axclite.axclite_mp4_muxer import AxcliteMp4Muxer
+from axclite.axclite_preroll_recorder import AxclitePrerollRecorder
+from sample_venc import venc_attr
+
+
+def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, channels: int, duration: int,
+         events: list, pre_roll: float, post_roll: float, ring_size: int):
+    """
+    encode input images in loop at real-time rate by channels, and record pre_roll + post_roll seconds of
+    every channel into mp4 at each event time
+    """
+    size = int(width * height * 1.5)
+    images = []
+    with open(image_file, 'rb') as f:
+        while len(images) < fps:
+            img = f.read(size)
+            if len(img) < size:
+                break
+            images.append(img)
+    if not images:
+        print(f"device {device:02x}: no image in {image_file}")
+        return
+
+    dump_path = os.path.dirname(os.path.abspath(image_file)) if sys.platform.startswith('win') else "/tmp/axcl"
+    attr = venc_attr(codec, width, height, fps)
+
+    encoders = []
+    recorders = []
+    for i in range(channels):
+        encoder = AxcliteVenc()
+        if axcl.AXCL_SUCC != encoder.create(venc_attr(codec, width, height, fps), device):
+            break
+        recorder = AxclitePrerollRecorder(device, encoder.get_chn_id(), ring_size)
+        encoder.register_observer(recorder)
+        encoders.append(encoder)
+        recorders.append(recorder)
+
+    pool = AxclitePool()
+    if len(encoders) == channels and axcl.AX_INVALID_POOLID != pool.create(size, 8, 'nv12'):
+        for encoder in encoders:
+            encoder.start()
+
+        events = sorted(events)
+        begin = time.monotonic()
+        seq_num = 0
+        while seq_num < duration * fps:
+            # pace input at fps
+            delay = begin + seq_num / fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            while events and time.monotonic() - begin >= events[0]:
+                event = events.pop(0)
+                for encoder, recorder in zip(encoders, recorders):
+                    file_path = os.path.join(dump_path, f"event_{event}s_chn{encoder.get_chn_id()}.mp4")
+                    # muxer is created only if the event starts a new recording instead of extending the current one
+                    recorder.trigger(lambda path=file_path: AxcliteMp4Muxer(device, path, attr['venc_attr']['type'], width, height, fps,
+                                                                            fragmented=False),
+                                     pre_roll, post_roll)
+                print(f"device {device:02x}: event at {event}s, {recorders[0].statistics()}")
+
+            blk_id = pool.get_blk()
+            if blk_id == axcl.AX_INVALID_BLOCKID:
+                time.sleep(0.01)
+                continue
+
+            phy_addr = pool.get_blk_phy_addr(blk_id)
+            axcl.rt.memcpy(phy_addr, axcl.utils.bytes_to_ptr(images[seq_num % len(images)]), size, axcl.AXCL_MEMCPY_HOST_TO_DEVICE)
+            seq_num += 1
+            frame = {
+                'video_frame': {
+                    'width': width, 'height': height, 'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+                    'compress_info': {'compress_mode': axcl.AX_COMPRESS_MODE_NONE, 'compress_level': 0},
+                    'pic_stride': [width, width, 0], 'phy_addr': [phy_addr, 0, 0], 'vir_addr': [0, 0, 0],
+                    'blk_id': [blk_id, 0, 0], 'seq_num': seq_num, 'frame_size': size, 'pts': seq_num * 1000000 // fps
+                },
+                'mod_id': axcl.AX_ID_VENC,
+                'is_end_of_stream': False
+            }
+            for encoder in encoders:
+                encoder.send_frame(frame, -1)
+            pool.release_blk(blk_id)
+
+        time.sleep(1)
+        for encoder in encoders:
+            encoder.stop()
+
+    for recorder in recorders:
+        recorder.close()
+        print(f"device {device:02x}: {recorder.statistics()}")
+        recorder.destroy()
+    for encoder in encoders:
+        encoder.destroy()
+    pool.destroy()
+
+
+if __name__ == '__main__':
+    print(f"============== sample venc event started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='event recording sample: keep last seconds of encoded streams per channel and record them on events',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.nv12.yuv --width 1920 --height 1080 h264 --channels 32 --events 10 30'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input nv12 yuv file, images are encoded in loop')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--channels', type=int, default=1, help='number of channels encoding the same input')
+    parser.add_argument('--duration', type=int, default=40, help='seconds to encode')
+    parser.add_argument('--events', type=float, nargs='+', default=[10, 30], help='event times in seconds from start')
+    parser.add_argument('--pre-roll', type=float, default=5, help='seconds recorded before event')
+    parser.add_argument('--post-roll', type=float, default=5, help='seconds recorded after event')
+    parser.add_argument('--ring-mb', type=int, default=8, help='MB of pre-roll ring per channel')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    if args.width % 16 != 0 or args.height % 2 != 0:
+        print(f'width {args.width} must be aligned to 16, and height {args.height} must be aligned to 2')
+        sys.exit(1)
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VENC)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, max(1, args.fps), max(1, args.channels),
+                         args.duration, args.events, args.pre_roll, args.post_roll, args.ring_mb << 20)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample venc event exited ==============")
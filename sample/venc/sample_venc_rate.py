@@ -0,0 +1,164 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VENC
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_pool import AxclitePool
+from axclite.axclite_rate_controller import AxcliteRateController
+from sample_venc import venc_attr
+
+
+def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, channels: int, duration: int,
+         bitrate: int, budgets: list, min_kbps: int, min_fps: int):
+    """
+    encode input images in loop at real-time rate by channels, the aggregate bitrate of all channels is kept
+    within budget, budgets are applied one by one in equal periods of duration to simulate a variable uplink
+    """
+    size = int(width * height * 1.5)
+    images = []
+    with open(image_file, 'rb') as f:
+        while len(images) < fps:
+            img = f.read(size)
+            if len(img) < size:
+                break
+            images.append(img)
+    if not images:
+        print(f"device {device:02x}: no image in {image_file}")
+        return
+
+    encoders = []
+    for i in range(channels):
+        # the configured bitrate is the max, the controller lowers it within budget
+        attr = venc_attr(codec, width, height, fps)
+        attr['rc_attr']['h264_cbr_rc_attr']['bitrate'] = bitrate
+        attr['rc_attr']['h265_cbr_rc_attr']['bitrate'] = bitrate
+        encoder = AxcliteVenc()
+        if axcl.AXCL_SUCC != encoder.create(attr, device):
+            break
+        encoders.append(encoder)
+
+    controller = AxcliteRateController(device, budgets[0], min_kbps=min_kbps, min_fps=min_fps)
+    pool = AxclitePool()
+    if len(encoders) == channels and axcl.AX_INVALID_POOLID != pool.create(size, 8, 'nv12'):
+        for encoder in encoders:
+            controller.attach(encoder)
+            encoder.start()
+        controller.start()
+
+        begin = time.monotonic()
+        report = begin
+        seq_num = 0
+        while seq_num < duration * fps:
+            # pace input at fps
+            now = time.monotonic()
+            delay = begin + seq_num / fps - now
+            if delay > 0:
+                time.sleep(delay)
+
+            budget = budgets[min(len(budgets) - 1, int(seq_num * len(budgets) / (duration * fps)))]
+            if budget != controller.budget_kbps:
+                print(f"device {device:02x}: budget is changed to {budget} kbps")
+                controller.set_budget(budget)
+            if now - report >= 2:
+                report = now
+                print(f"device {device:02x}: {controller.statistics()}")
+
+            blk_id = pool.get_blk()
+            if blk_id == axcl.AX_INVALID_BLOCKID:
+                time.sleep(0.01)
+                continue
+
+            phy_addr = pool.get_blk_phy_addr(blk_id)
+            axcl.rt.memcpy(phy_addr, axcl.utils.bytes_to_ptr(images[seq_num % len(images)]), size, axcl.AXCL_MEMCPY_HOST_TO_DEVICE)
+            seq_num += 1
+            frame = {
+                'video_frame': {
+                    'width': width, 'height': height, 'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+                    'compress_info': {'compress_mode': axcl.AX_COMPRESS_MODE_NONE, 'compress_level': 0},
+                    'pic_stride': [width, width, 0], 'phy_addr': [phy_addr, 0, 0], 'vir_addr': [0, 0, 0],
+                    'blk_id': [blk_id, 0, 0], 'seq_num': seq_num, 'frame_size': size, 'pts': seq_num * 1000000 // fps
+                },
+                'mod_id': axcl.AX_ID_VENC,
+                'is_end_of_stream': False
+            }
+            for encoder in encoders:
+                encoder.send_frame(frame, -1)
+            pool.release_blk(blk_id)
+
+        controller.stop()
+        print(f"device {device:02x}: {controller.statistics()}")
+        for encoder in encoders:
+            encoder.stop()
+
+    controller.destroy()
+    for encoder in encoders:
+        encoder.destroy()
+    pool.destroy()
+
+
+if __name__ == '__main__':
+    print(f"============== sample venc rate started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='rate control sample: keep the aggregate bitrate of encode channels within a variable budget',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.nv12.yuv --width 1920 --height 1080 h264 --channels 8 --budget 16000 8000 24000'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input nv12 yuv file, images are encoded in loop')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--channels', type=int, default=4, help='number of channels encoding the same input')
+    parser.add_argument('--duration', type=int, default=30, help='seconds to encode')
+    parser.add_argument('--bitrate', type=int, default=4096, help='max kbps of each channel')
+    parser.add_argument('--budget', type=int, nargs='+', default=[8000], help='aggregate kbps of all channels, applied one by one')
+    parser.add_argument('--min-kbps', type=int, default=256, help='min kbps of a channel before frame rate is reduced')
+    parser.add_argument('--min-fps', type=int, default=5, help='min frame rate of a channel')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    if args.width % 16 != 0 or args.height % 2 != 0:
+        print(f'width {args.width} must be aligned to 16, and height {args.height} must be aligned to 2')
+        sys.exit(1)
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VENC)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, max(1, args.fps), max(1, args.channels),
+                         args.duration, args.bitrate, args.budget, args.min_kbps, args.min_fps)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample venc rate exited ==============")
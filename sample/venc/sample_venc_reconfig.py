@@ -0,0 +1,161 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VENC
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_pool import AxclitePool
+from axclite.axclite_stream_writer import AxcliteStreamWriter
+from axclite.axclite_mp4_muxer import AxcliteMp4Muxer
+from sample_venc import venc_attr
+
+
+def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, duration: int, container: str):
+    """
+    encode input images in loop at real-time rate into one file, the encoder is reconfigured in place by steps:
+        1/4 duration: bitrate is halved live
+        2/4 duration: slices of 4 lines and full range vui live
+        3/4 duration: center half of images is encoded by crop, restarted without recreation
+    """
+    size = int(width * height * 1.5)
+    images = []
+    with open(image_file, 'rb') as f:
+        while len(images) < fps:
+            img = f.read(size)
+            if len(img) < size:
+                break
+            images.append(img)
+    if not images:
+        print(f"device {device:02x}: no image in {image_file}")
+        return
+
+    attr = venc_attr(codec, width, height, fps)
+    dump_path = os.path.dirname(os.path.abspath(image_file)) if sys.platform.startswith('win') else "/tmp/axcl"
+    file_path = os.path.join(dump_path, f"dump_reconfig.{codec if container == 'raw' else 'mp4'}")
+    if container == 'raw':
+        writer = AxcliteStreamWriter(device, file_path)
+    else:
+        writer = AxcliteMp4Muxer(device, file_path, attr['venc_attr']['type'], width, height, fps, fragmented=container == 'fmp4')
+
+    encoder = AxcliteVenc()
+    encoder.register_observer(writer)
+    rc_key = 'h264_cbr_rc_attr' if codec == 'h264' else 'h265_cbr_rc_attr'
+    steps = [
+        ('half bitrate', {'attr': {'rc_attr': {rc_key: {'bitrate': attr['rc_attr'][rc_key]['bitrate'] // 2}}}}),
+        ('slice split and vui', {'slice_split': {'split': True, 'lcu_line_num': 4},
+                                 'vui_param': {'vui_video_signal': {'video_signal_type_present_flag': 1, 'video_full_range_flag': 1}}}),
+        ('center crop', {'attr': {'venc_attr': {'crop_cfg': {'enable': 1, 'rect': {'x': width // 4 & ~15, 'y': height // 4 & ~1,
+                                                                                   'width': width // 2, 'height': height // 2}}}}})
+    ]
+
+    pool = AxclitePool()
+    if (axcl.AXCL_SUCC == encoder.create(attr, device) and axcl.AX_INVALID_POOLID != pool.create(size, 8, 'nv12')
+            and axcl.AXCL_SUCC == encoder.start()):
+        begin = time.monotonic()
+        seq_num = 0
+        rejected = 0
+        while seq_num < duration * fps:
+            # pace input at fps
+            delay = begin + seq_num / fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            if steps and seq_num >= (4 - len(steps)) * duration * fps // 4:
+                name, kwargs = steps.pop(0)
+                t = time.monotonic()
+                ret = encoder.reconfigure(**kwargs)
+                print(f"device {device:02x}: {name} in {(time.monotonic() - t) * 1000:.1f} ms, ret = 0x{ret&0xFFFFFFFF:x}")
+
+            blk_id = pool.get_blk()
+            if blk_id == axcl.AX_INVALID_BLOCKID:
+                time.sleep(0.01)
+                continue
+
+            phy_addr = pool.get_blk_phy_addr(blk_id)
+            axcl.rt.memcpy(phy_addr, axcl.utils.bytes_to_ptr(images[seq_num % len(images)]), size, axcl.AXCL_MEMCPY_HOST_TO_DEVICE)
+            seq_num += 1
+            frame = {
+                'video_frame': {
+                    'width': width, 'height': height, 'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+                    'compress_info': {'compress_mode': axcl.AX_COMPRESS_MODE_NONE, 'compress_level': 0},
+                    'pic_stride': [width, width, 0], 'phy_addr': [phy_addr, 0, 0], 'vir_addr': [0, 0, 0],
+                    'blk_id': [blk_id, 0, 0], 'seq_num': seq_num, 'frame_size': size, 'pts': seq_num * 1000000 // fps
+                },
+                'mod_id': axcl.AX_ID_VENC,
+                'is_end_of_stream': False
+            }
+            if encoder.send_frame(frame, -1) != axcl.AXCL_SUCC:
+                rejected += 1
+            pool.release_blk(blk_id)
+
+        time.sleep(1)
+        encoder.stop()
+        print(f"device {device:02x}: {rejected} frames rejected while reconfiguring")
+
+    encoder.destroy()
+    pool.destroy()
+    writer.close()
+    print(f"device {device:02x}: {file_path} is saved, {writer.statistics()}")
+
+
+if __name__ == '__main__':
+    print(f"============== sample venc reconfig started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='reconfigure sample: change bitrate, slices, vui and crop of an encoder in place into one output file',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.nv12.yuv --width 1920 --height 1080 h264 --container mp4'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input nv12 yuv file, images are encoded in loop')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--duration', type=int, default=20, help='seconds to encode')
+    parser.add_argument('--container', choices=['raw', 'mp4', 'fmp4'], default='raw', help='dump as raw annexB, mp4 with moov at end or fragmented mp4')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    if args.width % 32 != 0 or args.height % 4 != 0:
+        print(f'width {args.width} must be aligned to 32, and height {args.height} must be aligned to 4')
+        sys.exit(1)
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VENC)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, max(1, args.fps), args.duration,
+                         args.container)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample venc reconfig exited ==============")
@@ -0,0 +1,193 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR + '.')
+sys.path.append(BASE_DIR + '/..')
+sys.path.append(BASE_DIR + '/../..')
+
+import axcl
+from axclite.axclite_device import AxcliteDevice
+from axclite.axclite_system import axclite_system
+from axclite.axclite_msys import AxcliteMSys, AXCL_LITE_VENC
+from axclite.axclite_venc import AxcliteVenc
+from axclite.axclite_pool import AxclitePool
+from axclite.axclite_stream_writer import AxcliteStreamWriter
+from axclite.axclite_venc_roi import AxcliteVencRoi
+from sample_venc import venc_attr
+
+
+class SyntheticDetector(object):
+    """
+    boxes of objects moving across the frame, with jitter and missed detections of a real detector
+    """
+    def __init__(self, width, height, objects, jitter=4, miss_rate=0.1):
+        self.width = width
+        self.height = height
+        self.jitter = jitter
+        self.miss_rate = miss_rate
+        self.objects = []
+        for _ in range(objects):
+            w = random.randint(width // 16, width // 6)
+            h = random.randint(height // 8, height // 3)
+            self.objects.append([random.uniform(0, width - w), random.uniform(0, height - h), w, h,
+                                 random.uniform(-4, 4), random.uniform(-2, 2)])
+
+    def detect(self):
+        boxes = []
+        for obj in self.objects:
+            x, y, w, h, vx, vy = obj
+            if not 0 <= x + vx <= self.width - w:
+                obj[4] = -vx
+            if not 0 <= y + vy <= self.height - h:
+                obj[5] = -vy
+            obj[0] += obj[4]
+            obj[1] += obj[5]
+            if random.random() < self.miss_rate:
+                continue
+            j = [random.uniform(-self.jitter, self.jitter) for _ in range(4)]
+            boxes.append([obj[0] + j[0], obj[1] + j[1], obj[0] + w + j[2], obj[1] + h + j[3]])
+        return boxes
+
+
+def main(device: int, image_file: str, codec: str, width: int, height: int, fps: int, duration: int, objects: int,
+         roi_qp: int, bitrate_ratio: float, calibrate: int, dump: int):
+    """
+    encode input images in loop at real-time rate, ROIs follow synthetic detections of every frame
+    """
+    size = int(width * height * 1.5)
+    images = []
+    with open(image_file, 'rb') as f:
+        while len(images) < fps:
+            img = f.read(size)
+            if len(img) < size:
+                break
+            images.append(img)
+    if not images:
+        print(f"device {device:02x}: no image in {image_file}")
+        return
+
+    encoder = AxcliteVenc()
+    if axcl.AXCL_SUCC != encoder.create(venc_attr(codec, width, height, fps), device):
+        return
+
+    roi = AxcliteVencRoi(device, encoder.get_chn_id(), width, height, roi_qp, bitrate_ratio=bitrate_ratio,
+                         calibrate_frames=calibrate * fps, fps=fps)
+    encoder.register_observer(roi)
+    writer = None
+    if dump:
+        dump_path = os.path.dirname(os.path.abspath(image_file)) if sys.platform.startswith('win') else "/tmp/axcl"
+        writer = AxcliteStreamWriter(device, os.path.join(dump_path, f"dump_roi.{codec}"))
+        encoder.register_observer(writer)
+
+    detector = SyntheticDetector(width, height, objects)
+    pool = AxclitePool()
+    if axcl.AX_INVALID_POOLID != pool.create(size, 8, 'nv12') and axcl.AXCL_SUCC == encoder.start():
+        begin = time.monotonic()
+        report = begin
+        seq_num = 0
+        while seq_num < duration * fps:
+            # pace input at fps
+            now = time.monotonic()
+            delay = begin + seq_num / fps - now
+            if delay > 0:
+                time.sleep(delay)
+            if now - report >= 2:
+                report = now
+                print(f"device {device:02x}: {roi.statistics()}")
+
+            blk_id = pool.get_blk()
+            if blk_id == axcl.AX_INVALID_BLOCKID:
+                time.sleep(0.01)
+                continue
+
+            # ROIs are set before the frame they are detected on is sent
+            roi.set_boxes(detector.detect())
+
+            phy_addr = pool.get_blk_phy_addr(blk_id)
+            axcl.rt.memcpy(phy_addr, axcl.utils.bytes_to_ptr(images[seq_num % len(images)]), size, axcl.AXCL_MEMCPY_HOST_TO_DEVICE)
+            seq_num += 1
+            frame = {
+                'video_frame': {
+                    'width': width, 'height': height, 'img_format': axcl.AX_FORMAT_YUV420_SEMIPLANAR,
+                    'compress_info': {'compress_mode': axcl.AX_COMPRESS_MODE_NONE, 'compress_level': 0},
+                    'pic_stride': [width, width, 0], 'phy_addr': [phy_addr, 0, 0], 'vir_addr': [0, 0, 0],
+                    'blk_id': [blk_id, 0, 0], 'seq_num': seq_num, 'frame_size': size, 'pts': seq_num * 1000000 // fps
+                },
+                'mod_id': axcl.AX_ID_VENC,
+                'is_end_of_stream': False
+            }
+            encoder.send_frame(frame, -1)
+            pool.release_blk(blk_id)
+
+        time.sleep(1)
+        encoder.stop()
+        print(f"device {device:02x}: {roi.statistics()}")
+
+    roi.destroy()
+    encoder.destroy()
+    pool.destroy()
+    if writer:
+        writer.close()
+        print(f"device {device:02x}: {writer.file_path} is saved, {writer.statistics()}")
+
+
+if __name__ == '__main__':
+    print(f"============== sample venc roi started ==============")
+
+    parser = argparse.ArgumentParser(
+        description='roi encode sample: map detection boxes of every frame to encoder ROIs and report bitrate saved',
+        epilog=f'eg: {os.path.basename(__file__)} -i input.nv12.yuv --width 1920 --height 1080 h264 --objects 4 --bitrate-ratio 0.6'
+    )
+    parser.add_argument('-i', '--input', type=str, required=True, help='input nv12 yuv file, images are encoded in loop')
+    parser.add_argument('--width', type=int, required=True, help='width')
+    parser.add_argument('--height', type=int, required=True, help='height')
+    parser.add_argument('codec', choices=['h264', 'h265'], help='choose codec: h264, h265')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--duration', type=int, default=30, help='seconds to encode')
+    parser.add_argument('--objects', type=int, default=4, help='number of synthetic moving objects')
+    parser.add_argument('--roi-qp', type=int, default=-8, help='QP delta of ROIs')
+    parser.add_argument('--bitrate-ratio', type=float, default=0.6, help='ratio of bitrate once ROIs are enabled')
+    parser.add_argument('--calibrate', type=int, default=5, help='seconds encoded without ROI as the baseline')
+    parser.add_argument('--dump', type=int, default=0, help='dump encoded NAL stream, 0: no dump 1: dump')
+    parser.add_argument('-d', '--device', type=int, default=0, help='device index from 0 to connected device num - 1')
+    parser.add_argument('--json', type=str, default='/usr/bin/axcl/axcl.json', help='axcl.json path')
+
+    args = parser.parse_args()
+    if args.width % 16 != 0 or args.height % 2 != 0:
+        print(f'width {args.width} must be aligned to 16, and height {args.height} must be aligned to 2')
+        sys.exit(1)
+
+    try:
+        with axclite_system(args.json):
+            device = AxcliteDevice()
+            if device.create(args.device):
+                ret = AxcliteMSys().init(AXCL_LITE_VENC)
+                if ret != axcl.AXCL_SUCC:
+                    device.destroy()
+                else:
+                    main(device.device_id, args.input, args.codec, args.width, args.height, max(1, args.fps), args.duration,
+                         args.objects, args.roi_qp, args.bitrate_ratio, args.calibrate, args.dump)
+
+                    AxcliteMSys().deinit()
+                    device.destroy()
+    except:
+        print(sys.exc_info())
+        print(traceback.format_exc())
+
+    print("============== sample venc roi exited ==============")
@@ -0,0 +1,85 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import random
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+sys.path.append(BASE_DIR+'/../sample')
+
+from vdec.simple_annexb_split import AnnexbNalScanner, find_start_codes, start_code_len
+
+
+def reference_split(data):
+    # byte by byte, NAL units with start codes, bytes before the first start code are dropped
+    starts = []
+    i = 0
+    while i + 3 < len(data):
+        if data[i] == 0 and data[i + 1] == 0 and data[i + 2] == 1:
+            starts.append(i - 1 if i > 0 and data[i - 1] == 0 else i)
+            i += 3
+        else:
+            i += 1
+    return [data[starts[k]:starts[k + 1] if k + 1 < len(starts) else len(data)] for k in range(len(starts))]
+
+
+def random_stream(rnd, nals):
+    parts = [bytes(rnd.randint(0, 255) for _ in range(rnd.randint(0, 4)))]
+    for _ in range(nals):
+        parts.append(rnd.choice([b'\x00\x00\x01', b'\x00\x00\x00\x01']))
+        # header byte is never 0, payload has zeros, emulation prevention bytes and trailing zeros
+        parts.append(bytes([rnd.randint(1, 255)]))
+        parts.append(bytes(rnd.choice([0, 0, 1, 3, rnd.randint(0, 255)]) for _ in range(rnd.randint(0, 40))))
+        parts.append(b'\xff')
+        parts.append(b'\x00' * rnd.choice([0, 0, 1, 2]))
+    parts.append(b'\xff')
+    return b''.join(parts)
+
+
+def scan(data, chunk_size):
+    scanner = AnnexbNalScanner()
+    nals = []
+    for pos in range(0, len(data), chunk_size):
+        nals += [bytes(nal) for nal in scanner.feed(data[pos:pos + chunk_size])]
+    nal = scanner.flush()
+    if nal:
+        nals.append(bytes(nal))
+    return nals
+
+
+class TestAnnexbSplit():
+    def test_find_start_codes(self):
+        data = b'\x00\x00\x01\x67\xaa\x00\x00\x00\x01\x68\xbb\x00\x00\x01\x65\x00\x00\x01'
+        assert find_start_codes(data) == [0, 5, 11]
+        assert find_start_codes(data, 4) == [5, 11]
+        # start code without NAL header at the end is not counted
+        assert find_start_codes(data, 12) == []
+
+    def test_start_code_len(self):
+        assert start_code_len(b'\x00\x00\x01\x67') == 3
+        assert start_code_len(b'\x00\x00\x00\x01\x67') == 4
+
+    def test_scanner_against_reference(self):
+        rnd = random.Random(30)
+        for _ in range(200):
+            data = random_stream(rnd, rnd.randint(1, 20))
+            expected = reference_split(data)
+            for chunk_size in (1, 2, 3, 4, 5, 7, 64, len(data)):
+                assert scan(data, chunk_size) == expected, (data, chunk_size)
+
+    def test_scanner_reset(self):
+        scanner = AnnexbNalScanner()
+        scanner.feed(b'\x00\x00\x01\x67\xaa')
+        scanner.reset()
+        assert scanner.flush() is None
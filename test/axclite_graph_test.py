@@ -0,0 +1,86 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+sys.path.append(BASE_DIR+'/../sample')
+
+import axcl
+from axclite.axclite_graph import axclite_compile_graph
+
+
+def make_spec(links):
+    return {
+        'nodes': {
+            'dec': {'type': 'vdec', 'attr': {'grp_attr': {'codec_type': 'PT_H264'},
+                                             'chn_attr': [{'enable': True}, {'enable': True}, {'enable': False}]}},
+            'resize': {'type': 'ivps', 'attr': {'filters': [{'engaged': True}, {'engaged': True}]}},
+            'enc': {'type': 'venc', 'attr': {'venc_attr': {'type': 'PT_H265'}}},
+            'det': {'type': 'npu', 'stage': lambda frame: None}
+        },
+        'links': links
+    }
+
+
+class TestAxcliteGraph():
+    def test_compile(self):
+        spec = make_spec([['resize:0', 'enc'], ['dec:1', 'resize'], ['dec:0', 'det']])
+        plan = axclite_compile_graph(spec)
+        assert plan is not None
+        assert plan['order'].index('dec') < plan['order'].index('resize') < plan['order'].index('enc')
+        assert plan['nodes']['dec']['attr']['grp_attr']['codec_type'] == axcl.PT_H264
+        assert plan['nodes']['dec']['attr']['chn_attr'][1]['link']
+        assert 'link' not in plan['nodes']['dec']['attr']['chn_attr'][0]
+        assert plan['nodes']['resize']['attr']['filters'][0]['link']
+        assert plan['nodes']['enc']['attr']['venc_attr']['link_mode'] == axcl.AX_VENC_LINK_MODE
+        # spec is not changed
+        assert 'link' not in spec['nodes']['dec']['attr']['chn_attr'][1]
+
+    def test_unknown_node(self):
+        assert axclite_compile_graph(make_spec([['dec:1', 'scale']])) is None
+        assert axclite_compile_graph(make_spec([['decoder:1', 'resize']])) is None
+
+    def test_invalid_type(self):
+        spec = make_spec([])
+        spec['nodes']['dec']['type'] = 'jdec'
+        assert axclite_compile_graph(spec) is None
+
+    def test_invalid_link(self):
+        # venc feeds nothing, disabled chn and missing filter can not be linked
+        assert axclite_compile_graph(make_spec([['enc', 'resize']])) is None
+        assert axclite_compile_graph(make_spec([['dec:2', 'resize']])) is None
+        assert axclite_compile_graph(make_spec([['resize:2', 'enc']])) is None
+
+    def test_double_input(self):
+        assert axclite_compile_graph(make_spec([['dec:0', 'enc'], ['resize:0', 'enc']])) is None
+
+    def test_cycle(self):
+        spec = make_spec([['resize:0', 'scale'], ['scale:0', 'resize']])
+        spec['nodes']['scale'] = {'type': 'ivps', 'attr': {'filters': [{'engaged': True}]}}
+        assert axclite_compile_graph(spec) is None
+
+    def test_linked_port_to_npu(self):
+        # a linked channel delivers no frames to host observers
+        assert axclite_compile_graph(make_spec([['dec:1', 'resize'], ['dec:1', 'det']])) is None
+        assert axclite_compile_graph(make_spec([['dec:1', 'det'], ['dec:1', 'resize']])) is None
+
+        spec = make_spec([['dec:0', 'det']])
+        spec['nodes']['dec']['attr']['chn_attr'][0]['link'] = True
+        assert axclite_compile_graph(spec) is None
+
+    def test_invalid_pool(self):
+        spec = make_spec([])
+        spec['pools'] = {'input': {'blk_size': 0, 'blk_cnt': 4}}
+        assert axclite_compile_graph(spec) is None
@@ -0,0 +1,155 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import struct
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+sys.path.append(BASE_DIR+'/../sample')
+
+import axcl
+from axclite.axclite_mp4_muxer import AxcliteMp4Muxer, axclite_annexb_nals, MP4_TIMESCALE, MP4_SAMPLE_SYNC, MP4_SAMPLE_NON_SYNC
+
+SPS = b'\x67\x64\x00\x28\xac\xd9'
+PPS = b'\x68\xeb\xe3\xcb'
+IDR = b'\x65\x88\x84\x00\x03\x21'
+P = b'\x41\x9a\x00\x00\x03\x01'
+AUD = b'\x09\xf0'
+FRAME_US = 40000
+
+
+def parse_boxes(data, start=0, end=None):
+    """
+    {kind: [payload, ...]} of the boxes in data[start:end]
+    """
+    boxes = []
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        size, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        assert size >= header and pos + size <= end
+        boxes.append((kind, pos + header, pos + size))
+        pos += size
+    assert pos == end
+    return boxes
+
+
+def child(data, box, path):
+    for kind in path:
+        boxes = parse_boxes(data, box[1], box[2])
+        box = next(b for b in boxes if b[0] == kind)
+    return box
+
+
+def write_gop(muxer, frames, pts=0):
+    muxer.write_frame(b'\x00\x00\x00\x01' + AUD + b'\x00\x00\x00\x01' + SPS + b'\x00\x00\x00\x01' + PPS +
+                      b'\x00\x00\x01' + IDR, pts)
+    for i in range(1, frames):
+        muxer.write_frame(b'\x00\x00\x00\x01' + P + b'\x00', pts + i * FRAME_US)
+
+
+class TestAxcliteMp4Muxer():
+    def test_annexb_nals(self):
+        data = b'\x00\x00\x00\x01' + SPS + b'\x00\x00\x01' + PPS + b'\x00\x00\x00\x00\x01' + IDR + b'\x00\x00'
+        assert axclite_annexb_nals(data) == [SPS, PPS, IDR]
+        assert axclite_annexb_nals(b'\x00\x00\x01' + P + b'\x00\x00\x01') == [P]
+        assert axclite_annexb_nals(b'\xff\xff') == []
+
+    def test_fragmented(self, tmp_path):
+        path = str(tmp_path / 'frag.mp4')
+        muxer = AxcliteMp4Muxer(0, path, axcl.PT_H264, 320, 240, fps=25)
+        # packets before the first key frame are skipped
+        muxer.write_frame(b'\x00\x00\x01' + P, 0)
+        write_gop(muxer, 3, 0)
+        write_gop(muxer, 2, 3 * FRAME_US)
+        muxer.close()
+        assert muxer.statistics()['samples'] == 5
+        assert muxer.statistics()['skipped'] == 1
+
+        data = open(path, 'rb').read()
+        boxes = parse_boxes(data)
+        assert [b[0] for b in boxes] == [b'ftyp', b'moov', b'moof', b'mdat', b'moof', b'mdat']
+
+        ftyp = boxes[0]
+        assert data[ftyp[1]:ftyp[1] + 4] == b'isom'
+        assert b'iso6' in data[ftyp[1]:ftyp[2]]
+
+        moov = boxes[1]
+        assert [b[0] for b in parse_boxes(data, moov[1], moov[2])] == [b'mvhd', b'trak', b'mvex']
+        stsd = child(data, moov, [b'trak', b'mdia', b'minf', b'stbl', b'stsd'])
+        avc1 = parse_boxes(data, stsd[1] + 8, stsd[2])[0]
+        assert avc1[0] == b'avc1'
+        assert struct.unpack('>HH', data[avc1[1] + 24:avc1[1] + 28]) == (320, 240)
+        avcc = parse_boxes(data, avc1[1] + 78, avc1[2])[0]
+        assert avcc[0] == b'avcC'
+        cfg = data[avcc[1]:avcc[2]]
+        assert cfg[1:4] == SPS[1:4]
+        assert cfg[5] & 0x1F == 1 and struct.unpack('>H', cfg[6:8])[0] == len(SPS) and cfg[8:8 + len(SPS)] == SPS
+
+        for index, (moof, mdat, count) in enumerate([(boxes[2], boxes[3], 3), (boxes[4], boxes[5], 2)]):
+            mfhd = child(data, moof, [b'mfhd'])
+            assert struct.unpack('>I', data[mfhd[1] + 4:mfhd[1] + 8])[0] == index + 1
+            tfdt = child(data, moof, [b'traf', b'tfdt'])
+            assert data[tfdt[1]] == 1
+            assert struct.unpack('>Q', data[tfdt[1] + 4:tfdt[1] + 12])[0] == index * 3 * FRAME_US * MP4_TIMESCALE // 1000000
+
+            trun = child(data, moof, [b'traf', b'trun'])
+            flags = struct.unpack('>I', data[trun[1]:trun[1] + 4])[0] & 0xFFFFFF
+            assert flags == 0x000701
+            sample_count, data_offset = struct.unpack('>Ii', data[trun[1] + 4:trun[1] + 12])
+            assert sample_count == count
+            # data offset is from moof start to the first sample in mdat
+            assert moof[1] - 8 + data_offset == mdat[1]
+
+            pos = mdat[1]
+            for i in range(count):
+                duration, size, sample_flags = struct.unpack('>3I', data[trun[1] + 12 + i * 12:trun[1] + 24 + i * 12])
+                assert duration == FRAME_US * MP4_TIMESCALE // 1000000
+                assert sample_flags == (MP4_SAMPLE_SYNC if i == 0 else MP4_SAMPLE_NON_SYNC)
+                # length prefixed NAL units, parameter sets and AUD are not in band
+                nal_size = struct.unpack('>I', data[pos:pos + 4])[0]
+                assert nal_size == size - 4
+                assert data[pos + 4:pos + size] == (IDR if i == 0 else P)
+                pos += size
+            assert pos == mdat[2]
+
+    def test_plain(self, tmp_path):
+        path = str(tmp_path / 'plain.mp4')
+        muxer = AxcliteMp4Muxer(0, path, axcl.PT_H264, 320, 240, fps=25, fragmented=False)
+        write_gop(muxer, 3, 0)
+        write_gop(muxer, 2, 3 * FRAME_US)
+        muxer.close()
+
+        data = open(path, 'rb').read()
+        boxes = parse_boxes(data)
+        assert [b[0] for b in boxes] == [b'ftyp', b'mdat', b'moov']
+        mdat = boxes[1]
+
+        stbl = child(data, boxes[2], [b'trak', b'mdia', b'minf', b'stbl'])
+        stsz = child(data, stbl, [b'stsz'])
+        sizes = struct.unpack('>5I', data[stsz[1] + 12:stsz[2]])
+        assert struct.unpack('>II', data[stsz[1] + 4:stsz[1] + 12]) == (0, 5)
+        assert sum(sizes) == mdat[2] - mdat[1]
+        stss = child(data, stbl, [b'stss'])
+        assert struct.unpack('>3I', data[stss[1] + 4:stss[2]]) == (2, 1, 4)
+        stco = child(data, stbl, [b'stco'])
+        assert struct.unpack('>3I', data[stco[1] + 4:stco[2]]) == (2, mdat[1], mdat[1] + sum(sizes[:3]))
+        stsc = child(data, stbl, [b'stsc'])
+        assert struct.unpack('>7I', data[stsc[1] + 4:stsc[2]]) == (2, 1, 3, 1, 2, 2, 1)
+        stts = child(data, stbl, [b'stts'])
+        assert struct.unpack('>3I', data[stts[1] + 4:stts[2]]) == (1, 5, FRAME_US * MP4_TIMESCALE // 1000000)
@@ -0,0 +1,81 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+sys.path.append(BASE_DIR+'/../sample')
+
+import numpy as np
+from axcl.rt.axcl_rt_engine_type import *
+from axclite.axclite_tensor import axclite_unpack_nibbles, axclite_decode_tensor, _build_fp8_table
+
+
+class TestAxcliteTensor():
+    def test_unpack_nibbles(self):
+        values = np.arange(-8, 8, dtype=np.int8)
+        raw = ((values[0::2] & 0x0F) | ((values[1::2] & 0x0F) << 4)).astype(np.uint8)
+
+        assert np.array_equal(axclite_unpack_nibbles(raw, 16, True), values)
+        assert np.array_equal(axclite_unpack_nibbles(raw, 16, False), (values & 0x0F).astype(np.uint8))
+        # odd count drops the high nibble of the last byte
+        assert np.array_equal(axclite_unpack_nibbles(raw, 15, True), values[:15])
+
+    def test_decode_int4(self):
+        raw = np.array([0x21, 0xF8, 0x07], dtype=np.uint8)
+
+        arr = axclite_decode_tensor(raw, AXCL_DATA_TYPE_INT4, [1, 5])
+        assert arr.shape == (1, 5)
+        assert arr.tolist() == [[1, 2, -8, -1, 7]]
+
+        arr = axclite_decode_tensor(raw, AXCL_DATA_TYPE_UINT4, [5])
+        assert arr.tolist() == [1, 2, 8, 15, 7]
+
+    def test_decode_bf16(self):
+        values = np.array([1.0, -2.5, 0.15625, 65536.0, -0.0], dtype=np.float32)
+        raw = (values.view(np.uint32) >> 16).astype(np.uint16).view(np.uint8)
+
+        arr = axclite_decode_tensor(raw, AXCL_DATA_TYPE_BF16, [5])
+        assert arr.dtype == np.float32
+        assert np.array_equal(arr, values)
+
+    def test_fp8_table(self):
+        table = _build_fp8_table()
+        assert table.size == 256
+        assert table[0x00] == 0.0
+        assert table[0x38] == 1.0
+        assert table[0xB8] == -1.0
+        assert table[0x40] == 2.0
+        assert table[0x3C] == 1.5
+        # max normal and min subnormal of e4m3fn
+        assert table[0x7E] == 448.0
+        assert table[0x01] == 2.0 ** -9
+        assert np.isnan(table[0x7F]) and np.isnan(table[0xFF])
+        assert np.count_nonzero(np.isnan(table)) == 2
+
+    def test_decode_fp8(self):
+        raw = np.array([0x38, 0xC0, 0x00, 0x7E], dtype=np.uint8)
+
+        arr = axclite_decode_tensor(raw, AXCL_DATA_TYPE_FP8, [2, 2])
+        assert arr.tolist() == [[1.0, -2.0], [0.0, 448.0]]
+
+    def test_decode_layout_and_scale(self):
+        raw = np.arange(24, dtype=np.uint8)
+
+        arr = axclite_decode_tensor(raw, AXCL_DATA_TYPE_UINT8, [1, 2, 3, 4], AXCL_DATA_LAYOUT_NHWC, AXCL_DATA_LAYOUT_NCHW,
+                                    scale=0.5, zero_point=2)
+        assert arr.shape == (1, 4, 2, 3)
+        assert arr.dtype == np.float32
+        assert arr[0, 1, 0, 0] == (1 - 2) * 0.5
+        assert arr[0, 3, 1, 2] == (23 - 2) * 0.5
@@ -0,0 +1,111 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import sys
+from ctypes import *
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+
+import axcl
+import axcl.npu.axcl_npu as axcl_npu
+from axcl.npu.axcl_npu_type import *
+
+
+def io_dict():
+    return {
+        "inputs": [{"physical_address": 0x100000, "size": 640 * 640 * 3}],
+        "outputs": [{"physical_address": 0x200000, "size": 1024}, {"physical_address": 0x300000, "size": 2048}],
+        "batch_size": 2,
+        "io_setting": {"wbt_index": 3},
+        "parallel_run": 1,
+    }
+
+
+def buffers(c_buffers, count):
+    return [(c_buffers[i].phyAddr, c_buffers[i].nSize) for i in range(count)]
+
+
+class EngineLib():
+    # records the IO passed by run_sync* in place of the npu library
+    def __init__(self):
+        self.ios = []
+        self.AXCL_ENGINE_RunSync = lambda handle, p_io: self.run(p_io)
+        self.AXCL_ENGINE_RunSyncV2 = lambda handle, context, p_io: self.run(p_io)
+        self.AXCL_ENGINE_RunGroupIOSync = lambda handle, context, index, p_io: self.run(p_io)
+
+    def run(self, p_io):
+        self.ios.append(p_io._obj)
+        return 0
+
+
+class TestNpuPrepareIo():
+    def test_prepare_io(self):
+        io = io_dict()
+        c_io = axcl.npu.prepare_io(io)
+
+        assert c_io is not None
+        assert c_io.nInputSize == 1 and c_io.nOutputSize == 2
+        assert buffers(c_io.pInputs, 1) == [(0x100000, 640 * 640 * 3)]
+        assert buffers(c_io.pOutputs, 2) == [(0x200000, 1024), (0x300000, 2048)]
+        assert c_io.nBatchSize == 2 and c_io.nParallelRun == 1
+        assert c_io.pIoSetting and c_io.pIoSetting.contents.nWbtIndex == 3
+
+    def test_prepare_io_setting_struct(self):
+        setting = AX_ENGINE_IO_SETTING_T()
+        setting.nWbtIndex = 5
+        io = io_dict()
+        io["io_setting"] = setting
+        c_io = axcl.npu.prepare_io(io)
+
+        assert addressof(c_io.pIoSetting.contents) == addressof(setting)
+
+        io.pop("io_setting")
+        c_io = axcl.npu.prepare_io(io)
+        assert not c_io.pIoSetting
+
+    def test_prepare_io_info(self):
+        # io info of get_io_info has no address, buffers are bound later
+        info = {"inputs": [{"name": "images", "size": 1228800}], "outputs": [{"name": "output0", "size": 4096}]}
+        c_io = axcl.npu.prepare_io(info)
+
+        assert buffers(c_io.pInputs, 1) == [(0, 1228800)]
+        assert buffers(c_io.pOutputs, 1) == [(0, 4096)]
+
+    def test_set_prepared_buffer(self):
+        c_io = axcl.npu.prepare_io(io_dict())
+
+        assert 0 == axcl.npu.set_prepared_input(c_io, 0, 0x400000)
+        assert 0 == axcl.npu.set_prepared_output(c_io, 1, 0x500000, 4096)
+        assert buffers(c_io.pInputs, 1) == [(0x400000, 640 * 640 * 3)]
+        assert buffers(c_io.pOutputs, 2) == [(0x200000, 1024), (0x500000, 4096)]
+
+        assert 0 != axcl.npu.set_prepared_input(c_io, 1, 0x600000)
+        assert 0 != axcl.npu.set_prepared_output(c_io, -1, 0x600000)
+
+    def test_run_sync_prepared_io(self, monkeypatch):
+        lib = EngineLib()
+        monkeypatch.setattr(axcl_npu, "libaxcl_npu", lib)
+        c_io = axcl.npu.prepare_io(io_dict())
+
+        assert 0 == axcl.npu.run_sync(0x1, c_io)
+        assert 0 == axcl.npu.run_sync_v2(0x1, 0x2, c_io)
+        assert 0 == axcl.npu.run_group_io_sync(0x1, 0x2, 0, c_io)
+        assert all(io is c_io for io in lib.ios)
+
+        # a dict is still converted on each call
+        io = io_dict()
+        io.pop("io_setting")
+        assert 0 == axcl.npu.run_sync(0x1, io)
+        assert lib.ios[-1] is not c_io
+        assert buffers(lib.ios[-1].pOutputs, 2) == buffers(c_io.pOutputs, 2)
@@ -0,0 +1,237 @@
+# !/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ******************************************************************************
+#
+#  Copyright (c) 2019-2024 Axera Semiconductor Co., Ltd. All Rights Reserved.
+#
+#  This source file is the property of Axera Semiconductor Co., Ltd. and
+#  may not be copied or distributed in any isomorphic form without the prior
+#  written consent of Axera Semiconductor Co., Ltd.
+#
+# ******************************************************************************
+
+import os
+import struct
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR+'/..')
+sys.path.append(BASE_DIR+'/../sample')
+
+from vdec.simple_container_demux import SimpleContainerDemux, parse_avcc, parse_hvcc, read_ebml_id, read_ebml_size
+
+SC = b'\x00\x00\x00\x01'
+SPS = b'\x67\x64\x00\x28\xac\xd9'
+PPS = b'\x68\xeb\xe3\xcb'
+VPS = b'\x40\x01\x0c\x01'
+HSPS = b'\x42\x01\x01\x01'
+HPPS = b'\x44\x01\xc1\x72'
+TIMESCALE = 25000
+
+
+def box(kind, *payloads):
+    data = b''.join(payloads)
+    return struct.pack('>I4s', 8 + len(data), kind) + data
+
+
+def full_box(kind, version, flags, *payloads):
+    return box(kind, struct.pack('>I', (version << 24) | flags), *payloads)
+
+
+def avcc():
+    return bytes([1, SPS[1], SPS[2], SPS[3], 0xFF, 0xE1]) + struct.pack('>H', len(SPS)) + SPS + \
+        bytes([1]) + struct.pack('>H', len(PPS)) + PPS
+
+
+def hvcc(length_size=4):
+    arrays = b''
+    for nal_type, nal in [(32, VPS), (33, HSPS), (34, HPPS)]:
+        arrays += struct.pack('>BHH', 0x80 | nal_type, 1, len(nal)) + nal
+    return bytes(21) + bytes([0xFC | (length_size - 1), 3]) + arrays
+
+
+def sample(*nals):
+    return b''.join(struct.pack('>I', len(nal)) + nal for nal in nals)
+
+
+def idr(i):
+    return sample(b'\x65\x88' + bytes([i]))
+
+
+def non_idr(i):
+    return sample(b'\x41\x9a' + bytes([i]))
+
+
+def annexb(data):
+    # expected frame of a length prefixed sample
+    out = b''
+    pos = 0
+    while pos < len(data):
+        size, = struct.unpack_from('>I', data, pos)
+        out += SC + data[pos + 4:pos + 4 + size]
+        pos += 4 + size
+    return out
+
+
+def moov(stbl_boxes, fragmented=False):
+    entry = bytes(24) + struct.pack('>HH', 320, 240) + bytes(50) + box(b'avcC', avcc())
+    stsd = full_box(b'stsd', 0, 0, struct.pack('>I', 1), box(b'avc1', entry))
+    tkhd = full_box(b'tkhd', 0, 3, struct.pack('>III', 0, 0, 1), bytes(68))
+    mdhd = full_box(b'mdhd', 0, 0, struct.pack('>IIII', 0, 0, TIMESCALE, 0), bytes(4))
+    hdlr = full_box(b'hdlr', 0, 0, struct.pack('>I4s12x', 0, b'vide'), b'\x00')
+    stbl = box(b'stbl', stsd, *stbl_boxes)
+    trak = box(b'trak', tkhd, box(b'mdia', mdhd, hdlr, box(b'minf', stbl)))
+    mvex = box(b'mvex', full_box(b'trex', 0, 0, struct.pack('>5I', 1, 1, 1000, 0, 0))) if fragmented else b''
+    return box(b'moov', trak, mvex)
+
+
+def ebml(eid, *payloads):
+    data = b''.join(payloads)
+    assert len(data) < 0x3FFF
+    size = bytes([0x80 | len(data)]) if len(data) < 0x7F else struct.pack('>H', 0x4000 | len(data))
+    return eid.to_bytes((eid.bit_length() + 7) // 8, 'big') + size + data
+
+
+def ebml_uint(eid, value, length=1):
+    return ebml(eid, value.to_bytes(length, 'big'))
+
+
+def simple_block(track, timecode, data, eid=0xA3):
+    return ebml(eid, bytes([0x80 | track]), struct.pack('>hB', timecode, 0x80), data)
+
+
+def demux_file(path):
+    demux = SimpleContainerDemux(0)
+    assert demux.open(path)
+    frames = list(demux.frames())
+    info = (demux.format, demux.codec, demux.width, demux.height)
+    demux.close()
+    return info, frames
+
+
+class TestSimpleContainerDemux():
+    def test_parse_avcc(self):
+        length_size, param_sets = parse_avcc(avcc())
+        assert length_size == 4
+        assert param_sets == [SPS, PPS]
+
+        record = bytearray(avcc())
+        record[4] = 0xFD
+        assert parse_avcc(bytes(record))[0] == 2
+
+    def test_parse_hvcc(self):
+        length_size, param_sets = parse_hvcc(hvcc())
+        assert length_size == 4
+        assert param_sets == [VPS, HSPS, HPPS]
+        assert parse_hvcc(hvcc(length_size=2))[0] == 2
+
+    def test_ebml(self):
+        assert read_ebml_id(b'\x1a\x45\xdf\xa3', 0) == (0x1A45DFA3, 4)
+        assert read_ebml_id(b'\xa3', 0) == (0xA3, 1)
+        assert read_ebml_size(b'\x81', 0) == (1, 1, False)
+        assert read_ebml_size(b'\x40\x02', 0) == (2, 2, False)
+        assert read_ebml_size(b'\x01\xff\xff\xff\xff\xff\xff\xff', 0) == ((1 << 56) - 1, 8, True)
+
+    def test_mp4_sample_table(self, tmp_path):
+        # 5 samples in 3 chunks of 2, 2 and 1 samples with gaps between chunks, B frame order by ctts
+        samples = [idr(0), non_idr(1), non_idr(2), non_idr(3), non_idr(4)]
+        chunks = [samples[0:2], samples[2:4], samples[4:5]]
+        ftyp = box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'isom')
+        mdat_payload = b''
+        chunk_pos = []
+        for chunk in chunks:
+            mdat_payload += b'\xee' * 7
+            chunk_pos.append(len(mdat_payload))
+            mdat_payload += b''.join(chunk)
+        mdat_start = len(ftyp) + 8
+        ctts = [2000, 0, 1000, 3000, 0]
+        stbl = [
+            full_box(b'stts', 0, 0, struct.pack('>III', 1, 5, 1000)),
+            full_box(b'ctts', 0, 0, struct.pack('>I', 5), b''.join(struct.pack('>II', 1, v) for v in ctts)),
+            full_box(b'stsc', 0, 0, struct.pack('>7I', 2, 1, 2, 1, 3, 1, 1)),
+            full_box(b'stsz', 0, 0, struct.pack('>II', 0, 5), b''.join(struct.pack('>I', len(s)) for s in samples)),
+            full_box(b'stco', 0, 0, struct.pack('>I', 3), b''.join(struct.pack('>I', mdat_start + p) for p in chunk_pos)),
+        ]
+        path = str(tmp_path / 'plain.mp4')
+        with open(path, 'wb') as f:
+            f.write(ftyp + box(b'mdat', mdat_payload) + moov(stbl))
+
+        info, frames = demux_file(path)
+        assert info == ('mp4', 'h264', 320, 240)
+        assert len(frames) == 5
+        # parameter sets of avcC are injected before IDR without inband parameter sets
+        assert frames[0][0] == SC + SPS + SC + PPS + annexb(samples[0])
+        assert [bytes(f[0]) for f in frames[1:]] == [annexb(s) for s in samples[1:]]
+        assert [f[1] for f in frames] == [(i * 1000 + ctts[i]) * 1000000 // TIMESCALE for i in range(5)]
+        assert [f[2] for f in frames] == [i * 1000 * 1000000 // TIMESCALE for i in range(5)]
+
+    def fragment(self, seq, trafs_builder):
+        # build moof twice, the second time with data offsets of the final moof size
+        moof = box(b'moof', full_box(b'mfhd', 0, 0, struct.pack('>I', seq)), *trafs_builder(0))
+        return box(b'moof', full_box(b'mfhd', 0, 0, struct.pack('>I', seq)), *trafs_builder(len(moof) + 8))
+
+    def test_mp4_fragments(self, tmp_path):
+        other = [b'\xaa' * 5, b'\xbb' * 3]
+        own = [idr(0), non_idr(1), non_idr(2)]
+        own2 = [non_idr(3), non_idr(4)]
+
+        def trafs1(mdat_offset):
+            # track 2 at the start of mdat by data_offset, track 1 follows without data_offset or base flags,
+            # so its base is the data end of the previous traf
+            traf_other = box(b'traf', full_box(b'tfhd', 0, 0, struct.pack('>I', 2)),
+                             full_box(b'trun', 0, 0x201, struct.pack('>Ii', 2, mdat_offset),
+                                      b''.join(struct.pack('>I', len(s)) for s in other)))
+            traf_own = box(b'traf', full_box(b'tfhd', 0, 0, struct.pack('>I', 1)),
+                           full_box(b'tfdt', 1, 0, struct.pack('>Q', 5000)),
+                           full_box(b'trun', 0, 0xA00, struct.pack('>I', 3),
+                                    b''.join(struct.pack('>Ii', len(s), c) for s, c in zip(own, [1000, 2000, 0]))))
+            return [traf_other, traf_own]
+
+        def trafs2(mdat_offset):
+            # default-base-is-moof, data_offset from moof
+            return [box(b'traf', full_box(b'tfhd', 0, 0x020000, struct.pack('>I', 1)),
+                        full_box(b'trun', 0, 0x301, struct.pack('>Ii', 2, mdat_offset),
+                                 b''.join(struct.pack('>II', 500, len(s)) for s in own2)))]
+
+        ftyp = box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'iso6')
+        head = ftyp + moov([full_box(b'stts', 0, 0, struct.pack('>I', 0)),
+                            full_box(b'stsc', 0, 0, struct.pack('>I', 0)),
+                            full_box(b'stsz', 0, 0, struct.pack('>II', 0, 0)),
+                            full_box(b'stco', 0, 0, struct.pack('>I', 0))], fragmented=True)
+        data = head + self.fragment(1, trafs1) + box(b'mdat', *other, *own)
+        data += self.fragment(2, trafs2) + box(b'mdat', *own2)
+        path = str(tmp_path / 'frag.mp4')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        info, frames = demux_file(path)
+        assert info == ('mp4', 'h264', 320, 240)
+        assert [bytes(f[0]) for f in frames[1:]] == [annexb(s) for s in own[1:] + own2]
+        assert frames[0][0] == SC + SPS + SC + PPS + annexb(own[0])
+        # trex default duration 1000 in the first fragment, which continues in the second without tfdt
+        dts = [5000, 6000, 7000, 8000, 8500]
+        assert [f[2] for f in frames] == [t * 1000000 // TIMESCALE for t in dts]
+        assert [f[1] for f in frames[:3]] == [(t + c) * 1000000 // TIMESCALE for t, c in zip(dts, [1000, 2000, 0])]
+
+    def test_mkv(self, tmp_path):
+        blocks = [(0, idr(0)), (120, non_idr(1)), (40, non_idr(2)), (80, non_idr(3))]
+        track = ebml(0xAE, ebml_uint(0xD7, 1), ebml_uint(0x83, 1), ebml(0x86, b'V_MPEG4/ISO/AVC'),
+                     ebml(0x63A2, avcc()), ebml(0xE0, ebml_uint(0xB0, 320, 2), ebml_uint(0xBA, 240, 2)))
+        cluster = ebml(0x1F43B675, ebml_uint(0xE7, 1000, 2),
+                       simple_block(1, blocks[0][0], blocks[0][1]),
+                       simple_block(2, 0, b'\xcc' * 4),
+                       simple_block(1, blocks[1][0], blocks[1][1]),
+                       ebml(0xA0, simple_block(1, blocks[2][0], blocks[2][1], eid=0xA1), ebml_uint(0xFB, 1)),
+                       simple_block(1, blocks[3][0], blocks[3][1]))
+        segment = ebml(0x18538067, ebml(0x1549A966, ebml_uint(0x2AD7B1, 1000000, 3)), ebml(0x1654AE6B, track), cluster)
+        path = str(tmp_path / 'video.mkv')
+        with open(path, 'wb') as f:
+            f.write(ebml(0x1A45DFA3, ebml(0x4282, b'matroska')) + segment)
+
+        info, frames = demux_file(path)
+        assert info == ('mkv', 'h264', 320, 240)
+        assert frames[0][0] == SC + SPS + SC + PPS + annexb(blocks[0][1])
+        assert [bytes(f[0]) for f in frames[1:]] == [annexb(b[1]) for b in blocks[1:]]
+        assert [f[1] for f in frames] == [(1000 + t) * 1000 for t, _ in blocks]
+        # dts is the sorted pts in decode order
+        assert [f[2] for f in frames] == sorted(f[1] for f in frames)